@@ -0,0 +1,379 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import aiohttp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from mockCloud import MockCloud
+from evecc.evecc import EVECC
+from evecc.batch import Batch
+from evecc.controlServer import ControlServer
+from evecc.fleet import Fleet
+from evecc.sysExitStatus import SysExitStatus
+
+################################################################################
+# Variables
+################################################################################
+
+_SRC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+################################################################################
+# Classes
+################################################################################
+
+class BenchmarkResult():
+    """Latencies and cloud requests of a benchmark scenario.
+    """
+
+    def __init__(self, name):
+        """Creates a empty benchmark result.
+
+        Args:
+            name (str): Scenario name
+        """
+        self.name       = name
+        self.latencies  = []
+        self.requests   = 0
+        self.failures   = 0
+        self.duration   = 0
+
+    def getPercentile(self, percent):
+        """Get a latency percentile (nearest rank).
+
+        Args:
+            percent (float): Percent, between 0 and 100.
+
+        Returns:
+            float: Latency in s
+        """
+        latencies = sorted(self.latencies)
+        index = max(0, int(round(percent / 100 * len(latencies) + 0.5)) - 1)
+
+        return latencies[min(index, len(latencies) - 1)]
+
+    def getRow(self):
+        """Get the result as table row.
+
+        Returns:
+            str: Table row
+        """
+        commands = len(self.latencies)
+
+        return "%-36s %8d %8d %10.1f %10.1f %10.1f %10.1f" % (
+            self.name,
+            commands,
+            self.failures,
+            self.requests / commands,
+            self.getPercentile(50) * 1000,
+            self.getPercentile(99) * 1000,
+            commands / self.duration
+        )
+
+################################################################################
+# Functions
+################################################################################
+
+async def _runOneShot(mockCloud, name, iterations, options, cmd):
+    """Run every command in its own process, like a cron job does.
+    """
+    result = BenchmarkResult(name)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = _SRC_PATH + os.pathsep + env.get("PYTHONPATH", "")
+    args = [sys.executable, "-m", "evecc", "--baseUri", mockCloud.getBaseUri(), "-u", "user", "-p", "password",
+            "-sk", "SITE-0", "-cpi", "1"] + options + cmd
+
+    mockCloud.resetRequestCounts()
+    start = time.perf_counter()
+
+    for iteration in range(iterations):
+        timestamp = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(*args, env=env, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+        await process.wait()
+
+        if (0 != process.returncode):
+            result.failures += 1
+
+        result.latencies.append(time.perf_counter() - timestamp)
+
+    result.duration = time.perf_counter() - start
+    result.requests = mockCloud.getRequestCount()
+
+    return result
+
+async def _runSnapshot(mockCloud, name, iterations, options):
+    """Get all circuits of a site with their charger state per process. A
+    command is a circuit.
+    """
+    circuitCount = len([siteKey for siteKey, circuitPanelId in mockCloud.getCircuits() if "SITE-0" == siteKey])
+    result = await _runOneShot(mockCloud, name, iterations, options, ["snapshot", "--chargerState"])
+    result.latencies = [latency for latency in result.latencies for _ in range(circuitCount)]
+    result.failures *= circuitCount
+
+    return result
+
+async def _runDaemon(mockCloud, name, iterations, isWrite, timeout=None):
+    """Run all commands in a single session, like the daemon does.
+    """
+    result = BenchmarkResult(name)
+    evecc = EVECC("user", "password", "SITE-0", 1, isQuiet=True, baseUri=mockCloud.getBaseUri(), timeout=timeout)
+
+    await evecc.connect()
+    mockCloud.resetRequestCounts()
+    start = time.perf_counter()
+
+    for iteration in range(iterations):
+        timestamp = time.perf_counter()
+
+        try:
+            if (True == isWrite):
+                # Alternate the power limit, otherwise the writes are skipped.
+                status = await evecc.setCircuitPowerLimit(2000 + (iteration % 2) * 1000)
+            else:
+                status, _ = await evecc.getCircuitPowerLimit()
+        except Exception:
+            status = SysExitStatus.FAILED
+
+        if (SysExitStatus.SUCCESS != status):
+            result.failures += 1
+
+        result.latencies.append(time.perf_counter() - timestamp)
+
+    result.duration = time.perf_counter() - start
+    result.requests = mockCloud.getRequestCount()
+    await evecc.disconnect()
+
+    return result
+
+async def _runServer(mockCloud, name, iterations, concurrency):
+    """Get the power limit from concurrent local clients via the control
+    server, which keeps a single session.
+    """
+    result = BenchmarkResult(name)
+
+    with tempfile.TemporaryDirectory() as tmpDir:
+        socketPath = os.path.join(tmpDir, "evecc.sock")
+        evecc = EVECC("user", "password", "SITE-0", 1, isQuiet=True, baseUri=mockCloud.getBaseUri())
+        controlServer = ControlServer(evecc, socketPath=socketPath)
+        serverTask = asyncio.create_task(controlServer.run())
+
+        async with aiohttp.ClientSession(connector=aiohttp.UnixConnector(path=socketPath)) as session:
+
+            async def getPowerLimit():
+                async with session.get("http://localhost/api/powerLimit") as response:
+                    await response.read()
+
+                    return response.status
+
+            # Wait until the server is connected to the cloud.
+            isConnected = False
+
+            while (False == isConnected):
+                try:
+                    isConnected = 200 == await getPowerLimit()
+                except aiohttp.ClientError:
+                    pass
+
+                await asyncio.sleep(0.05)
+
+            async def runClient(count):
+                for _ in range(count):
+                    timestamp = time.perf_counter()
+                    await getPowerLimit()
+                    result.latencies.append(time.perf_counter() - timestamp)
+
+            mockCloud.resetRequestCounts()
+            start = time.perf_counter()
+            await asyncio.gather(*[runClient(max(1, iterations // concurrency)) for _ in range(concurrency)])
+            result.duration = time.perf_counter() - start
+            result.requests = mockCloud.getRequestCount()
+
+        controlServer.stop()
+        await serverTask
+
+    return result
+
+async def _runBatch(mockCloud, name, iterations, concurrency):
+    """Sweep all circuits of all sites per batch run. A command is a circuit.
+    """
+    result = BenchmarkResult(name)
+    entries = [{ "siteKey": siteKey, "circuitPanelId": circuitPanelId } for siteKey, circuitPanelId in mockCloud.getCircuits()]
+
+    mockCloud.resetRequestCounts()
+    start = time.perf_counter()
+
+    for iteration in range(iterations):
+        batch = Batch("user", "password", concurrency=concurrency, baseUri=mockCloud.getBaseUri())
+        timestamp = time.perf_counter()
+        await batch.run(entries)
+        latency = time.perf_counter() - timestamp
+        result.latencies.extend([latency] * len(entries))
+
+    result.duration = time.perf_counter() - start
+    result.requests = mockCloud.getRequestCount()
+
+    return result
+
+async def _runFleet(mockCloud, name, iterations, workerCount):
+    """Get the power limit of all circuits of all sites via the fleet
+    supervisor and its worker processes. The commands are sent as burst.
+    """
+    result = BenchmarkResult(name)
+    circuits = mockCloud.getCircuits()
+    config = {
+        "username": "user",
+        "password": "password",
+        "baseUri": mockCloud.getBaseUri(),
+        "deadband": 0,
+        "timeout": 30,
+        "retries": 3,
+        "rateLimit": 20,
+        "reportInterval": 5,
+        "loglevel": logging.WARNING
+    }
+    inputFd, commandFd = os.pipe()
+    outputFd, resultFd = os.pipe()
+    commandStream = os.fdopen(commandFd, "w")
+    resultStream = os.fdopen(outputFd, "r")
+    fleet = Fleet(
+        [{ "siteKey": siteKey, "circuitPanelId": circuitPanelId } for siteKey, circuitPanelId in circuits],
+        config,
+        workerCount,
+        os.fdopen(inputFd, "r"),
+        os.fdopen(resultFd, "w")
+    )
+    fleetTask = asyncio.create_task(fleet.run())
+    loop = asyncio.get_running_loop()
+
+    async def getPowerLimits(count):
+        timestamps = {}
+
+        for index in range(count):
+            siteKey, circuitPanelId = circuits[index % len(circuits)]
+            timestamps.setdefault((siteKey, circuitPanelId), []).append(time.perf_counter())
+            commandStream.write("%s %d get\n" % (siteKey, circuitPanelId))
+
+        commandStream.flush()
+
+        for _ in range(count):
+            record = json.loads(await loop.run_in_executor(None, resultStream.readline))
+            timestamp = timestamps[(record["siteKey"], record["circuitPanelId"])].pop(0)
+            result.latencies.append(time.perf_counter() - timestamp)
+
+            if (SysExitStatus.SUCCESS.name != record["status"]):
+                result.failures += 1
+
+    # Wait until the workers are connected to the cloud.
+    await getPowerLimits(len(circuits))
+    result.latencies = []
+    result.failures = 0
+
+    mockCloud.resetRequestCounts()
+    start = time.perf_counter()
+    await getPowerLimits(iterations)
+    result.duration = time.perf_counter() - start
+    result.requests = mockCloud.getRequestCount()
+
+    commandStream.close()
+    await fleetTask
+    resultStream.close()
+
+    return result
+
+async def _benchmark(args):
+    mockCloud = MockCloud(args.sites, args.circuits, args.latency, args.jitter, args.errorRate)
+    timeoutOptions = ["--timeout", str(args.timeout)]
+    results = []
+
+    await mockCloud.start()
+
+    try:
+        with tempfile.TemporaryDirectory() as tmpDir:
+            cacheOptions = [
+                "--cacheFile", os.path.join(tmpDir, "sites.json"),
+                "--tokenFile", os.path.join(tmpDir, "token.json")
+            ]
+
+            results.append(await _runOneShot(mockCloud, "one-shot get", args.iterations, timeoutOptions, ["getCircuitPowerLimit"]))
+            results.append(await _runOneShot(mockCloud, "one-shot set", args.iterations, timeoutOptions, ["setCircuitPowerLimit", "3000"]))
+
+            # Fill the cache and token file, before measuring.
+            await _runOneShot(mockCloud, "warm up", 1, cacheOptions, ["getCircuitPowerLimit"])
+
+            results.append(await _runOneShot(mockCloud, "one-shot get, cached ids and token", args.iterations, cacheOptions + timeoutOptions, ["getCircuitPowerLimit"]))
+            results.append(await _runSnapshot(mockCloud, "snapshot, cached ids and token", max(1, args.iterations // 10), cacheOptions + timeoutOptions))
+
+        results.append(await _runDaemon(mockCloud, "daemon get", args.iterations, False, args.timeout))
+        results.append(await _runDaemon(mockCloud, "daemon set", args.iterations, True, args.timeout))
+        results.append(await _runServer(mockCloud, "server get, 1 client", args.iterations, 1))
+        results.append(await _runServer(mockCloud, "server get, %d clients" % args.concurrency, args.iterations, args.concurrency))
+        results.append(await _runBatch(mockCloud, "batch get, concurrency 1", max(1, args.iterations // 10), 1))
+        results.append(await _runBatch(mockCloud, "batch get, concurrency %d" % args.concurrency, max(1, args.iterations // 10), args.concurrency))
+        results.append(await _runFleet(mockCloud, "fleet get, 1 worker", args.iterations, 1))
+        results.append(await _runFleet(mockCloud, "fleet get, %d workers" % args.workers, args.iterations, args.workers))
+    finally:
+        await mockCloud.stop()
+
+    print("%-36s %8s %8s %10s %10s %10s %10s" % ("Scenario", "Commands", "Failed", "Req./cmd", "p50 [ms]", "p99 [ms]", "Cmd/s"))
+
+    for result in results:
+        print(result.getRow())
+
+def main():
+    """Benchmark the EVECC commands against the local mock cloud.
+
+    Returns:
+        int: System exit status
+    """
+    parser = argparse.ArgumentParser(description="EVECC latency and request count benchmark")
+    parser.add_argument("--circuits", help="Number of circuits per site.", type=int, default=4)
+    parser.add_argument("--concurrency", help="Batch concurrency.", type=int, default=8)
+    parser.add_argument("--errorRate", help="Probability of a server failure response.", type=float, default=0)
+    parser.add_argument("--iterations", help="Number of commands per scenario.", type=int, default=20)
+    parser.add_argument("--jitter", help="Max. random latency in s.", type=float, default=0.01)
+    parser.add_argument("--latency", help="Latency of every response in s.", type=float, default=0.05)
+    parser.add_argument("--sites", help="Number of sites.", type=int, default=4)
+    parser.add_argument("--timeout", help="Deadline of a command in s.", type=float, default=30)
+    parser.add_argument("--workers", help="Number of fleet worker processes.", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    asyncio.run(_benchmark(args))
+
+    return 0
+
+################################################################################
+# Main
+################################################################################
+
+if ("__main__" == __name__):
+    sys.exit(main())
@@ -0,0 +1,156 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+################################################################################
+# Variables
+################################################################################
+
+_SRC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Modules, which shall not be imported just to show the usage or to run an
+# offline command.
+_FORBIDDEN_MODULES = ("pyeasee", "aiohttp", "asyncio", "signalrcore")
+
+################################################################################
+# Classes
+################################################################################
+
+################################################################################
+# Functions
+################################################################################
+
+def _measure(cmdArgs):
+    """Run evecc once with -X importtime and collect the import times.
+
+    Args:
+        cmdArgs (list): Command line arguments of evecc
+
+    Returns:
+        dict: Cumulative import time in us per module name
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = _SRC_PATH
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "evecc"] + cmdArgs,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    importTimes = {}
+
+    for line in process.stderr.splitlines():
+        if (False == line.startswith("import time:")):
+            continue
+
+        fields = line[len("import time:"):].split("|")
+
+        if ((3 != len(fields)) or (False == fields[1].strip().isdigit())):
+            continue
+
+        importTimes[fields[2].strip()] = int(fields[1])
+
+    return importTimes
+
+def _check(cmdArgs, budget, runs, top):
+    """Check the import time of one evecc command line against a budget.
+
+    Args:
+        cmdArgs (list): Command line arguments of evecc
+        budget (float): Max. cumulative import time of evecc in ms.
+        runs (int): Number of runs, the fastest one counts.
+        top (int): Number of slowest modules to show.
+
+    Returns:
+        int: System exit status
+    """
+    status = 0
+    importTimes = None
+
+    print("evecc %s" % " ".join(cmdArgs))
+
+    for _ in range(runs):
+        runImportTimes = _measure(cmdArgs)
+
+        if ((None == importTimes) or (runImportTimes.get("evecc", 0) < importTimes.get("evecc", 0))):
+            importTimes = runImportTimes
+
+    print("%-40s %10s" % ("Module", "Cum. [ms]"))
+
+    for name, duration in sorted(importTimes.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print("%-40s %10.1f" % (name, duration / 1000))
+
+    forbiddenModules = [name for name in _FORBIDDEN_MODULES if name in importTimes]
+
+    if (0 < len(forbiddenModules)):
+        print("Imported, but not needed: %s" % ", ".join(forbiddenModules))
+        status = 1
+
+    duration = importTimes.get("evecc", 0) / 1000
+
+    if (budget < duration):
+        print("Import time of evecc %.1f ms exceeds the budget of %.1f ms." % (duration, budget))
+        status = 1
+    else:
+        print("Import time of evecc %.1f ms is within the budget of %.1f ms." % (duration, budget))
+
+    return status
+
+def main():
+    """Check the import time of the evecc command line against a budget.
+    An offline command, which reads a not existing history file, is checked
+    too, because it shall not import the Easee cloud client.
+
+    Returns:
+        int: System exit status
+    """
+    parser = argparse.ArgumentParser(description="EVECC import time regression check")
+    parser.add_argument("--budget", help="Max. cumulative import time of evecc in ms.", type=float, default=50)
+    parser.add_argument("--runs", help="Number of runs, the fastest one counts.", type=int, default=5)
+    parser.add_argument("--top", help="Number of slowest modules to show.", type=int, default=10)
+    parser.add_argument("cmdArgs", help="Arguments of evecc.", nargs="*", default=["--help"])
+    args = parser.parse_args()
+    status = _check(args.cmdArgs, args.budget, args.runs, args.top)
+
+    with tempfile.TemporaryDirectory() as directory:
+        offlineCmdArgs = ["-hf", os.path.join(directory, "history.bin"), "history"]
+
+        print()
+        status = max(status, _check(offlineCmdArgs, args.budget, args.runs, args.top))
+
+    return status
+
+################################################################################
+# Main
+################################################################################
+
+if ("__main__" == __name__):
+    sys.exit(main())
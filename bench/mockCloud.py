@@ -0,0 +1,383 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import argparse
+import asyncio
+import random
+import socket
+import sys
+import os
+import uuid
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from evecc.rateLimiter import RateLimiter
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+class MockCloud():
+    """Local stand-in for the Easee cloud REST API endpoints, which are used
+    by EVECC: login, sites, circuits, circuit settings and charger state,
+    configuration and settings. Latency, server errors and rate limit
+    responses can be injected and the requests per endpoint are counted.
+
+    The site keys are SITE-<n> and the circuit panel ids start at 1.
+    """
+
+    def __init__(self, siteCount=1, circuitCount=1, latency=0, jitter=0, errorRate=0, rateLimit=None, tokenLifetime=3600, chargerCount=1):
+        """Creates the mock cloud.
+
+        Args:
+            siteCount (int, optional): Number of sites. Defaults to 1.
+            circuitCount (int, optional): Number of circuits per site. Defaults to 1.
+            latency (float, optional): Latency of every response in s. Defaults to 0.
+            jitter (float, optional): Max. random latency in s, which is added. Defaults to 0.
+            errorRate (float, optional): Probability of a server failure response, between 0 and 1. Defaults to 0.
+            rateLimit (int, optional): Max. number of settings writes per minute and circuit, before 429 is responded. Defaults to None, which means unlimited.
+            tokenLifetime (int, optional): Access token lifetime in s. Defaults to 3600.
+            chargerCount (int, optional): Number of chargers per circuit, which are all charging. Defaults to 1.
+        """
+        self._latency       = latency
+        self._jitter        = jitter
+        self._errorRate     = errorRate
+        self._failureCount  = 0
+        self._rateLimiter   = None
+        self._tokenLifetime = tokenLifetime
+        self._tokens        = set()
+        self._requestCounts = {}
+        self._sites         = {}
+        self._settings      = {}
+        self._chargers      = {}
+        self._runner        = None
+        self._port          = None
+
+        if (None != rateLimit):
+            self._rateLimiter = RateLimiter(rateLimit)
+
+        for siteIndex in range(siteCount):
+            siteId = 1000 + siteIndex
+            circuits = []
+
+            for circuitIndex in range(circuitCount):
+                circuitId = siteId * 100 + circuitIndex
+                chargers = []
+
+                for chargerIndex in range(chargerCount):
+                    chargerId = "EH%06d%02d" % (circuitId, chargerIndex)
+                    chargers.append({
+                        "id": chargerId,
+                        "name": "Charger %d of circuit %d" % (chargerIndex + 1, circuitId),
+                        "circuitId": circuitId
+                    })
+                    self._chargers[chargerId] = {
+                        "chargerOpMode": 3,
+                        "totalPower": 3.68,
+                        "dynamicChargerCurrent": 16,
+                        "isOnline": True
+                    }
+
+                circuits.append({
+                    "id": circuitId,
+                    "siteId": siteId,
+                    "circuitPanelId": circuitIndex + 1,
+                    "panelName": "Circuit %d" % (circuitIndex + 1),
+                    "ratedCurrent": 16,
+                    "chargers": chargers
+                })
+                self._settings[circuitId] = {
+                    "dynamicCircuitCurrentP1": 16,
+                    "dynamicCircuitCurrentP2": 16,
+                    "dynamicCircuitCurrentP3": 16
+                }
+
+            self._sites[siteId] = {
+                "id": siteId,
+                "siteKey": "SITE-%d" % siteIndex,
+                "name": "Site %d" % siteIndex,
+                "createdOn": "2021-01-01T00:00:00Z",
+                "circuits": circuits,
+                "equalizers": []
+            }
+
+    def _createApp(self):
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/api/accounts/token", self._handleLogin)
+        app.router.add_post("/api/accounts/refresh_token", self._handleRefresh)
+        app.router.add_get("/api/sites", self._handleSites)
+        app.router.add_get("/api/sites/{siteId}", self._handleSite)
+        app.router.add_get("/api/sites/{siteId}/circuits/{circuitId}/settings", self._handleGetCircuitSettings)
+        app.router.add_post("/api/sites/{siteId}/circuits/{circuitId}/settings", self._handlePostCircuitSettings)
+        app.router.add_get("/api/chargers/{chargerId}/state", self._handleGetChargerState)
+        app.router.add_get("/api/chargers/{chargerId}/config", self._handleGetChargerConfig)
+        app.router.add_post("/api/chargers/{chargerId}/settings", self._handlePostChargerSettings)
+
+        return app
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        """Count the request, inject latency and errors and check the access
+        token.
+        """
+        resource = request.match_info.route.resource
+        path = request.path if (None == resource) else resource.canonical
+        endpoint = request.method + " " + path
+        self._requestCounts[endpoint] = self._requestCounts.get(endpoint, 0) + 1
+
+        await asyncio.sleep(self._latency + random.uniform(0, self._jitter))
+
+        if (0 < self._failureCount):
+            self._failureCount -= 1
+            raise web.HTTPServiceUnavailable(text="Injected server failure")
+
+        if (random.random() < self._errorRate):
+            raise web.HTTPServiceUnavailable(text="Injected server failure")
+
+        if (False == request.path.startswith("/api/accounts/")):
+            if (request.headers.get("Authorization", "")[len("Bearer "):] not in self._tokens):
+                raise web.HTTPUnauthorized(text="Invalid access token")
+
+        return await handler(request)
+
+    def _createToken(self):
+        accessToken = uuid.uuid4().hex
+        self._tokens.add(accessToken)
+
+        return web.json_response({
+            "accessToken": accessToken,
+            "expiresIn": self._tokenLifetime,
+            "accessClaims": [],
+            "tokenType": "Bearer",
+            "refreshToken": uuid.uuid4().hex
+        })
+
+    async def _handleLogin(self, request):
+        return self._createToken()
+
+    async def _handleRefresh(self, request):
+        return self._createToken()
+
+    async def _handleSites(self, request):
+        return web.json_response([{ "id": site["id"], "siteKey": site["siteKey"], "name": site["name"] } for site in self._sites.values()])
+
+    def _getCircuitId(self, request):
+        siteId = int(request.match_info["siteId"])
+        circuitId = int(request.match_info["circuitId"])
+
+        if ((siteId not in self._sites) or (circuitId not in self._settings)):
+            raise web.HTTPNotFound(text="Circuit not found")
+
+        return circuitId
+
+    async def _handleSite(self, request):
+        siteId = int(request.match_info["siteId"])
+
+        if (siteId not in self._sites):
+            raise web.HTTPNotFound(text="Site not found")
+
+        return web.json_response(self._sites[siteId])
+
+    async def _handleGetCircuitSettings(self, request):
+        return web.json_response(self._settings[self._getCircuitId(request)])
+
+    async def _handlePostCircuitSettings(self, request):
+        circuitId = self._getCircuitId(request)
+
+        if (None != self._rateLimiter):
+            if (False == self._rateLimiter.getBucket(circuitId).tryAcquire()):
+                raise web.HTTPTooManyRequests(text="Rate limit exceeded", headers={ "Retry-After": "3" })
+
+        self._settings[circuitId].update(await request.json())
+
+        return web.json_response({})
+
+    def _getChargerId(self, request):
+        chargerId = request.match_info["chargerId"]
+
+        if (chargerId not in self._chargers):
+            raise web.HTTPNotFound(text="Charger not found")
+
+        return chargerId
+
+    async def _handleGetChargerState(self, request):
+        return web.json_response(self._chargers[self._getChargerId(request)])
+
+    async def _handleGetChargerConfig(self, request):
+        self._getChargerId(request)
+
+        return web.json_response({
+            "maxChargerCurrent": 16,
+            "phaseMode": 2
+        })
+
+    async def _handlePostChargerSettings(self, request):
+        chargerId = self._getChargerId(request)
+
+        if (None != self._rateLimiter):
+            if (False == self._rateLimiter.getBucket(chargerId).tryAcquire()):
+                raise web.HTTPTooManyRequests(text="Rate limit exceeded", headers={ "Retry-After": "3" })
+
+        data = await request.json()
+
+        if ("dynamicChargerCurrent" in data):
+            self._chargers[chargerId]["dynamicChargerCurrent"] = data["dynamicChargerCurrent"]
+
+        return web.json_response({})
+
+    def failRequests(self, count):
+        """Respond the next requests with a server failure, regardless of
+        the error rate.
+
+        Args:
+            count (int): Number of requests, which fail.
+        """
+        self._failureCount = count
+
+    def getSiteKeys(self):
+        """Get the site keys.
+
+        Returns:
+            list: Site keys
+        """
+        return [site["siteKey"] for site in self._sites.values()]
+
+    def getCircuits(self):
+        """Get the site key and circuit panel id of every circuit.
+
+        Returns:
+            list: Site key and circuit panel id pairs
+        """
+        return [(site["siteKey"], circuit["circuitPanelId"]) for site in self._sites.values() for circuit in site["circuits"]]
+
+    def getRequestCounts(self):
+        """Get the number of requests per endpoint.
+
+        Returns:
+            dict: Number of requests per endpoint
+        """
+        return dict(self._requestCounts)
+
+    def getRequestCount(self):
+        """Get the number of requests of all endpoints.
+
+        Returns:
+            int: Number of requests
+        """
+        return sum(self._requestCounts.values())
+
+    def resetRequestCounts(self):
+        """Reset the number of requests.
+        """
+        self._requestCounts = {}
+
+    def getBaseUri(self):
+        """Get the base URI, which is used instead of the Easee cloud one.
+
+        Returns:
+            str: Base URI
+        """
+        return "http://127.0.0.1:%d" % self._port
+
+    async def start(self, port=0):
+        """Start the mock cloud on localhost.
+
+        Args:
+            port (int, optional): TCP port. Defaults to 0, which means any free one.
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("127.0.0.1", port))
+        self._port = sock.getsockname()[1]
+
+        self._runner = web.AppRunner(self._createApp(), access_log=None)
+        await self._runner.setup()
+        await web.SockSite(self._runner, sock).start()
+
+    def getChargerCurrents(self):
+        """Get the dynamic current of every charger.
+
+        Returns:
+            dict: Current in A per charger id
+        """
+        return { chargerId: state["dynamicChargerCurrent"] for chargerId, state in self._chargers.items() }
+
+    async def stop(self):
+        """Stop the mock cloud.
+        """
+        if (None != self._runner):
+            await self._runner.cleanup()
+            self._runner = None
+
+################################################################################
+# Functions
+################################################################################
+
+async def _serve(args):
+    mockCloud = MockCloud(args.sites, args.circuits, args.latency, args.jitter, args.errorRate, args.rateLimit, chargerCount=args.chargers)
+
+    await mockCloud.start(args.port)
+    print("Mock cloud listening on %s, site keys: %s" % (mockCloud.getBaseUri(), ", ".join(mockCloud.getSiteKeys())), flush=True)
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await mockCloud.stop()
+
+def main():
+    """Run the mock cloud until it is interrupted.
+
+    Returns:
+        int: System exit status
+    """
+    parser = argparse.ArgumentParser(description="Local Easee cloud mock for EVECC")
+    parser.add_argument("--chargers", help="Number of chargers per circuit.", type=int, default=1)
+    parser.add_argument("--circuits", help="Number of circuits per site.", type=int, default=1)
+    parser.add_argument("--errorRate", help="Probability of a server failure response.", type=float, default=0)
+    parser.add_argument("--jitter", help="Max. random latency in s.", type=float, default=0)
+    parser.add_argument("--latency", help="Latency of every response in s.", type=float, default=0)
+    parser.add_argument("--port", help="TCP port.", type=int, default=8080)
+    parser.add_argument("--rateLimit", help="Max. number of settings writes per minute and circuit.", type=int, default=None)
+    parser.add_argument("--sites", help="Number of sites.", type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+################################################################################
+# Main
+################################################################################
+
+if ("__main__" == __name__):
+    sys.exit(main())
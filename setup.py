@@ -67,7 +67,8 @@ setuptools.setup(
     packages=setuptools.find_packages(where="src"),
     python_requires=">=3.9",
     include_package_data=True,
-    install_requires=["pyeasee==0.7.36"],
+    install_requires=["pyeasee==0.7.36", "tomli; python_version < '3.11'"],
+    extras_require={"planner": ["numpy"], "parquet": ["numpy", "pyarrow"]},
     entry_points={"console_scripts": [
         "evecc = evecc.__main__:main",
     ]}
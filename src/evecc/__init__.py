@@ -20,5 +20,20 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import importlib
 from .argParser import *
-from .evecc import *
+from .sysExitStatus import *
+
+# The charge controller pulls in the Easee cloud client and aiohttp, which
+# take most of the startup time. It is imported on first access only.
+_LAZY_ATTRIBUTES = {
+    "EVECC": ".evecc"
+}
+
+def __getattr__(name):
+    if (name not in _LAZY_ATTRIBUTES):
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    module = importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+
+    return getattr(module, name)
@@ -27,9 +27,17 @@
 ################################################################################
 import logging
 import sys
-import asyncio
+import json
+import time
+import itertools
 from .argParser import ArgParser
-from .evecc import EVECC
+from .sysExitStatus import SysExitStatus
+from .metrics import getMetrics
+from .tracer import getTracer
+from .siteCache import SiteCache
+from .tokenStore import TokenStore
+from .circuitState import CircuitState
+from .history import History, parseTimestamp
 
 ################################################################################
 # Variables
@@ -45,13 +53,429 @@ _LOGGER = logging.getLogger(__file__)
 # Functions
 ################################################################################
 
+def _plan(args):
+    """Plan the power limits by a PV forecast and write the schedule.
+
+    Args:
+        args (dict): Arguments
+
+    Returns:
+        SysExitStatus: Status
+    """
+    status = SysExitStatus.SUCCESS
+
+    try:
+        from .planner import Planner, loadForecast, writeSchedule
+    except ImportError as ex:
+        print("The planner needs numpy: %s" % ex)
+        status = SysExitStatus.FAILED
+    else:
+        planner = Planner(currentStep=args.currentStep, baseLoad=args.baseLoad)
+
+        try:
+            timestamps, circuits, power = loadForecast(args.forecastFile)
+            timestamp = time.perf_counter()
+            plan = planner.plan(timestamps, power)
+            _LOGGER.info("%d slots of %d circuits planned in %.3f s.", len(timestamps), len(circuits), time.perf_counter() - timestamp)
+        except (OSError, ValueError) as ex:
+            print("Invalid forecast file: %s" % ex)
+            status = SysExitStatus.FAILED
+
+    if (SysExitStatus.SUCCESS == status):
+        try:
+            entries = writeSchedule(args.output, timestamps, circuits, plan)
+        except OSError as ex:
+            print("Schedule not written: %s" % ex)
+            status = SysExitStatus.FAILED
+
+    if (SysExitStatus.SUCCESS == status):
+        energy = plan["energy"].sum(axis=0, dtype="float64")
+
+        for index, (siteKey, circuitPanelId) in enumerate(circuits):
+            print(json.dumps({
+                "siteKey": siteKey,
+                "circuitPanelId": circuitPanelId,
+                "energy": round(float(energy[index]), 1)
+            }))
+
+        _LOGGER.info("%d schedule entries written to %s.", entries, args.output)
+
+    return status
+
+def _printHistory(args):
+    """Print the history records or their aggregates in a time range.
+
+    Args:
+        args (dict): Arguments
+
+    Returns:
+        SysExitStatus: Status
+    """
+    status = SysExitStatus.SUCCESS
+    history = History(args.historyFile)
+    start = None
+    end = None
+
+    try:
+        if (None != args.start):
+            start = parseTimestamp(args.start)
+
+        if (None != args.end):
+            end = parseTimestamp(args.end)
+
+        if (None == args.interval):
+            records = history.query(start, end, args.circuitId)
+        else:
+            records = history.aggregate(args.interval, start, end, args.circuitId)
+
+        for record in records:
+            print(json.dumps(record))
+    except (OSError, ValueError) as ex:
+        print("Invalid history: %s" % ex)
+        status = SysExitStatus.FAILED
+
+    return status
+
+def _simulate(args):
+    """Replay a trace through the surplus control, once per combination of
+    the parameter values, and print the results.
+
+    Args:
+        args (dict): Arguments
+
+    Returns:
+        SysExitStatus: Status
+    """
+    from .chargeLogic import ChargeLogic
+    from .simulator import Simulator, loadTrace
+    from .surplusControl import createSurplusController
+    from .adaptiveInterval import AdaptiveInterval
+
+    status = SysExitStatus.SUCCESS
+    trace = None
+
+    try:
+        trace = loadTrace(args.traceFile)
+    except (OSError, ValueError) as ex:
+        print("Invalid trace file: %s" % ex)
+        status = SysExitStatus.FAILED
+
+    if (None != trace):
+        # Only the parameters of the selected filter are varied.
+        if ("window" == args.filter):
+            alphas = [None]
+            windowSizes = args.window
+        else:
+            alphas = args.alpha
+            windowSizes = [None]
+
+        for alpha, windowSize, hysteresis, minDwell, minChange, rateLimit in itertools.product(
+            alphas, windowSizes, args.hysteresis, args.minDwell, args.minChange, args.rateLimit):
+
+            chargeLogic = ChargeLogic(args.deadband)
+            surplusController = createSurplusController(
+                chargeLogic.getPhasePowerMax(),
+                args.filter,
+                alpha,
+                windowSize,
+                hysteresis,
+                minDwell,
+                minChange
+            )
+            adaptiveInterval = None
+
+            if (None != args.interval):
+                adaptiveInterval = AdaptiveInterval(args.interval[0], args.interval[1], minChange, requestsPerPeriod=rateLimit, hysteresis=hysteresis)
+
+            simulator = Simulator(chargeLogic, surplusController, rateLimit, adaptiveInterval=adaptiveInterval)
+            timestamp = time.perf_counter()
+            result = {
+                "filter": args.filter,
+                "alpha": alpha,
+                "window": windowSize,
+                "hysteresis": hysteresis,
+                "minDwell": minDwell,
+                "minChange": minChange,
+                "rateLimit": rateLimit,
+                "deadband": args.deadband,
+                "interval": args.interval
+            }
+            result.update(simulator.run(trace))
+            _LOGGER.info("%d samples simulated in %.3f s.", len(trace), time.perf_counter() - timestamp)
+
+            print(json.dumps(result))
+
+    return status
+
+def _runCloudCommand(args):
+    """Run a command, which requests the Easee cloud.
+
+    Args:
+        args (dict): Arguments
+
+    Returns:
+        SysExitStatus: Status
+    """
+    status = SysExitStatus.SUCCESS
+
+    # The Easee cloud client and aiohttp are imported after the arguments
+    # are parsed, which keeps --help and usage errors fast.
+    with getTracer().span("import"):
+        import asyncio
+        from .evecc import EVECC
+        from .retryPolicy import RetryPolicy, CircuitBreaker
+        from .rateLimiter import RateLimiter
+
+    # The default proactor event loop on Windows doesn't work with aiohttp.
+    if ("win32" == sys.platform):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    siteCache = SiteCache(args.cacheFile, args.cacheTtl)
+
+    if (True == args.refreshCache):
+        if ("batch" == args.cmd):
+            siteCache.clear()
+        elif ("snapshot" == args.cmd):
+            siteCache.invalidateSite(args.siteKey)
+        elif ("fleet" != args.cmd):
+            siteCache.invalidate(args.siteKey, args.circuitPanelId)
+
+    tokenStore = None
+
+    if (None != args.tokenFile):
+        tokenStore = TokenStore(args.tokenFile)
+
+    circuitState = CircuitState(args.stateFile)
+    history = None
+
+    if (None != args.historyFile):
+        history = History(args.historyFile)
+
+    retryPolicy = RetryPolicy(args.retries)
+    circuitBreaker = CircuitBreaker(fileName=args.breakerFile)
+    chargerAllocator = None
+
+    if (True == args.chargerMode):
+        from .chargerAllocator import ChargerAllocator
+
+        chargerAllocator = ChargerAllocator(minCurrent=args.minCurrent)
+
+    # The long running commands share one request budget with the controller.
+    rateLimiter = None
+
+    if (args.cmd in ("daemon", "server", "stream")):
+        rateLimiter = RateLimiter(args.rateLimit)
+
+    evecc = EVECC(
+        args.username,
+        args.password,
+        args.siteKey,
+        args.circuitPanelId,
+        siteCache,
+        tokenStore,
+        circuitState,
+        args.deadband,
+        baseUri=args.baseUri,
+        history=history,
+        timeout=args.timeout,
+        retryPolicy=retryPolicy,
+        circuitBreaker=circuitBreaker,
+        chargerAllocator=chargerAllocator,
+        rateLimiter=rateLimiter
+    )
+
+    if ("getCircuitPowerLimit" == args.cmd):
+        status, circuitPowerLimit = asyncio.run(evecc.getCircuitPowerLimit())
+        print(circuitPowerLimit)
+    elif ("setCircuitPowerLimit" == args.cmd):
+        status = asyncio.run(evecc.setCircuitPowerLimit(args.circuitPowerLimit[0]))
+    elif ("server" == args.cmd):
+        from .controlServer import ControlServer
+        from .telemetry import Telemetry
+
+        telemetry = None
+
+        if (True == args.telemetry):
+            telemetry = Telemetry()
+
+        try:
+            controlServer = ControlServer(
+                evecc,
+                args.address,
+                args.listenPort,
+                args.socket,
+                rateLimiter,
+                telemetry
+            )
+        except ValueError as ex:
+            print(ex)
+            status = SysExitStatus.FAILED
+        else:
+            status = asyncio.run(controlServer.run())
+    elif ("batch" == args.cmd):
+        from .batch import Batch, loadBatchFile
+
+        batch = Batch(
+            args.username,
+            args.password,
+            siteCache,
+            tokenStore,
+            circuitState,
+            args.deadband,
+            args.concurrency,
+            args.baseUri,
+            history,
+            args.timeout,
+            retryPolicy,
+            circuitBreaker
+        )
+        entries = None
+
+        try:
+            entries = loadBatchFile(args.batchFile)
+        except (OSError, ValueError) as ex:
+            print("Invalid batch file: %s" % ex)
+            status = SysExitStatus.FAILED
+
+        if (None != entries):
+            status, results = asyncio.run(batch.run(entries))
+
+            for result in results:
+                print(json.dumps(result))
+    elif ("fleet" == args.cmd):
+        from .batch import loadBatchFile
+        from .fleet import Fleet
+
+        entries = None
+
+        try:
+            entries = loadBatchFile(args.fleetFile)
+        except (OSError, ValueError) as ex:
+            print("Invalid fleet file: %s" % ex)
+            status = SysExitStatus.FAILED
+
+        if (None != entries):
+            # The workers have their own sessions, caches and circuit breakers.
+            fleet = Fleet(
+                entries,
+                {
+                    "username": args.username,
+                    "password": args.password,
+                    "baseUri": args.baseUri,
+                    "deadband": args.deadband,
+                    "timeout": args.timeout,
+                    "retries": args.retries,
+                    "rateLimit": args.rateLimit,
+                    "reportInterval": args.reportInterval,
+                    "loglevel": args.loglevel
+                },
+                args.workers,
+                metricsPort=args.metricsPort
+            )
+            status = asyncio.run(fleet.run())
+    elif ("snapshot" == args.cmd):
+        from .siteSnapshot import SiteSnapshot
+
+        siteSnapshot = SiteSnapshot(
+            args.username,
+            args.password,
+            args.siteKey,
+            siteCache,
+            tokenStore,
+            args.concurrency,
+            args.chargerState,
+            args.baseUri,
+            history,
+            args.timeout,
+            retryPolicy,
+            circuitBreaker
+        )
+        status, snapshot = asyncio.run(siteSnapshot.run())
+        print(json.dumps(snapshot))
+    elif ("daemon" == args.cmd):
+        from .daemon import Daemon
+        from .telemetry import Telemetry
+        from .schedule import loadSchedule
+
+        telemetry = None
+        schedule = None
+
+        if (True == args.telemetry):
+            telemetry = Telemetry()
+
+        if (None != args.schedule):
+            try:
+                schedule = loadSchedule(
+                    args.schedule,
+                    args.siteKey,
+                    args.circuitPanelId
+                )
+            except (OSError, ValueError) as ex:
+                print("Invalid schedule file: %s" % ex)
+                status = SysExitStatus.FAILED
+
+        if (SysExitStatus.FAILED != status):
+            daemon = Daemon(
+                evecc,
+                rateLimiter=rateLimiter,
+                metricsPort=args.metricsPort,
+                telemetry=telemetry,
+                schedule=schedule
+            )
+            status = asyncio.run(daemon.run())
+    elif ("stream" == args.cmd):
+        from .surplusStream import SurplusStream
+        from .surplusControl import createSurplusController
+        from .telemetry import Telemetry
+
+        surplusController = createSurplusController(
+            evecc.getPhasePowerMax(),
+            args.filter,
+            args.alpha,
+            args.window,
+            args.hysteresis,
+            args.minDwell,
+            args.minChange
+        )
+        telemetry = None
+        adaptiveInterval = None
+
+        if (True == args.telemetry):
+            telemetry = Telemetry()
+
+        if (None != args.interval):
+            from .adaptiveInterval import AdaptiveInterval
+
+            # With telemetry, the power limit is read back without a request.
+            adaptiveInterval = AdaptiveInterval(
+                args.interval[0],
+                args.interval[1],
+                args.minChange,
+                requestsPerCycle=1 if (None != telemetry) else 2,
+                requestsPerPeriod=args.rateLimit,
+                hysteresis=args.hysteresis
+            )
+
+        surplusStream = SurplusStream(
+            evecc,
+            surplusController,
+            args.input,
+            rateLimiter=rateLimiter,
+            metricsPort=args.metricsPort,
+            telemetry=telemetry,
+            adaptiveInterval=adaptiveInterval
+        )
+        status = asyncio.run(surplusStream.run())
+
+    return status
+
 def main():
     """The program entry point function.
 
     Returns:
         int: System exit status
     """
-    status      = 0
+    status      = SysExitStatus.SUCCESS
     argParser   = ArgParser()
 
     logging.basicConfig(
@@ -61,25 +485,62 @@ def main():
 
     _LOGGER.debug("args: %s", argParser.getArgs())
 
-    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    profiler = None
 
-    evecc = EVECC(
-        argParser.getArgs().username,
-        argParser.getArgs().password,
-        argParser.getArgs().siteKey,
-        argParser.getArgs().circuitPanelId
-    )
+    if (None != argParser.getArgs().trace):
+        getTracer().enable()
 
-    if ("getCircuitPowerLimit" == argParser.getArgs().cmd):
-        status, circuitPowerLimit = asyncio.run(evecc.getCircuitPowerLimit())
-        print(circuitPowerLimit)
-    elif ("setCircuitPowerLimit" == argParser.getArgs().cmd):
-        status = asyncio.run(evecc.setCircuitPowerLimit(argParser.getArgs().circuitPowerLimit[0]))
-    else:
+    if (None != argParser.getArgs().profile):
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    # The offline commands don't need the Easee cloud client and aiohttp.
+    if ("plan" == argParser.getArgs().cmd):
+        status = _plan(argParser.getArgs())
+    elif ("history" == argParser.getArgs().cmd):
+        status = _printHistory(argParser.getArgs())
+    elif ("simulate" == argParser.getArgs().cmd):
+        status = _simulate(argParser.getArgs())
+    elif (None == argParser.getArgs().cmd):
         print("Command is missing.")
-        status = 1
+        status = SysExitStatus.FAILED
+    else:
+        status = _runCloudCommand(argParser.getArgs())
 
-    return status
+    if (None != profiler):
+        profiler.disable()
+
+        try:
+            profiler.dump_stats(argParser.getArgs().profile)
+            _LOGGER.info("Profile written to %s.", argParser.getArgs().profile)
+        except OSError as ex:
+            print("Profile not written: %s" % ex)
+
+            if (SysExitStatus.SUCCESS == status):
+                status = SysExitStatus.FAILED
+
+    if (None != argParser.getArgs().metricsFile):
+        try:
+            getMetrics().writeTextfile(argParser.getArgs().metricsFile)
+        except OSError as ex:
+            print("Metrics not written: %s" % ex)
+
+            if (SysExitStatus.SUCCESS == status):
+                status = SysExitStatus.FAILED
+
+    # The command already finished, so its own failure status is kept.
+    if (None != argParser.getArgs().trace):
+        try:
+            getTracer().writeFile(argParser.getArgs().trace)
+        except OSError as ex:
+            print("Trace not written: %s" % ex)
+
+            if (SysExitStatus.SUCCESS == status):
+                status = SysExitStatus.FAILED
+
+    return status.value
 
 ################################################################################
 # Main
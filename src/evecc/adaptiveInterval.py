@@ -0,0 +1,224 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import math
+from collections import deque
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+# Reasons of the interval decisions.
+REASON_START            = "start"
+REASON_STEP             = "step"
+REASON_SETPOINT         = "setpoint"
+REASON_SURPLUS_MOVES    = "surplus moves"
+REASON_SURPLUS_VARIES   = "surplus varies"
+REASON_SETTINGS_VARY    = "settings vary"
+REASON_STABLE           = "stable"
+REASON_BUDGET           = "budget"
+
+################################################################################
+# Classes
+################################################################################
+
+class AdaptiveInterval():
+    """Chooses the interval of a periodic control loop by the recent
+    variance of the surplus power and of the read back power limit. While
+    both are stable, the interval is widened step by step up to the max.
+    interval, which saves requests. If one of them varies by more than the
+    threshold, the interval is halved. A jump of the surplus power between
+    two samples by several times the threshold returns to the min. interval
+    at once, so a change of the conditions is not noticed late. The same
+    applies to a new setpoint of the surplus controller and to a move of the
+    filtered surplus power since the last cycle by more than the hysteresis,
+    so a slow ramp is followed too.
+
+    The read back power limit only varies by changes of others, e.g. by the
+    app, because its window restarts after every own write.
+
+    The interval never falls below the one, which the request budget allows
+    for the requests of a control cycle.
+    """
+
+    def __init__(self, minInterval=10, maxInterval=300, threshold=230, windowSize=10, requestsPerCycle=2, requestsPerPeriod=20, period=60, hysteresis=230):
+        """Creates the adaptive interval, which starts with the min. interval.
+
+        Args:
+            minInterval (float, optional): Min. interval in s. Defaults to 10.
+            maxInterval (float, optional): Max. interval in s. Defaults to 300.
+            threshold (float, optional): Standard deviation in W, above which a signal varies. Defaults to 230.
+            windowSize (int, optional): Number of recent values, whose variance is considered. Defaults to 10.
+            requestsPerCycle (int, optional): Max. number of requests of a control cycle. Defaults to 2, for the read back and a write.
+            requestsPerPeriod (int, optional): Max. number of requests per period. Defaults to 20.
+            period (float, optional): Period in s. Defaults to 60.
+            hysteresis (float, optional): Move of the filtered surplus power in W since the last cycle, which needs a cycle now. Defaults to 230.
+        """
+        self._budgetInterval    = period * requestsPerCycle / requestsPerPeriod
+        self._minInterval       = max(minInterval, self._budgetInterval)
+        self._maxInterval       = max(maxInterval, self._minInterval)
+        self._threshold         = threshold
+        self._hysteresis        = hysteresis
+        self._surplusPowers     = deque(maxlen=windowSize)
+        self._powerLimits       = deque(maxlen=windowSize)
+        self._surplusPower      = None
+        self._filteredPower     = None
+        self._referencePower    = None
+        self._wakeReason        = None
+        self._interval          = self._minInterval
+        self._reason            = REASON_START
+        self._GROW_FACTOR       = 1.5
+        self._STEP_FACTOR       = 3
+
+        if (self._minInterval > minInterval):
+            _LOGGER.info("Min. interval %.1f s is raised to %.1f s by the request budget.", minInterval, self._minInterval)
+
+    def addSample(self, surplusPower, filteredPower=None):
+        """Add a surplus power sample.
+
+        Args:
+            surplusPower (float): Surplus power in W
+            filteredPower (float, optional): Filtered surplus power in W. Defaults to None, if not available.
+
+        Returns:
+            bool: If a control cycle is needed now, e.g. by a step, it will return True otherwise False.
+        """
+        if ((None != self._surplusPower) and ((self._STEP_FACTOR * self._threshold) < abs(surplusPower - self._surplusPower))):
+            self._wakeReason = REASON_STEP
+
+        if (None != filteredPower):
+            if (None == self._referencePower):
+                self._referencePower = filteredPower
+            elif ((None == self._wakeReason) and (self._hysteresis < abs(filteredPower - self._referencePower))):
+                self._wakeReason = REASON_SURPLUS_MOVES
+
+            self._filteredPower = filteredPower
+
+        self._surplusPower = surplusPower
+        self._surplusPowers.append(surplusPower)
+
+        return None != self._wakeReason
+
+    def addSetpoint(self):
+        """Notify a new setpoint of the surplus controller, which needs a
+        control cycle now.
+        """
+        if (None == self._wakeReason):
+            self._wakeReason = REASON_SETPOINT
+
+    def update(self, powerLimit=None, isWritten=False):
+        """Decide the interval until the next control cycle, after the
+        power limit was read back.
+
+        Args:
+            powerLimit (float, optional): Read back power limit in W. Defaults to None, if it couldn't be read.
+            isWritten (bool, optional): Was the power limit written since the last cycle? Defaults to False.
+
+        Returns:
+            float, str: Interval in s and the reason of the decision.
+        """
+        if (True == isWritten):
+            self._powerLimits.clear()
+
+        if (None != powerLimit):
+            self._powerLimits.append(powerLimit)
+
+        interval = self._interval
+
+        if (None != self._wakeReason):
+            interval = self._minInterval
+            self._reason = self._wakeReason
+        elif (self._threshold < getStandardDeviation(self._surplusPowers)):
+            interval /= 2
+            self._reason = REASON_SURPLUS_VARIES
+        elif (self._threshold < getStandardDeviation(self._powerLimits)):
+            interval /= 2
+            self._reason = REASON_SETTINGS_VARY
+        else:
+            interval *= self._GROW_FACTOR
+            self._reason = REASON_STABLE
+
+        # Only a interval, which was narrowed below the budget, is limited by it.
+        if ((interval < self._minInterval) and (self._minInterval == self._budgetInterval) and (None == self._wakeReason)):
+            self._reason = REASON_BUDGET
+
+        self._wakeReason = None
+        self._referencePower = self._filteredPower
+        self._interval = min(self._maxInterval, max(self._minInterval, interval))
+
+        return self._interval, self._reason
+
+    def getMinInterval(self):
+        """Get the min. interval, which considers the request budget.
+
+        Returns:
+            float: Min. interval in s
+        """
+        return self._minInterval
+
+    def getInterval(self):
+        """Get the current interval.
+
+        Returns:
+            float: Interval in s
+        """
+        return self._interval
+
+    def getReason(self):
+        """Get the reason of the last decision.
+
+        Returns:
+            str: Reason
+        """
+        return self._reason
+
+################################################################################
+# Functions
+################################################################################
+
+def getStandardDeviation(values):
+    """Get the standard deviation of the values.
+
+    Args:
+        values (iterable): Values
+
+    Returns:
+        float: Standard deviation, 0 if there are less than 2 values.
+    """
+    deviation = 0
+    count = len(values)
+
+    if (1 < count):
+        mean = sum(values) / count
+        deviation = math.sqrt(sum([(value - mean) ** 2 for value in values]) / count)
+
+    return deviation
+
+################################################################################
+# Main
+################################################################################
@@ -30,6 +30,9 @@ import argparse
 # Variables
 ################################################################################
 
+# Commands, which don't need the Easee cloud.
+_OFFLINE_COMMANDS = ("plan", "history", "simulate")
+
 ################################################################################
 # Classes
 ################################################################################
@@ -44,11 +47,22 @@ class ArgParser():
         self._parser = self._createParser()
         self._args = self._parser.parse_args()
 
+        self._validate()
+
     def _createParser(self):
         mainParser = self._createMainParser()
         subParsers = mainParser.add_subparsers(dest="cmd")
         self._createGetCircuitPowerLimitSubParser(subParsers)
         self._createSetCircuitPowerLimitSubParser(subParsers)
+        self._createDaemonSubParser(subParsers)
+        self._createServerSubParser(subParsers)
+        self._createBatchSubParser(subParsers)
+        self._createFleetSubParser(subParsers)
+        self._createSnapshotSubParser(subParsers)
+        self._createStreamSubParser(subParsers)
+        self._createPlanSubParser(subParsers)
+        self._createHistorySubParser(subParsers)
+        self._createSimulateSubParser(subParsers)
 
         return mainParser
 
@@ -57,12 +71,53 @@ class ArgParser():
         mainParser.set_defaults(which="")
 
         # Arguments in alphabetic ascending order
+        mainParser.add_argument(
+            "-bu",
+            "--baseUri",
+            help="Easee cloud base URI, e.g. of a local mock for benchmarks.",
+            type=str,
+            default=None
+        )
+        mainParser.add_argument(
+            "-bf",
+            "--breakerFile",
+            help="Store the circuit breaker state in this file, to fail fast in the next program run too, while the Easee cloud is degraded.",
+            type=str,
+            default=None
+        )
+        mainParser.add_argument(
+            "-cf",
+            "--cacheFile",
+            help="Cache the site and circuit ids in this file, to skip the site discovery.",
+            type=str,
+            default=None
+        )
+        mainParser.add_argument(
+            "-ct",
+            "--cacheTtl",
+            help="Time to live of the cached site and circuit ids in s.",
+            type=int,
+            default=86400
+        )
+        mainParser.add_argument(
+            "-cm",
+            "--chargerMode",
+            help="Split the power limit across the active chargers of the circuit, instead of limiting the circuit.",
+            action="store_true"
+        )
         mainParser.add_argument(
             "-cpi",
             "--circuitPanelId",
             help="Circuit panel id of the given site, see in your Easee cloud account.",
             type=int,
-            required=True
+            default=None
+        )
+        mainParser.add_argument(
+            "-db",
+            "--deadband",
+            help="Min. change of a phase current in A, which is written. Smaller changes are skipped.",
+            type=float,
+            default=0
         )
         mainParser.add_argument(
             "-d",
@@ -73,26 +128,95 @@ class ArgParser():
             const=logging.DEBUG,
             default=logging.WARNING,
         )
+        mainParser.add_argument(
+            "-hf",
+            "--historyFile",
+            help="Append the written and read phase currents to this history file.",
+            type=str,
+            default=None
+        )
+        mainParser.add_argument(
+            "-mf",
+            "--metricsFile",
+            help="Write the metrics in Prometheus text format to this file, e.g. for the node exporter textfile collector.",
+            type=str,
+            default=None
+        )
+        mainParser.add_argument(
+            "-mi",
+            "--minCurrent",
+            help="Min. charging current of a charger in A in charger mode. A charger, which doesn't get it, is paused.",
+            type=float,
+            default=6
+        )
         mainParser.add_argument(
             "-p",
             "--password",
             help="Login user account password.",
             type=str,
-            required=True
+            default=None
+        )
+        mainParser.add_argument(
+            "-pr",
+            "--profile",
+            help="Profile the command with cProfile and write the statistics to this file.",
+            type=str,
+            default=None
+        )
+        mainParser.add_argument(
+            "-rc",
+            "--refreshCache",
+            help="Discover the site and circuit ids again, instead of using the cached ones.",
+            action="store_true"
+        )
+        mainParser.add_argument(
+            "-ra",
+            "--retries",
+            help="Max. number of repetitions of a failed Easee cloud request.",
+            type=int,
+            default=3
         )
         mainParser.add_argument(
             "-sk",
             "--siteKey",
             help="Site key, see in your Easee cloud account.",
             type=str,
-            required=True
+            default=None
+        )
+        mainParser.add_argument(
+            "-sf",
+            "--stateFile",
+            help="Store the last known dynamic circuit currents in this file, to skip unchanged writes.",
+            type=str,
+            default=None
+        )
+        mainParser.add_argument(
+            "-to",
+            "--timeout",
+            help="Deadline of a command in s, including all retries.",
+            type=float,
+            default=30
+        )
+        mainParser.add_argument(
+            "-tf",
+            "--tokenFile",
+            help="Store the access token in this file, to skip the login next time.",
+            type=str,
+            default=None
+        )
+        mainParser.add_argument(
+            "-tr",
+            "--trace",
+            help="Write the spans of the command stages and cloud requests to this file in the Chrome trace event format.",
+            type=str,
+            default=None
         )
         mainParser.add_argument(
             "-u",
             "--username",
             help="Login user account name.",
             type=str,
-            required=True
+            default=None
         )
         mainParser.add_argument(
             "-v",
@@ -124,6 +248,412 @@ class ArgParser():
             help="Circuit power limit in W"
         )
 
+    def _createDaemonSubParser(self, subParsers):
+        parser = subParsers.add_parser(
+            "daemon",
+            help="Keep the cloud session alive and process commands from stdin, one per line: get, set <P>, stats, telemetry or quit."
+        )
+        parser.add_argument(
+            "-mp",
+            "--metricsPort",
+            help="Serve the metrics in Prometheus text format on this local TCP port at /metrics.",
+            type=int,
+            default=None
+        )
+        parser.add_argument(
+            "-rl",
+            "--rateLimit",
+            help="Max. number of circuit settings requests per minute.",
+            type=int,
+            default=20
+        )
+        parser.add_argument(
+            "-sc",
+            "--schedule",
+            help="Set the power limits of this schedule file, created by the plan command, at their time.",
+            type=str,
+            default=None
+        )
+        parser.add_argument(
+            "-tm",
+            "--telemetry",
+            help="Subscribe to the charger observations, which the Easee cloud pushes, and read the circuit power limit from them.",
+            action="store_true",
+            default=False
+        )
+
+    def _createServerSubParser(self, subParsers):
+        parser = subParsers.add_parser(
+            "server",
+            help="Keep the cloud session alive and get or set the circuit power limit via a local HTTP API."
+        )
+        parser.add_argument(
+            "-ad",
+            "--address",
+            help="Loopback address to listen on.",
+            type=str,
+            default="127.0.0.1"
+        )
+        parser.add_argument(
+            "-lp",
+            "--listenPort",
+            help="TCP port to listen on.",
+            type=int,
+            default=8080
+        )
+        parser.add_argument(
+            "-rl",
+            "--rateLimit",
+            help="Max. number of circuit settings requests per minute.",
+            type=int,
+            default=20
+        )
+        parser.add_argument(
+            "-so",
+            "--socket",
+            help="Listen on this Unix socket instead of TCP.",
+            type=str,
+            default=None
+        )
+        parser.add_argument(
+            "-tm",
+            "--telemetry",
+            help="Subscribe to the charger observations, which the Easee cloud pushes, and read the circuit power limit from them.",
+            action="store_true",
+            default=False
+        )
+
+    def _createBatchSubParser(self, subParsers):
+        parser = subParsers.add_parser(
+            "batch",
+            help="Get or set the power limit of all circuits in a TOML or JSON file."
+        )
+        parser.add_argument(
+            "batchFile",
+            metavar="FILE",
+            type=str,
+            help="TOML or JSON file with a circuits list. Each circuit has a siteKey, circuitPanelId and optional powerLimit in W."
+        )
+        parser.add_argument(
+            "-cc",
+            "--concurrency",
+            help="Max. number of circuits, which are processed at the same time.",
+            type=int,
+            default=8
+        )
+
+    def _createFleetSubParser(self, subParsers):
+        parser = subParsers.add_parser(
+            "fleet",
+            help="Control all circuits in a TOML or JSON file by a pool of worker processes and process commands from stdin, one per line: <site-key> <circuit-panel-id> get|set <P>, health or quit."
+        )
+        parser.add_argument(
+            "fleetFile",
+            metavar="FILE",
+            type=str,
+            help="TOML or JSON file with a circuits list. Each circuit has a siteKey, circuitPanelId and optional username and password."
+        )
+        parser.add_argument(
+            "-mp",
+            "--metricsPort",
+            help="Serve the metrics of all workers in Prometheus text format on this local TCP port at /metrics.",
+            type=int,
+            default=None
+        )
+        parser.add_argument(
+            "-rl",
+            "--rateLimit",
+            help="Max. number of circuit settings requests per minute and circuit.",
+            type=int,
+            default=20
+        )
+        parser.add_argument(
+            "-ri",
+            "--reportInterval",
+            help="Interval in s, in which the workers report their health and metrics.",
+            type=float,
+            default=5
+        )
+        parser.add_argument(
+            "-wc",
+            "--workers",
+            help="Number of worker processes. Defaults to the number of CPU cores.",
+            type=int,
+            default=None
+        )
+
+    def _createSnapshotSubParser(self, subParsers):
+        parser = subParsers.add_parser(
+            "snapshot",
+            help="Get the settings of all circuits of the site and optionally the state of their chargers as one JSON document."
+        )
+        parser.add_argument(
+            "-cc",
+            "--concurrency",
+            help="Max. number of concurrent requests.",
+            type=int,
+            default=8
+        )
+        parser.add_argument(
+            "-cs",
+            "--chargerState",
+            help="Get the state of every charger too.",
+            action="store_true"
+        )
+
+    def _createStreamSubParser(self, subParsers):
+        parser = subParsers.add_parser(
+            "stream",
+            help="Drive the circuit power limit by surplus power samples in W, one per line."
+        )
+        parser.add_argument(
+            "-a",
+            "--alpha",
+            help="Weight of a new sample in the exponential moving average, between 0 and 1.",
+            type=float,
+            default=0.2
+        )
+        parser.add_argument(
+            "-f",
+            "--filter",
+            help="Smoothing filter: Exponential moving average or moving window.",
+            choices=["ema", "window"],
+            default="ema"
+        )
+        parser.add_argument(
+            "-hy",
+            "--hysteresis",
+            help="Hysteresis around the max. single phase power in W, before the phases are switched.",
+            type=float,
+            default=230
+        )
+        parser.add_argument(
+            "-i",
+            "--input",
+            help="FIFO or Unix socket, which provides the samples. Defaults to stdin.",
+            type=str,
+            default="-"
+        )
+        parser.add_argument(
+            "-iv",
+            "--interval",
+            help="Control the power limit and read it back in cycles, whose interval in s adapts between MIN and MAX to the variance of the surplus power and the read back power limit.",
+            metavar=("MIN", "MAX"),
+            type=float,
+            nargs=2,
+            default=None
+        )
+        parser.add_argument(
+            "-mp",
+            "--metricsPort",
+            help="Serve the metrics in Prometheus text format on this local TCP port at /metrics.",
+            type=int,
+            default=None
+        )
+        parser.add_argument(
+            "-mc",
+            "--minChange",
+            help="Min. change of the power limit in W, which is written.",
+            type=float,
+            default=230
+        )
+        parser.add_argument(
+            "-md",
+            "--minDwell",
+            help="Min. time in s between two phase switches.",
+            type=float,
+            default=300
+        )
+        parser.add_argument(
+            "-rl",
+            "--rateLimit",
+            help="Max. number of circuit settings requests per minute.",
+            type=int,
+            default=20
+        )
+        parser.add_argument(
+            "-tm",
+            "--telemetry",
+            help="Subscribe to the charger observations, which the Easee cloud pushes, and read the circuit power limit from them.",
+            action="store_true",
+            default=False
+        )
+        parser.add_argument(
+            "-w",
+            "--window",
+            help="Number of samples in the moving window.",
+            type=int,
+            default=10
+        )
+
+    def _createPlanSubParser(self, subParsers):
+        parser = subParsers.add_parser(
+            "plan",
+            help="Plan the power limits of many circuits by a PV forecast and write them as schedule for the daemon."
+        )
+        parser.add_argument(
+            "forecastFile",
+            metavar="FILE",
+            type=str,
+            help="CSV or Parquet file with the slot start and one forecasted power column in W per circuit, named siteKey/circuitPanelId."
+        )
+        parser.add_argument(
+            "-bl",
+            "--baseLoad",
+            help="Power in W, which is consumed by others and not available for charging.",
+            type=float,
+            default=0
+        )
+        parser.add_argument(
+            "-cs",
+            "--currentStep",
+            help="Round the phase currents down to a multiple of this step in A, 0 to disable.",
+            type=float,
+            default=1
+        )
+        parser.add_argument(
+            "-o",
+            "--output",
+            help="Schedule file (CSV).",
+            type=str,
+            default="schedule.csv"
+        )
+
+    def _createHistorySubParser(self, subParsers):
+        parser = subParsers.add_parser(
+            "history",
+            help="Print the records of the history file in a time range, one JSON object per line."
+        )
+        parser.add_argument(
+            "-ci",
+            "--circuitId",
+            help="Only the records of this circuit id.",
+            type=int,
+            default=None
+        )
+        parser.add_argument(
+            "-en",
+            "--end",
+            help="End of the time range, not included, in s since epoch or as ISO 8601 date time.",
+            type=str,
+            default=None
+        )
+        parser.add_argument(
+            "-i",
+            "--interval",
+            help="Downsample the records to aggregates of this interval in s. Defaults to the raw records.",
+            type=float,
+            default=None
+        )
+        parser.add_argument(
+            "-st",
+            "--start",
+            help="Start of the time range in s since epoch or as ISO 8601 date time.",
+            type=str,
+            default=None
+        )
+
+    def _createSimulateSubParser(self, subParsers):
+        parser = subParsers.add_parser(
+            "simulate",
+            help="Replay a PV and consumption trace through the surplus control, faster than real time. Every combination of the given parameter values is simulated."
+        )
+        parser.add_argument(
+            "traceFile",
+            metavar="FILE",
+            type=str,
+            help="CSV file with the columns timestamp, pv and optional consumption in W."
+        )
+        parser.add_argument(
+            "-a",
+            "--alpha",
+            help="Weight of a new sample in the exponential moving average, between 0 and 1.",
+            type=float,
+            nargs="+",
+            default=[0.2]
+        )
+        parser.add_argument(
+            "-f",
+            "--filter",
+            help="Smoothing filter: Exponential moving average or moving window.",
+            choices=["ema", "window"],
+            default="ema"
+        )
+        parser.add_argument(
+            "-hy",
+            "--hysteresis",
+            help="Hysteresis around the max. single phase power in W, before the phases are switched.",
+            type=float,
+            nargs="+",
+            default=[230]
+        )
+        parser.add_argument(
+            "-iv",
+            "--interval",
+            help="Control the power limit and read it back in cycles, whose interval in s adapts between MIN and MAX. Equal MIN and MAX simulate a fixed interval.",
+            metavar=("MIN", "MAX"),
+            type=float,
+            nargs=2,
+            default=None
+        )
+        parser.add_argument(
+            "-mc",
+            "--minChange",
+            help="Min. change of the power limit in W, which is written.",
+            type=float,
+            nargs="+",
+            default=[230]
+        )
+        parser.add_argument(
+            "-md",
+            "--minDwell",
+            help="Min. time in s between two phase switches.",
+            type=float,
+            nargs="+",
+            default=[300]
+        )
+        parser.add_argument(
+            "-rl",
+            "--rateLimit",
+            help="Max. number of circuit settings requests per minute.",
+            type=int,
+            nargs="+",
+            default=[20]
+        )
+        parser.add_argument(
+            "-w",
+            "--window",
+            help="Number of samples in the moving window.",
+            type=int,
+            nargs="+",
+            default=[10]
+        )
+
+    def _validate(self):
+        """Check the arguments, which depend on the command.
+        """
+        if (self._args.cmd not in _OFFLINE_COMMANDS):
+            if (None == self._args.username):
+                self._parser.error("the following arguments are required: -u/--username")
+
+            if (None == self._args.password):
+                self._parser.error("the following arguments are required: -p/--password")
+
+        # The batch and fleet file contain their own sites and circuits.
+        if ((self._args.cmd not in _OFFLINE_COMMANDS) and (self._args.cmd not in ("batch", "fleet"))):
+            if (None == self._args.siteKey):
+                self._parser.error("the following arguments are required: -sk/--siteKey")
+
+            # The snapshot contains all circuits of the site.
+            if ((None == self._args.circuitPanelId) and ("snapshot" != self._args.cmd)):
+                self._parser.error("the following arguments are required: -cpi/--circuitPanelId")
+
+        if (("history" == self._args.cmd) and (None == self._args.historyFile)):
+            self._parser.error("the following arguments are required: -hf/--historyFile")
+
+        if (("history" == self._args.cmd) and (None != self._args.interval) and (False == (0 < self._args.interval < float("inf")))):
+            self._parser.error("argument -i/--interval: must be greater than 0")
+
     def getArgs(self):
         """Get parsed arguments.
 
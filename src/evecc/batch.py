@@ -0,0 +1,326 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import asyncio
+import json
+import math
+from .evecc import EVECC
+from .sysExitStatus import SysExitStatus
+from .easeeClient import EaseeClient
+from .siteCache import SiteCache
+from .circuitState import CircuitState
+from .retryPolicy import CloudUnavailableError, Deadline, setDeadline, resetDeadline
+
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+################################################################################
+# Classes
+################################################################################
+
+class Batch():
+    """Reads or writes the power limit of many circuits in a single Easee
+    cloud session. The sites are downloaded once and the circuits are
+    processed concurrently.
+    """
+
+    def __init__(self, username, password, siteCache=None, tokenStore=None, circuitState=None, deadband=0, concurrency=8, baseUri=None, history=None, timeout=None, retryPolicy=None, circuitBreaker=None):
+        """Creates the batch.
+
+        Args:
+            username (str): Easee cloud user login name
+            password (str): Easee cloud user login password
+            siteCache (SiteCache, optional): Site and circuit id cache. Defaults to None, which means a in memory cache is used.
+            tokenStore (TokenStore, optional): Access token store. Defaults to None, which means a login is done.
+            circuitState (CircuitState, optional): Last known dynamic circuit currents. Defaults to None, which means a in memory state is used.
+            deadband (float, optional): Min. change of a phase current in A, which is written. Defaults to 0.
+            concurrency (int, optional): Max. number of circuits, which are processed at the same time. Defaults to 8.
+            baseUri (str, optional): Easee cloud base URI. Defaults to None, which means the official one.
+            history (History, optional): Record the written and read phase currents. Defaults to None.
+            timeout (float, optional): Deadline of every circuit in s, including its retries. Defaults to None, which means unlimited.
+            retryPolicy (RetryPolicy, optional): Retry policy. Defaults to None, which means the default policy.
+            circuitBreaker (CircuitBreaker, optional): Circuit breaker. Defaults to None.
+        """
+        self._username       = username
+        self._password       = password
+        self._siteCache      = siteCache
+        self._tokenStore     = tokenStore
+        self._circuitState   = circuitState
+        self._deadband       = deadband
+        self._concurrency    = concurrency
+        self._baseUri        = baseUri
+        self._history        = history
+        self._timeout        = timeout
+        self._retryPolicy    = retryPolicy
+        self._circuitBreaker = circuitBreaker
+
+        if (None == self._siteCache):
+            self._siteCache = SiteCache()
+
+        if (None == self._circuitState):
+            self._circuitState = CircuitState()
+
+    def _isDiscoveryRequired(self, entries):
+        """Is any circuit not cached, which requires to download the sites?
+
+        Args:
+            entries (list): Batch entries
+
+        Returns:
+            bool: If the sites need to be downloaded, it will return True otherwise False.
+        """
+        isRequired = False
+
+        for entry in entries:
+            siteId, circuitId = self._siteCache.get(entry["siteKey"], entry["circuitPanelId"])
+
+            if (None == circuitId):
+                isRequired = True
+                break
+
+        return isRequired
+
+    def _createResult(self, entry):
+        """Create the result record of a batch entry, which failed until it
+        is processed.
+
+        Args:
+            entry (dict): Batch entry
+
+        Returns:
+            dict: Result record
+        """
+        powerLimit = entry.get("powerLimit")
+
+        return {
+            "siteKey": entry["siteKey"],
+            "circuitPanelId": entry["circuitPanelId"],
+            "cmd": "getCircuitPowerLimit" if None == powerLimit else "setCircuitPowerLimit",
+            "status": SysExitStatus.FAILED.name,
+            "powerLimit": powerLimit
+        }
+
+    async def _getSites(self, easee):
+        """Download the sites within the deadline.
+
+        Args:
+            easee (EaseeClient): Shared session
+
+        Returns:
+            SysExitStatus, list, str: Status, sites or None and the error or None.
+        """
+        status = SysExitStatus.SUCCESS
+        sites = None
+        error = None
+        token = setDeadline(Deadline(self._timeout))
+
+        try:
+            sites = await asyncio.wait_for(easee.get_sites(), self._timeout)
+        except asyncio.TimeoutError:
+            status = SysExitStatus.TIMEOUT
+            error = "No response of the Easee cloud within %s s." % self._timeout
+        except CloudUnavailableError as ex:
+            status = SysExitStatus.UNAVAILABLE
+            error = str(ex)
+        except Exception as ex:
+            status = SysExitStatus.FAILED
+            error = "Sites not downloaded: %s" % (str(ex) or type(ex).__name__)
+        finally:
+            resetDeadline(token)
+
+        if (None != error):
+            _LOGGER.error(error)
+
+        return status, sites, error
+
+    async def _process(self, semaphore, easee, sites, entry):
+        """Read or write the power limit of a single circuit.
+
+        Args:
+            semaphore (asyncio.Semaphore): Limits the number of concurrently processed circuits.
+            easee (EaseeClient): Shared session
+            sites (list): Downloaded sites or None
+            entry (dict): Batch entry
+
+        Returns:
+            dict: Result record
+        """
+        powerLimit = entry.get("powerLimit")
+        result = self._createResult(entry)
+        evecc = EVECC(
+            self._username,
+            self._password,
+            entry["siteKey"],
+            entry["circuitPanelId"],
+            self._siteCache,
+            self._tokenStore,
+            self._circuitState,
+            self._deadband,
+            isQuiet=True,
+            baseUri=self._baseUri,
+            history=self._history,
+            timeout=self._timeout
+        )
+
+        async with semaphore:
+            try:
+                status = await evecc.connect(easee, sites)
+
+                if (SysExitStatus.SUCCESS != status):
+                    result["error"] = "Site or circuit not found."
+                elif (None == powerLimit):
+                    status, result["powerLimit"] = await evecc.getCircuitPowerLimit()
+                else:
+                    status = await evecc.setCircuitPowerLimit(powerLimit)
+
+                result["status"] = status.name
+            except Exception as ex:
+                _LOGGER.error("Circuit %d of site %s failed: %s", entry["circuitPanelId"], entry["siteKey"], ex)
+                result["error"] = str(ex)
+            finally:
+                await evecc.disconnect()
+
+        return result
+
+    async def run(self, entries):
+        """Process all batch entries.
+
+        Args:
+            entries (list): Batch entries, each with siteKey, circuitPanelId and optional powerLimit in W.
+                Without power limit, it is read.
+
+        Returns:
+            SysExitStatus, list: Status, which fails if any circuit failed and one result record per entry.
+            If the sites can't be downloaded, every entry fails with the status of the download.
+        """
+        status = SysExitStatus.SUCCESS
+        easee = EaseeClient(self._username, self._password, self._tokenStore, self._baseUri, self._retryPolicy, self._circuitBreaker)
+        semaphore = asyncio.Semaphore(self._concurrency)
+        sites = None
+        error = None
+
+        try:
+            if (True == self._isDiscoveryRequired(entries)):
+                status, sites, error = await self._getSites(easee)
+
+            if (SysExitStatus.SUCCESS == status):
+                results = await asyncio.gather(*[self._process(semaphore, easee, sites, entry) for entry in entries])
+            else:
+                results = [self._createResult(entry) for entry in entries]
+
+                for result in results:
+                    result["status"] = status.name
+                    result["error"] = error
+        finally:
+            await easee.close()
+
+        for result in results:
+            if ((SysExitStatus.SUCCESS == status) and (SysExitStatus.SUCCESS.name != result["status"])):
+                status = SysExitStatus.FAILED
+
+        return status, results
+
+################################################################################
+# Functions
+################################################################################
+
+def _validateEntry(name, entry):
+    """Validate the types and ranges of a batch entry.
+
+    Args:
+        name (str): Name of the entry in the error message
+        entry (dict): Batch entry
+
+    Raises:
+        ValueError: Invalid batch entry
+    """
+    if (False == isinstance(entry, dict)):
+        raise ValueError("%s is no table." % name)
+
+    if (("siteKey" not in entry) or ("circuitPanelId" not in entry)):
+        raise ValueError("%s without siteKey or circuitPanelId." % name)
+
+    if (False == isinstance(entry["siteKey"], str)):
+        raise ValueError("%s: siteKey %r is no string." % (name, entry["siteKey"]))
+
+    # A bool is a int too, but no circuit panel id.
+    if ((False == isinstance(entry["circuitPanelId"], int)) or (True == isinstance(entry["circuitPanelId"], bool))):
+        raise ValueError("%s: circuitPanelId %r is no integer." % (name, entry["circuitPanelId"]))
+
+    powerLimit = entry.get("powerLimit")
+
+    if (None != powerLimit):
+        if ((False == isinstance(powerLimit, (int, float))) or (True == isinstance(powerLimit, bool)) or
+            (False == math.isfinite(powerLimit)) or (0 > powerLimit)):
+            raise ValueError("%s: powerLimit %r is no non-negative number in W." % (name, powerLimit))
+
+def loadBatchFile(fileName):
+    """Load the batch entries from a TOML or JSON file. Each entry is a
+    circuits table with siteKey, circuitPanelId and optional powerLimit.
+
+    Args:
+        fileName (str): Batch file name, with .toml or .json extension.
+
+    Raises:
+        ValueError: Invalid batch file
+
+    Returns:
+        list: Batch entries
+    """
+    data = None
+
+    if (True == fileName.endswith(".toml")):
+        if (None == tomllib):
+            raise ValueError("TOML is not supported, please install tomli.")
+
+        with open(fileName, "rb") as fd:
+            data = tomllib.load(fd)
+    else:
+        with open(fileName, "r", encoding="utf-8") as fd:
+            data = json.load(fd)
+
+    if ((False == isinstance(data, dict)) or (False == isinstance(data.get("circuits"), list))):
+        raise ValueError("%s has no circuits list." % fileName)
+
+    for index, entry in enumerate(data["circuits"]):
+        _validateEntry("%s: Circuit %d" % (fileName, index + 1), entry)
+
+    return data["circuits"]
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,180 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+################################################################################
+# Classes
+################################################################################
+
+class ChargeLogic():
+    """Decision logic of the charge controller: The split of a circuit power
+    limit into phase currents, 1 or 3 phase charging and whether a write is
+    necessary at all. It has no I/O, so the controller and the simulation
+    use the same decisions.
+    """
+
+    def __init__(self, deadband=0, voltage=230, phaseCurrentMax=16):
+        """Creates the charge logic.
+
+        Args:
+            deadband (float, optional): Min. change of a phase current in A, which is written. Defaults to 0.
+            voltage (float, optional): Phase voltage in V. Defaults to 230.
+            phaseCurrentMax (float, optional): Max. phase current in A. Defaults to 16.
+        """
+        self._deadband          = deadband
+        self._voltage           = voltage
+        self._phaseCurrentMax   = phaseCurrentMax
+
+    def getPhasePowerMax(self):
+        """Get the max. power of a single phase.
+
+        Returns:
+            int: Max. phase power in W
+        """
+        return self._voltage * self._phaseCurrentMax
+
+    def getPhaseCurrentMax(self):
+        """Get the max. phase current.
+
+        Returns:
+            float: Max. phase current in A
+        """
+        return self._phaseCurrentMax
+
+    def calcCircuitPowerLimit(self, currents):
+        """Calculate the circuit power limit, based on each phase current limitation.
+
+        Args:
+            currents (list): Phase 1, 2 and 3 current limit in A
+
+        Returns:
+            int: Circuit power limit in W
+        """
+        phase1PowerLimit = self._voltage * currents[0]
+        phase2PowerLimit = self._voltage * currents[1]
+        phase3PowerLimit = self._voltage * currents[2]
+
+        return phase1PowerLimit + phase2PowerLimit + phase3PowerLimit
+
+    def calcPhaseCurrentLimits(self, powerLimit, phases=None):
+        """Calculate the phase current limits and determines 1 or 3 phase charging.
+
+        Args:
+            powerLimit (int): Circuit power limit in W
+            phases (int, optional): Charge with 1 or 3 phases. Defaults to None, which means it depends on the power limit.
+
+        Returns:
+            list: Phase 1, 2 and 3 current limit in A
+        """
+        phasePowerMax       = self.getPhasePowerMax()
+        phase1CurrentLimit  = None
+        phase2CurrentLimit  = None
+        phase3CurrentLimit  = None
+
+        if (None == phases):
+            # Charging single phase enough?
+            if (powerLimit <= phasePowerMax):
+                phases = 1
+            else:
+                phases = 3
+
+        if (1 == phases):
+            phase1CurrentLimit = min(powerLimit, phasePowerMax) / self._voltage
+            phase2CurrentLimit = 0
+            phase3CurrentLimit = 0
+        else:
+            # Charging over all three phases is necessary
+            phase1CurrentLimit  = powerLimit / (3 * self._voltage)
+            phase2CurrentLimit  = powerLimit / (3 * self._voltage)
+            phase3CurrentLimit  = powerLimit / (3 * self._voltage)
+
+        return [phase1CurrentLimit, phase2CurrentLimit, phase3CurrentLimit]
+
+    def isChanged(self, currents, lastCurrents):
+        """Is any phase current different from the last known one, by more
+        than the deadband?
+
+        Args:
+            currents (list): Phase 1, 2 and 3 current in A
+            lastCurrents (list): Last known phase 1, 2 and 3 current in A or None, if unknown.
+
+        Returns:
+            bool: If changed or the last known currents are unknown, it will return True otherwise False.
+        """
+        isChanged = True
+
+        if (None != lastCurrents):
+            isChanged = False
+
+            for current, lastCurrent in zip(currents, lastCurrents):
+                if (self._deadband < abs(current - lastCurrent)):
+                    isChanged = True
+                    break
+
+        return isChanged
+
+    def isPhaseSwitch(self, currents, lastCurrents):
+        """Do the phase currents switch between 1 and 3 phase charging?
+
+        Args:
+            currents (list): Phase 1, 2 and 3 current in A
+            lastCurrents (list): Last known phase 1, 2 and 3 current in A or None, if unknown.
+
+        Returns:
+            bool: If the phases are switched, it will return True otherwise False.
+        """
+        return (None != lastCurrents) and ((0 == lastCurrents[1]) != (0 == currents[1]))
+
+    def decide(self, powerLimit, phases, lastCurrents):
+        """Decide about a circuit power limit.
+
+        Args:
+            powerLimit (int): Circuit power limit in W
+            phases (int): Charge with 1 or 3 phases, None if it depends on the power limit.
+            lastCurrents (list): Last known phase 1, 2 and 3 current in A or None, if unknown.
+
+        Returns:
+            list, bool, bool: Phase currents in A, whether they need to be written and whether this switches the phases.
+        """
+        currents = self.calcPhaseCurrentLimits(powerLimit, phases)
+        isWrite = self.isChanged(currents, lastCurrents)
+        isPhaseSwitch = (True == isWrite) and (True == self.isPhaseSwitch(currents, lastCurrents))
+
+        return currents, isWrite, isPhaseSwitch
+
+################################################################################
+# Functions
+################################################################################
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,151 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import math
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+# Charger operation modes, which need power, see STATUS in pyeasee.charger.
+CHARGER_OP_MODES_ACTIVE = (2, 3, 6) # Awaiting start, charging, ready to charge
+
+################################################################################
+# Classes
+################################################################################
+
+class ChargerAllocator():
+    """Splits a circuit power limit across the active chargers of the
+    circuit, so that every car gets its fair share instead of the first one
+    taking it all. The power is filled up like water: every charger gets the
+    same power, unless it is limited by its min. or max. current. The
+    chargers are admitted in order of priority, as long as their min. current
+    fits, the others are paused. It has no I/O.
+    """
+
+    def __init__(self, voltage=230, minCurrent=6, currentStep=1):
+        """Creates the charger allocator.
+
+        Args:
+            voltage (float, optional): Phase voltage in V. Defaults to 230.
+            minCurrent (float, optional): Min. charging current in A, below a charger is paused. Defaults to 6.
+            currentStep (float, optional): Resolution of the charger currents in A. Defaults to 1.
+        """
+        self._voltage       = voltage
+        self._minCurrent    = minCurrent
+        self._currentStep   = currentStep
+
+    def _calcLevel(self, powerLimit, bounds):
+        """Calculate the water level, which is the power of every charger,
+        which is not limited by its min. or max. power. The sum of the
+        limited powers is piecewise linear between the bounds.
+
+        Args:
+            powerLimit (float): Power limit in W, at least the sum of the min. powers.
+            bounds (list): Min. and max. power in W of every charger
+
+        Returns:
+            float: Water level in W
+        """
+        points = sorted(set(power for bound in bounds for power in bound))
+        level = points[-1]
+        lastPoint = points[0]
+        lastTotal = sum(minPower for minPower, maxPower in bounds)
+
+        for point in points[1:]:
+            total = sum(min(max(point, minPower), maxPower) for minPower, maxPower in bounds)
+
+            if (powerLimit <= total):
+                if (total == lastTotal):
+                    level = lastPoint
+                else:
+                    level = lastPoint + (powerLimit - lastTotal) * (point - lastPoint) / (total - lastTotal)
+                break
+
+            lastPoint = point
+            lastTotal = total
+
+        return level
+
+    def allocate(self, powerLimit, chargers):
+        """Allocate the charger currents.
+
+        Args:
+            powerLimit (float): Circuit power limit in W
+            chargers (list): Active chargers in order of priority, each with id, maxCurrent in A and phases.
+
+        Returns:
+            dict: Current in A per charger id, 0 for paused chargers.
+        """
+        currents = { charger["id"]: 0 for charger in chargers }
+        active = []
+        minPowerTotal = 0
+
+        for charger in chargers:
+            minPower = self._minCurrent * self._voltage * charger["phases"]
+
+            if ((self._minCurrent <= charger["maxCurrent"]) and ((minPowerTotal + minPower) <= powerLimit)):
+                active.append(charger)
+                minPowerTotal += minPower
+            else:
+                _LOGGER.info("Charger %s paused, not enough power.", charger["id"])
+
+        if (0 < len(active)):
+            bounds = [(
+                self._minCurrent * self._voltage * charger["phases"],
+                charger["maxCurrent"] * self._voltage * charger["phases"]
+            ) for charger in active]
+            level = self._calcLevel(powerLimit, bounds)
+            remainders = {}
+            remainingPower = powerLimit
+
+            # Round down to the current step, with a tolerance for the floating point error.
+            for charger, (minPower, maxPower) in zip(active, bounds):
+                current = min(max(level, minPower), maxPower) / (self._voltage * charger["phases"])
+                steps = math.floor(current / self._currentStep + 1e-6)
+                currents[charger["id"]] = steps * self._currentStep
+                remainders[charger["id"]] = current - currents[charger["id"]]
+                remainingPower -= currents[charger["id"]] * self._voltage * charger["phases"]
+
+            # Hand out the remaining steps by the largest remainder.
+            for charger in sorted(active, key=lambda charger: remainders[charger["id"]], reverse=True):
+                stepPower = self._currentStep * self._voltage * charger["phases"]
+
+                if ((stepPower <= remainingPower + 1e-6) and ((currents[charger["id"]] + self._currentStep) <= charger["maxCurrent"])):
+                    currents[charger["id"]] += self._currentStep
+                    remainingPower -= stepPower
+
+        return currents
+
+################################################################################
+# Functions
+################################################################################
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,104 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import time
+from .jsonStore import JsonStore
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+class CircuitState(JsonStore):
+    """Remembers the last written or read dynamic circuit currents of every
+    circuit, to skip writes which wouldn't change anything. The state is kept
+    in memory and optionally stored in a file for the next program run.
+
+    The dynamic circuit currents are volatile and may be changed by others,
+    therefore a state is only trusted for a limited time.
+    """
+
+    def __init__(self, fileName=None, maxAge=600):
+        """Creates the circuit state and loads it from the file.
+
+        Args:
+            fileName (str, optional): State file name. Defaults to None, which means the state is in memory only.
+            maxAge (int, optional): Max. age of a state in s. Defaults to 600.
+        """
+        self._maxAge = maxAge
+
+        super().__init__(fileName, "Circuit state")
+
+    def getCurrents(self, siteKey, circuitPanelId):
+        """Get the last known dynamic circuit currents.
+
+        Args:
+            siteKey (str): The site key which identifies the site.
+            circuitPanelId (int): The circuit panel id which identifies the circuit.
+
+        Returns:
+            list: Phase 1, 2 and 3 current in A or None, if unknown or too old.
+        """
+        currents = None
+        entry = self._entries.get(self._getKey(siteKey, circuitPanelId))
+
+        if (None != entry):
+            if ((time.time() - entry["timestamp"]) < self._maxAge):
+                currents = entry["currents"]
+
+        return currents
+
+    def setCurrents(self, siteKey, circuitPanelId, currents):
+        """Remember the dynamic circuit currents.
+
+        Args:
+            siteKey (str): The site key which identifies the site.
+            circuitPanelId (int): The circuit panel id which identifies the circuit.
+            currents (list): Phase 1, 2 and 3 current in A
+        """
+        self._entries[self._getKey(siteKey, circuitPanelId)] = {
+            "currents": list(currents),
+            "timestamp": time.time()
+        }
+
+    def invalidate(self, siteKey, circuitPanelId):
+        """Forget the dynamic circuit currents.
+
+        Args:
+            siteKey (str): The site key which identifies the site.
+            circuitPanelId (int): The circuit panel id which identifies the circuit.
+        """
+        self._entries.pop(self._getKey(siteKey, circuitPanelId), None)
+
+################################################################################
+# Functions
+################################################################################
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,249 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import asyncio
+import ipaddress
+import os
+import signal
+import sys
+from aiohttp import web
+from .daemon import Daemon
+from .sysExitStatus import SysExitStatus
+from .metrics import getMetrics
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+################################################################################
+# Classes
+################################################################################
+
+class ControlServer(Daemon):
+    """Keeps one authenticated Easee cloud session alive and provides the
+    circuit power limit via a local HTTP API, for many concurrent clients:
+    - GET /api/powerLimit : Get the circuit power limit in W.
+    - PUT /api/powerLimit : Set the circuit power limit, e.g. {"powerLimit": 3680, "phases": 1}.
+    - GET /api/stats      : Get the setpoint scheduler statistics.
+    - GET /metrics        : Get the metrics in Prometheus text format.
+
+    The power limits are sent by the setpoint scheduler, like by the daemon.
+    Concurrent reads share a single cloud request. It listens on a loopback
+    address or a Unix socket only and runs until SIGINT or SIGTERM.
+    """
+
+    def __init__(self, evecc, address="127.0.0.1", port=8080, socketPath=None, rateLimiter=None, telemetry=None):
+        """Creates the control server.
+
+        Args:
+            evecc (EVECC): Electric vehicle easee charge controller
+            address (str, optional): Loopback address to listen on. Defaults to "127.0.0.1".
+            port (int, optional): TCP port to listen on. Defaults to 8080.
+            socketPath (str, optional): Listen on this Unix socket instead. Defaults to None.
+            rateLimiter (RateLimiter, optional): Rate limiter. Defaults to None, which means 20 requests per minute.
+            telemetry (Telemetry, optional): Subscribe to the charger observations and keep them in this snapshot. Defaults to None.
+
+        Raises:
+            ValueError: The address is no loopback address.
+        """
+        super().__init__(evecc, sys.stdin, sys.stdout, rateLimiter, None, telemetry)
+
+        if ((None == socketPath) and (False == isLoopbackAddress(address))):
+            raise ValueError("%s is no loopback address." % address)
+
+        self._address       = address
+        self._port          = port
+        self._socketPath    = socketPath
+        self._runner        = None
+        self._stopEvent     = None
+        self._readTask      = None
+
+    async def _readPowerLimit(self):
+        """Get the circuit power limit. Concurrent callers share a single
+        request.
+
+        Returns:
+            SysExitStatus, int: Status and circuit power limit in W
+        """
+        if ((None == self._readTask) or (True == self._readTask.done())):
+            self._readTask = asyncio.ensure_future(self._evecc.getCircuitPowerLimit())
+
+        return await asyncio.shield(self._readTask)
+
+    async def _handleGetPowerLimit(self, request):
+        if (None == self._scheduler):
+            raise web.HTTPServiceUnavailable(reason="Not connected")
+
+        try:
+            status, powerLimit = await self._readPowerLimit()
+        except Exception as ex:
+            _LOGGER.error("Get power limit failed: %s", ex)
+            raise web.HTTPBadGateway(reason=str(ex))
+
+        if (SysExitStatus.TIMEOUT == status):
+            raise web.HTTPGatewayTimeout(reason="No response of the Easee cloud")
+        elif (SysExitStatus.UNAVAILABLE == status):
+            raise web.HTTPServiceUnavailable(reason="Easee cloud unavailable")
+        elif (SysExitStatus.RATE_LIMITED == status):
+            raise web.HTTPTooManyRequests(reason="Easee cloud rate limit exceeded")
+        elif (SysExitStatus.SUCCESS != status):
+            raise web.HTTPBadGateway(reason="Get power limit failed")
+
+        return web.json_response({ "powerLimit": powerLimit })
+
+    async def _handleSetPowerLimit(self, request):
+        if (None == self._scheduler):
+            raise web.HTTPServiceUnavailable(reason="Not connected")
+
+        try:
+            data = await request.json()
+            powerLimit = int(data["powerLimit"])
+            phases = data.get("phases")
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise web.HTTPBadRequest(reason="Expected {\"powerLimit\": <W>, \"phases\": <1|3>}")
+
+        if ((0 > powerLimit) or (phases not in (None, 1, 3))):
+            raise web.HTTPBadRequest(reason="Invalid power limit or phases")
+
+        self._scheduler.submit(powerLimit, phases)
+
+        return web.json_response({ "queueDepth": self._scheduler.getQueueDepth() }, status=202)
+
+    async def _handleStats(self, request):
+        if (None == self._scheduler):
+            raise web.HTTPServiceUnavailable(reason="Not connected")
+
+        return web.json_response(self._scheduler.getStatistics())
+
+    async def _handleMetrics(self, request):
+        return web.Response(text=getMetrics().render(), content_type="text/plain", charset="utf-8")
+
+    async def _start(self):
+        """Start listening.
+        """
+        app = web.Application()
+        app.router.add_get("/api/powerLimit", self._handleGetPowerLimit)
+        app.router.add_put("/api/powerLimit", self._handleSetPowerLimit)
+        app.router.add_get("/api/stats", self._handleStats)
+        app.router.add_get("/metrics", self._handleMetrics)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+
+        if (None != self._socketPath):
+            site = web.UnixSite(self._runner, self._socketPath)
+
+            # Only the own user shall control the charger. The socket is
+            # created with these permissions, because a later chmod leaves a
+            # gap, in which other users could connect.
+            umask = os.umask(0o077)
+
+            try:
+                await site.start()
+            finally:
+                os.umask(umask)
+
+            _LOGGER.info("Listening on %s", self._socketPath)
+        else:
+            site = web.TCPSite(self._runner, self._address, self._port)
+            await site.start()
+            _LOGGER.info("Listening on http://%s:%d", self._address, self._port)
+
+    async def _readLine(self):
+        """Wait until the server shall stop.
+
+        Returns:
+            str: Always a empty string, which stops the daemon.
+        """
+        await self._stopEvent.wait()
+
+        return ""
+
+    def stop(self):
+        """Stop the server.
+        """
+        if (None != self._stopEvent):
+            self._stopEvent.set()
+
+    async def run(self):
+        """Login, resolve site and circuit once and serve the requests until
+        SIGINT or SIGTERM.
+
+        Returns:
+            SysExitStatus: Status
+        """
+        loop = asyncio.get_running_loop()
+        self._stopEvent = asyncio.Event()
+
+        for signalNumber in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signalNumber, self.stop)
+            except (NotImplementedError, RuntimeError):
+                # Not supported on Windows, where Ctrl-C raises KeyboardInterrupt.
+                pass
+
+        await self._start()
+
+        try:
+            status = await super().run()
+        finally:
+            await self._runner.cleanup()
+            self._runner = None
+
+            if ((None != self._socketPath) and (True == os.path.exists(self._socketPath))):
+                os.remove(self._socketPath)
+
+        return status
+
+################################################################################
+# Functions
+################################################################################
+
+def isLoopbackAddress(address):
+    """Is the address a loopback address, which is not reachable from the
+    network?
+
+    Args:
+        address (str): Host name or IP address
+
+    Returns:
+        bool: If it is a loopback address, it will return True otherwise False.
+    """
+    isLoopback = "localhost" == address
+
+    if (False == isLoopback):
+        try:
+            isLoopback = ipaddress.ip_address(address).is_loopback
+        except ValueError:
+            pass
+
+    return isLoopback
+
+################################################################################
+# Main
+################################################################################
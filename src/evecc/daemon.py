@@ -0,0 +1,248 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import asyncio
+import sys
+import json
+import time
+from .sysExitStatus import SysExitStatus
+from .rateLimiter import RateLimiter
+from .setpointScheduler import SetpointScheduler
+from .metrics import MetricsServer, getMetrics
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+################################################################################
+# Classes
+################################################################################
+
+class Daemon():
+    """Keeps one authenticated Easee cloud session alive and processes
+    commands, which are read line by line from the input stream:
+    - get       : Print the circuit power limit in W.
+    - set <P>   : Set the circuit power limit to P in W.
+    - <P>       : Short form of set <P>.
+    - stats     : Print the setpoint scheduler statistics.
+    - telemetry : Print the snapshot of the charger observations.
+    - quit      : Stop the daemon. End of input stops it too.
+
+    The power limits are sent by a setpoint scheduler, which keeps the
+    request budget and sends only the latest one. With a telemetry snapshot,
+    the charger observations are pushed by the Easee cloud stream and get
+    reads the circuit power limit from it, without a request.
+
+    With a schedule, its power limits are set at their time too. The end of
+    input doesn't stop the daemon then, until the schedule is done.
+    """
+
+    def __init__(self, evecc, inputStream=sys.stdin, outputStream=sys.stdout, rateLimiter=None, metricsPort=None, telemetry=None, schedule=None):
+        """Creates the daemon.
+
+        Args:
+            evecc (EVECC): Electric vehicle easee charge controller
+            inputStream (file, optional): Command input stream. Defaults to sys.stdin.
+            outputStream (file, optional): Result output stream. Defaults to sys.stdout.
+            rateLimiter (RateLimiter, optional): Rate limiter. Defaults to None, which means 20 requests per minute.
+            metricsPort (int, optional): Serve the metrics on this local TCP port. Defaults to None.
+            telemetry (Telemetry, optional): Subscribe to the charger observations and keep them in this snapshot. Defaults to None.
+            schedule (list, optional): Schedule entries (timestamp in s since epoch, power limit in W, phases), sorted by timestamp. Defaults to None.
+        """
+        self._evecc                 = evecc
+        self._metricsPort           = metricsPort
+        self._telemetry             = telemetry
+        self._schedule              = schedule
+        self._rateLimiter           = rateLimiter
+        self._scheduler             = None
+        self._inputStream           = inputStream
+        self._outputStream          = outputStream
+        self._TOKEN_REFRESH_MARGIN  = 300 # [s]
+        self._TOKEN_REFRESH_RETRY   = 30 # [s]
+
+        if (None == self._rateLimiter):
+            self._rateLimiter = RateLimiter()
+
+    async def _keepTokenAlive(self):
+        """Refresh the access token shortly before it expires, so a command
+        never waits for it.
+        """
+        while True:
+            delay = self._evecc.getTokenExpiresIn() - self._TOKEN_REFRESH_MARGIN
+
+            await asyncio.sleep(max(delay, self._TOKEN_REFRESH_RETRY))
+
+            try:
+                await self._evecc.refreshToken()
+            except Exception as ex:
+                _LOGGER.warning("Access token refresh failed: %s", ex)
+
+    async def _runSchedule(self):
+        """Submit the power limits of the schedule at their time. Entries,
+        which are already over, are skipped, except the one which applies now.
+        """
+        now = time.time()
+        entries = [entry for entry in self._schedule if now < entry[0]]
+        pastEntries = [entry for entry in self._schedule if now >= entry[0]]
+
+        if (0 < len(pastEntries)):
+            entries.insert(0, pastEntries[-1])
+
+        for timestamp, powerLimit, phases in entries:
+            await asyncio.sleep(max(0, timestamp - time.time()))
+
+            _LOGGER.info("Scheduled power limit: %d W, %d phase(s)", powerLimit, phases)
+            self._scheduler.submit(powerLimit, phases)
+
+    async def _readLine(self):
+        """Read the next line from the input stream, without blocking the
+        event loop.
+
+        Returns:
+            str: Line or empty string at the end of input.
+        """
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(None, self._inputStream.readline)
+
+    def _print(self, text):
+        print(text, file=self._outputStream, flush=True)
+
+    async def _processCommand(self, line):
+        """Process a single command line.
+
+        Args:
+            line (str): Command line
+
+        Returns:
+            bool: If the daemon shall continue, it will return True otherwise False.
+        """
+        isRunning = True
+        tokens = line.split()
+
+        if (0 == len(tokens)):
+            pass
+        elif ("quit" == tokens[0]):
+            isRunning = False
+        elif ("get" == tokens[0]):
+            status, circuitPowerLimit = await self._evecc.getCircuitPowerLimit()
+            self._print(circuitPowerLimit)
+        elif ("stats" == tokens[0]):
+            self._print(json.dumps(self._scheduler.getStatistics()))
+        elif ("telemetry" == tokens[0]):
+            if (None == self._telemetry):
+                _LOGGER.warning("Telemetry is not enabled.")
+            else:
+                self._print(json.dumps(self._telemetry.getSnapshot()))
+        else:
+            if ("set" == tokens[0]):
+                tokens = tokens[1:]
+
+            try:
+                powerLimit = int(tokens[0])
+            except (IndexError, ValueError):
+                _LOGGER.warning("Invalid command: %s", line.strip())
+            else:
+                self._scheduler.submit(powerLimit)
+
+        return isRunning
+
+    async def _subscribe(self):
+        """Subscribe to the charger observations. If it fails, the circuit
+        power limit is read from the cloud instead.
+        """
+        try:
+            if (SysExitStatus.SUCCESS != await self._evecc.subscribe(self._telemetry)):
+                _LOGGER.warning("Telemetry subscription failed.")
+        except Exception as ex:
+            _LOGGER.warning("Telemetry subscription failed: %s", ex)
+
+    async def run(self):
+        """Login, resolve site and circuit once and process commands until
+        the input ends.
+
+        Returns:
+            SysExitStatus: Status
+        """
+        status = await self._evecc.establishSession()
+        metricsServer = None
+
+        if ((SysExitStatus.SUCCESS == status) and (None != self._metricsPort)):
+            metricsServer = MetricsServer(getMetrics(), self._metricsPort)
+            await metricsServer.start()
+
+        if (SysExitStatus.SUCCESS == status):
+            self._scheduler = SetpointScheduler(self._evecc, self._rateLimiter)
+            keepAliveTask = asyncio.create_task(self._keepTokenAlive())
+            schedulerTask = asyncio.create_task(self._scheduler.run())
+            scheduleTask = None
+            isRunning = True
+
+            if (None != self._schedule):
+                scheduleTask = asyncio.create_task(self._runSchedule())
+
+            try:
+                if (None != self._telemetry):
+                    await self._subscribe()
+
+                while (True == isRunning):
+                    line = await self._readLine()
+
+                    if (0 == len(line)):
+                        isRunning = False
+
+                        if (None != scheduleTask):
+                            await scheduleTask
+                    else:
+                        try:
+                            isRunning = await self._processCommand(line)
+                        except Exception as ex:
+                            _LOGGER.error("Command failed: %s", ex)
+
+                await self._scheduler.flush()
+            finally:
+                keepAliveTask.cancel()
+                schedulerTask.cancel()
+
+                if (None != scheduleTask):
+                    scheduleTask.cancel()
+
+                await self._evecc.disconnect()
+
+                if (None != metricsServer):
+                    await metricsServer.stop()
+
+        return status
+
+################################################################################
+# Functions
+################################################################################
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,394 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import asyncio
+import time
+from datetime import datetime
+import aiohttp
+from pyeasee import Easee
+from pyeasee.easee import raise_for_status
+from pyeasee.exceptions import AuthorizationFailedException, ServerFailureException
+from .metrics import getMetrics
+from .tracer import getTracer
+from .retryPolicy import RetryPolicy, CloudUnavailableError, getDeadline, parseRetryAfter
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+_METRICS = getMetrics()
+
+_TRACER = getTracer()
+
+# Path segments, which are followed by a id.
+_ID_SEGMENTS = ("sites", "circuits", "chargers", "equalizers")
+
+################################################################################
+# Classes
+################################################################################
+
+class EaseeClient(Easee):
+    """Easee cloud client, which keeps its access token valid over a long
+    living session. The pyeasee client doesn't await the token refresh, so
+    an expired token is only noticed by a failed request.
+
+    With a token store, the token is reused by the next program run.
+
+    Failed requests (server failures, rate limit, timeouts and connection
+    errors) are repeated according to the retry policy, as long as the
+    deadline of the command allows it. While the circuit breaker is open,
+    no request is sent at all.
+    """
+
+    def __init__(self, username, password, tokenStore=None, baseUri=None, retryPolicy=None, circuitBreaker=None):
+        """Creates the Easee cloud client.
+
+        Args:
+            username (str): Easee cloud user login name
+            password (str): Easee cloud user login password
+            tokenStore (TokenStore, optional): Token store. Defaults to None.
+            baseUri (str, optional): Easee cloud base URI. Defaults to None, which means the official one.
+            retryPolicy (RetryPolicy, optional): Retry policy. Defaults to None, which means the default policy.
+            circuitBreaker (CircuitBreaker, optional): Circuit breaker. Defaults to None, which means requests are always sent.
+        """
+        super().__init__(username, password)
+
+        if (None != baseUri):
+            self.base = baseUri
+            self.sr_base = "%s/hubs/chargers" % baseUri
+
+        self._tokenStore        = tokenStore
+        self._tokenLock         = asyncio.Lock()
+        self._retryPolicy       = retryPolicy
+        self._circuitBreaker    = circuitBreaker
+
+        if (None == self._retryPolicy):
+            self._retryPolicy = RetryPolicy()
+
+        if (None != self._tokenStore):
+            self.token = self._tokenStore.load()
+
+    async def _handle_token_response(self, res):
+        """Take over the token from the login or refresh response and store it.
+
+        Args:
+            res (ClientResponse): Login or refresh response
+        """
+        await super()._handle_token_response(res)
+
+        if (None != self._tokenStore):
+            try:
+                self._tokenStore.save(self.token)
+            except OSError as ex:
+                _LOGGER.warning("Token not stored: %s", ex)
+
+    async def _verify_updated_token(self):
+        """Make sure there is a valid access token, before a request is sent.
+        Concurrent requests wait for a single login or refresh.
+        """
+        with _TRACER.span("verify token", "token"):
+            async with self._tokenLock:
+                if ("accessToken" not in self.token):
+                    await self.connect()
+                elif (self.token["expires"] < datetime.now()):
+                    await self._refresh_token()
+
+        self.headers["Authorization"] = "Bearer %s" % self.token["accessToken"]
+
+    def _observeRequest(self, endpoint, status, duration):
+        """Record a request in the metrics.
+
+        Args:
+            endpoint (str): Endpoint, e.g. "GET /api/sites/{id}"
+            status (int|str): HTTP status or "error", if no response was received.
+            duration (float): Duration in s
+        """
+        _METRICS.incCounter(
+            "evecc_cloud_requests_total",
+            "Number of Easee cloud requests.",
+            { "endpoint": endpoint, "status": status }
+        )
+        _METRICS.observe(
+            "evecc_cloud_request_duration_seconds",
+            "Duration of the Easee cloud requests.",
+            duration,
+            { "endpoint": endpoint }
+        )
+
+        if (429 == status):
+            _METRICS.incCounter(
+                "evecc_cloud_rate_limited_total",
+                "Number of Easee cloud requests, which were rejected by the rate limit.",
+                { "endpoint": endpoint }
+            )
+
+    async def _send(self, method, url, **kwargs):
+        """Send a single request and record it in the metrics.
+
+        Args:
+            method (str): HTTP method
+            url (str): Path of the REST API endpoint
+
+        Returns:
+            ClientResponse: Response
+        """
+        endpoint = getEndpoint(method, url)
+        status = "error"
+        timestamp = time.perf_counter()
+        timeout = aiohttp.ClientTimeout(total=self._getAttemptTimeout())
+
+        with _TRACER.span(endpoint, "http", { "url": url }) as span:
+            try:
+                response = await self.session.request(method, f"{self.base}{url}", headers=self.headers, timeout=timeout, **kwargs)
+                status = response.status
+            finally:
+                self._observeRequest(endpoint, status, time.perf_counter() - timestamp)
+                span.setArg("status", status)
+
+        return response
+
+    async def connect(self):
+        """Login and get the initial access token.
+        """
+        data = {
+            "userName": self.username,
+            "password": self.password
+        }
+
+        _LOGGER.debug("Login user %s", self.username)
+
+        response = await self._send("POST", "/api/accounts/token", json=data)
+        await raise_for_status(response)
+        await self._handle_token_response(response)
+
+    def _getAttemptTimeout(self):
+        """Get the max. duration of a single attempt, which is limited by the
+        deadline of the command.
+
+        Returns:
+            float: Timeout in s
+        """
+        timeout = self._retryPolicy.getRequestTimeout()
+        deadline = getDeadline()
+
+        # A timeout of 0 would disable it.
+        if (None != deadline):
+            timeout = max(0.001, min(timeout, deadline.getRemaining()))
+
+        return timeout
+
+    async def _attempt(self, method, url, **kwargs):
+        """Send a request once. If the access token is rejected, e.g. because
+        a stored token was revoked, login again and repeat the request once.
+
+        Args:
+            method (str): HTTP method
+            url (str): Path of the REST API endpoint
+
+        Returns:
+            ClientResponse: Response
+        """
+        await self._verify_updated_token()
+        response = await self._send(method, url, **kwargs)
+
+        if (401 == response.status):
+            _LOGGER.debug("Access token rejected, login again.")
+            response.release()
+            await self.connect()
+            await self._verify_updated_token()
+            response = await self._send(method, url, **kwargs)
+
+        return response
+
+    def _onOutcome(self, isFailed):
+        if (None != self._circuitBreaker):
+            if (True == isFailed):
+                self._circuitBreaker.onFailure()
+            else:
+                self._circuitBreaker.onSuccess()
+
+            _METRICS.setGauge(
+                "evecc_circuit_breaker_open",
+                "1 if the circuit breaker is open and requests fail fast, otherwise 0.",
+                0 if True == self._circuitBreaker.isAllowed() else 1
+            )
+
+    async def _request(self, method, url, **kwargs):
+        """Send a request. Server failures, rate limit responses, timeouts
+        and connection errors are repeated after a jittered exponential
+        backoff or the delay requested by Retry-After, unless the deadline
+        of the command would be exceeded.
+
+        Args:
+            method (str): HTTP method
+            url (str): Path of the REST API endpoint
+
+        Raises:
+            CloudUnavailableError: The circuit breaker is open.
+
+        Returns:
+            ClientResponse: Response
+        """
+        _LOGGER.debug("%s: %s (%s)", method, url, kwargs)
+
+        if ((None != self._circuitBreaker) and (False == self._circuitBreaker.isAllowed())):
+            _METRICS.incCounter("evecc_cloud_requests_rejected_total", "Number of requests, which were not sent, because the circuit breaker is open.")
+            raise CloudUnavailableError("Easee cloud unavailable, retry in %d s." % self._circuitBreaker.getRetryIn())
+
+        deadline = getDeadline()
+        retry = 0
+
+        while True:
+            response = None
+            error = None
+            retryAfter = None
+
+            try:
+                response = await self._attempt(method, url, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ServerFailureException) as ex:
+                # A failed login raises a server failure.
+                error = ex
+
+            if (None != response):
+                if (429 == response.status):
+                    retryAfter = parseRetryAfter(response.headers.get("Retry-After"))
+                elif (500 > response.status):
+                    break
+
+            # The rate limit is no sign of a degraded cloud.
+            isFailed = (None != error) or (500 <= response.status)
+            delay = self._retryPolicy.getDelay(retry, retryAfter)
+
+            if ((self._retryPolicy.getMaxRetries() <= retry) or ((None != deadline) and (deadline.getRemaining() <= delay))):
+                if (True == isFailed):
+                    self._onOutcome(True)
+
+                if (None != error):
+                    raise error
+
+                break
+
+            _LOGGER.debug("%s %s failed (%s), retry in %.2f s.", method, url, error if None != error else response.status, delay)
+            _METRICS.incCounter(
+                "evecc_cloud_retries_total",
+                "Number of repeated Easee cloud requests.",
+                { "endpoint": getEndpoint(method, url) }
+            )
+
+            if (None != response):
+                response.release()
+
+            with _TRACER.span("backoff", "retry", { "delay": round(delay, 3), "retry": retry + 1 }):
+                await asyncio.sleep(delay)
+            retry += 1
+
+        if ((429 != response.status) and (500 > response.status)):
+            self._onOutcome(False)
+
+        await raise_for_status(response)
+
+        return response
+
+    async def get(self, url, **kwargs):
+        return await self._request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self._request("POST", url, **kwargs)
+
+    async def put(self, url, **kwargs):
+        return await self._request("PUT", url, **kwargs)
+
+    async def delete(self, url, **kwargs):
+        return await self._request("DELETE", url, **kwargs)
+
+    async def _refresh_token(self):
+        """Refresh the access token. If the refresh token is rejected, a new
+        login is done.
+        """
+        data = {
+            "accessToken": self.token["accessToken"],
+            "refreshToken": self.token["refreshToken"]
+        }
+
+        _LOGGER.debug("Refreshing access token")
+
+        try:
+            response = await self._send("POST", "/api/accounts/refresh_token", json=data)
+            await raise_for_status(response)
+            await self._handle_token_response(response)
+        except AuthorizationFailedException:
+            _LOGGER.debug("Refresh token rejected, login again.")
+            await self.connect()
+
+    async def refreshToken(self):
+        """Refresh the access token or login, if there is no token yet.
+        """
+        if ("accessToken" not in self.token):
+            await self.connect()
+        else:
+            await self._refresh_token()
+
+    def getTokenExpiresIn(self):
+        """Get the remaining access token lifetime.
+
+        Returns:
+            float: Remaining lifetime in s, 0 if there is no token.
+        """
+        expiresIn = 0
+
+        if ("expires" in self.token):
+            expiresIn = max(0, (self.token["expires"] - datetime.now()).total_seconds())
+
+        return expiresIn
+
+################################################################################
+# Functions
+################################################################################
+
+def getEndpoint(method, url):
+    """Get the endpoint of a request, with placeholders instead of ids.
+
+    Args:
+        method (str): HTTP method
+        url (str): Path of the REST API endpoint, e.g. "/api/sites/1/circuits/2/settings"
+
+    Returns:
+        str: Endpoint, e.g. "POST /api/sites/{id}/circuits/{id}/settings"
+    """
+    segments = url.split("?")[0].split("/")
+
+    for index in range(1, len(segments)):
+        if (segments[index - 1] in _ID_SEGMENTS):
+            segments[index] = "{id}"
+
+    return "%s %s" % (method, "/".join(segments))
+
+################################################################################
+# Main
+################################################################################
+
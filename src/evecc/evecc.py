@@ -24,9 +24,21 @@
 # Imports
 ################################################################################
 import logging
-import pprint
+import asyncio
 from pyeasee import Easee, Charger, Site
-from enum import Enum
+from pyeasee.site import Circuit
+from pyeasee.exceptions import NotFoundException, TooManyRequestsException
+from .easeeClient import EaseeClient
+from .siteCache import SiteCache
+from .circuitState import CircuitState
+from .metrics import getMetrics
+from .tracer import getTracer
+from .chargeLogic import ChargeLogic
+from .history import HISTORY_SETPOINT, HISTORY_SKIPPED, HISTORY_READING
+from .sysExitStatus import SysExitStatus
+from .retryPolicy import CloudUnavailableError, Deadline, setDeadline, resetDeadline
+from .rateLimiter import RateLimiter
+from .chargerAllocator import CHARGER_OP_MODES_ACTIVE
 
 ################################################################################
 # Variables
@@ -34,20 +46,18 @@ from enum import Enum
 
 _LOGGER = logging.getLogger(__file__)
 
+_METRICS = getMetrics()
+
+_TRACER = getTracer()
+
 ################################################################################
 # Classes
 ################################################################################
 
-class SysExitStatus(Enum):
-    """System exit status codes, which will be returned to the console.
-    """
-    SUCCESS = 0,
-    FAILED = 1
-
 class EVECC:
     """Electric Vehicle Easee Charge Controller
     """
-    def __init__(self, username, password, siteKey, circuitPanelId):
+    def __init__(self, username, password, siteKey, circuitPanelId, siteCache=None, tokenStore=None, circuitState=None, deadband=0, isQuiet=False, baseUri=None, history=None, timeout=None, retryPolicy=None, circuitBreaker=None, chargerAllocator=None, rateLimiter=None):
         """Creates a EV Easee charger controller.
 
         Args:
@@ -55,27 +65,74 @@ class EVECC:
             password (str): Easee cloud user login password
             siteKey (str): Easee cloud registered site key
             circuitPanelId (int): Circuit panel id of the given site
+            siteCache (SiteCache, optional): Site and circuit id cache. Defaults to None, which means a in memory cache is used.
+            tokenStore (TokenStore, optional): Access token store. Defaults to None, which means a login is done every session.
+            circuitState (CircuitState, optional): Last known dynamic circuit currents. Defaults to None, which means a in memory state is used.
+            deadband (float, optional): Min. change of a phase current in A, which is written. Defaults to 0.
+            isQuiet (bool, optional): Log messages instead of printing them to the console. Defaults to False.
+            baseUri (str, optional): Easee cloud base URI. Defaults to None, which means the official one.
+            history (History, optional): Record the written and read phase currents. Defaults to None.
+            timeout (float, optional): Deadline of every command in s, including its retries. Defaults to None, which means unlimited.
+            retryPolicy (RetryPolicy, optional): Retry policy of a own session. Defaults to None, which means the default policy.
+            circuitBreaker (CircuitBreaker, optional): Circuit breaker of a own session. Defaults to None.
+            chargerAllocator (ChargerAllocator, optional): Split the power limit across the chargers of the circuit, instead of limiting the circuit. Defaults to None.
+            rateLimiter (RateLimiter, optional): Request budget of every charger in charger mode. Defaults to None, which means 20 requests per minute.
         """
         self._username          = username
         self._password          = password
         self._siteKey           = siteKey
         self._circuitPanelId    = circuitPanelId
         self._easee             = None
-        self._VOLTAGE           = 230 # [V]
-        self._PHASE_CURRENT_MAX = 16 # [A]
+        self._isSessionOwner    = True
+        self._site              = None
+        self._circuit           = None
+        self._siteCache         = siteCache
+        self._isCachedCircuit   = False
+        self._tokenStore        = tokenStore
+        self._circuitState      = circuitState
+        self._chargeLogic       = ChargeLogic(deadband)
+        self._isQuiet           = isQuiet
+        self._baseUri           = baseUri
+        self._telemetry         = None
+        self._history           = history
+        self._timeout           = timeout
+        self._retryPolicy       = retryPolicy
+        self._circuitBreaker    = circuitBreaker
+        self._chargerAllocator  = chargerAllocator
+        self._rateLimiter       = rateLimiter
+        self._chargers          = None
+        self._chargerCurrents   = {}
+
+        if (None == self._rateLimiter):
+            self._rateLimiter = RateLimiter()
+
+        if (None == self._siteCache):
+            self._siteCache = SiteCache()
+
+        if (None == self._circuitState):
+            self._circuitState = CircuitState()
     
-    async def _getSite(self, siteKey):
+    def _print(self, text):
+        if (True == self._isQuiet):
+            _LOGGER.info(text)
+        else:
+            print(text)
+
+    async def _getSite(self, siteKey, sites=None):
         """Find the site with the given site key and return it.
 
         Args:
             siteKey (str): The site key which identifies the site.
+            sites (list, optional): Already downloaded sites. Defaults to None, which means they are downloaded.
 
         Returns:
             dist: Site information
         """
         foundSite = None
 
-        sites = await self._easee.get_sites()
+        if (None == sites):
+            with _TRACER.span("get sites"):
+                sites = await self._easee.get_sites()
 
         for site in sites:
             if (siteKey == site["siteKey"]):
@@ -105,95 +162,598 @@ class EVECC:
 
         return foundCircuit
 
-    def _calcCircuitPowerLimit(self, settings):
-        """Calculate the circuit power limit, based on each phase current limitation.
+    def _record(self, kind, currents, powerLimit):
+        """Record the phase currents in the history, if there is one.
 
         Args:
-            settings (dict): EASEE cloud response
-
-        Returns:
-            int: Circuit power limit in W
+            kind (int): Record kind, e.g. HISTORY_SETPOINT.
+            currents (list): Phase 1, 2 and 3 current in A
+            powerLimit (float): Circuit power limit in W
         """
-        phase1PowerLimit = self._VOLTAGE * settings["dynamicCircuitCurrentP1"]
-        phase2PowerLimit = self._VOLTAGE * settings["dynamicCircuitCurrentP2"]
-        phase3PowerLimit = self._VOLTAGE * settings["dynamicCircuitCurrentP3"]
-
-        return phase1PowerLimit + phase2PowerLimit + phase3PowerLimit
+        if (None != self._history):
+            try:
+                self._history.append(kind, self._site.id, self._circuit.id, currents, powerLimit)
+            except OSError as ex:
+                _LOGGER.warning("History not written: %s", ex)
 
-    async def _setCircuitPowerLimit(self, circuit, powerLimit):
+    async def _setCircuitPowerLimit(self, circuit, powerLimit, phases=None):
         """Set the circuit power limit and determines 1 or 3 phase charging.
+        If the phase currents don't change, nothing is written.
 
         Args:
             circuit (dict): Circuit information
             powerLimit (int): Circuit power limit in W
+            phases (int, optional): Charge with 1 or 3 phases. Defaults to None, which means it depends on the power limit.
         """
-        phasePowerMax       = self._VOLTAGE * self._PHASE_CURRENT_MAX
-        phase1CurrentLimit  = None
-        phase2CurrentLimit  = None
-        phase3CurrentLimit  = None
+        lastCurrents = self._circuitState.getCurrents(self._siteKey, self._circuitPanelId)
+        currents, isWrite, isPhaseSwitch = self._chargeLogic.decide(powerLimit, phases, lastCurrents)
 
-        # Charging single phase enough?
-        if (powerLimit <= phasePowerMax):
-            phase1CurrentLimit = powerLimit / self._VOLTAGE
-            phase2CurrentLimit = 0
-            phase3CurrentLimit = 0
+        if (0 == currents[1]):
+            self._print("Single phase loading enabled: %d A" % currents[0])
+        else:
+            self._print("Triple phase loading enabled: %d A per phase" % currents[0])
 
-            print("Single phase loading enabled: %d A" % phase1CurrentLimit)
+        if (False == isWrite):
+            _LOGGER.info("Phase currents unchanged, nothing written.")
+            _METRICS.incCounter("evecc_writes_skipped_total", "Number of circuit power limits, which were not written, because unchanged.")
+            self._record(HISTORY_SKIPPED, currents, powerLimit)
         else:
-            # Charging over all three phases is necessary
-            phase1CurrentLimit  = powerLimit / (3 * self._VOLTAGE)
-            phase2CurrentLimit  = powerLimit / (3 * self._VOLTAGE)
-            phase3CurrentLimit  = powerLimit / (3 * self._VOLTAGE)
+            # The written currents are unknown, if the request fails.
+            self._circuitState.invalidate(self._siteKey, self._circuitPanelId)
 
-            print("Triple phase loading enabled: %d A per phase" % phase1CurrentLimit)
+            try:
+                with _TRACER.span("write circuit settings", args={ "currents": currents }):
+                    await circuit.set_dynamic_current(currents[0], currents[1], currents[2])
+            finally:
+                # Observations, which were pushed before the write, are outdated.
+                if (None != self._telemetry):
+                    self._telemetry.invalidateCircuitCurrents()
 
-        await circuit.set_dynamic_current(phase1CurrentLimit, phase2CurrentLimit, phase3CurrentLimit)
+            self._circuitState.setCurrents(self._siteKey, self._circuitPanelId, currents)
+            self._record(HISTORY_SETPOINT, currents, powerLimit)
 
-    async def getCircuitPowerLimit(self):
+            if (True == isPhaseSwitch):
+                _METRICS.incCounter("evecc_phase_switches_total", "Number of switches between single and triple phase charging.")
+
+        self._circuitState.save()
+
+    async def _resolve(self, isCacheUsed, sites=None):
+        """Resolve the site and the circuit. If the ids are cached, the site
+        discovery is skipped, otherwise the discovered ids are cached.
+
+        Args:
+            isCacheUsed (bool): Use cached ids (True) or discover them (False).
+            sites (list, optional): Already downloaded sites. Defaults to None, which means they are downloaded if necessary.
+
+        Returns:
+            SysExitStatus: Status
+        """
         status = SysExitStatus.SUCCESS
-        settings = None
-        circuitPowerLimit = 0
+        siteId = None
+        circuitId = None
 
-        self._easee = Easee(self._username, self._password)
-        site = await self._getSite(self._siteKey)
-        
-        if (None == site):
-            print("No site with key %s found." % self._siteKey)
-            status = SysExitStatus.FAILED
+        if (True == isCacheUsed):
+            siteId, circuitId = self._siteCache.get(self._siteKey, self._circuitPanelId)
+
+        if (None != circuitId):
+            _LOGGER.info("Site id %d and circuit id %d cached.", siteId, circuitId)
+            self._site = Site({ "id": siteId, "name": self._siteKey }, self._easee)
+            self._circuit = Circuit({ "id": circuitId, "circuitPanelId": self._circuitPanelId }, self._site, self._easee)
+            self._isCachedCircuit = True
         else:
-            _LOGGER.info("Site: %s", site["createdOn"])
-            circuit = self._getCircuit(site, self._circuitPanelId)
+            site = await self._getSite(self._siteKey, sites)
 
-            if (None == circuit):
-                print("No circuit with panel id %s found." % self._circuitPanelId)
+            if (None == site):
+                self._print("No site with key %s found." % self._siteKey)
                 status = SysExitStatus.FAILED
             else:
-                settings = await (await self._easee.get(f"/api/sites/{site.id}/circuits/{circuit.id}/settings")).json()
-                circuitPowerLimit = self._calcCircuitPowerLimit(settings)
+                _LOGGER.info("Site: %s", site["createdOn"])
+                circuit = self._getCircuit(site, self._circuitPanelId)
+
+                if (None == circuit):
+                    self._print("No circuit with panel id %s found." % self._circuitPanelId)
+                    status = SysExitStatus.FAILED
+                else:
+                    self._site = site
+                    self._circuit = circuit
+                    self._isCachedCircuit = False
+                    self._siteCache.set(self._siteKey, self._circuitPanelId, site.id, circuit.id)
+                    self._siteCache.save()
 
-        await self._easee.close()
+        return status
 
-        return status, circuitPowerLimit
+    async def _requestCircuit(self, request):
+        """Run a request on the resolved circuit. If the circuit is not found
+        and its ids were cached, they are outdated. In this case the site and
+        the circuit are discovered again and the request is repeated.
 
-    async def setCircuitPowerLimit(self, powerLimit):
+        Args:
+            request (coroutine function): Request, called with the site and the circuit.
+
+        Returns:
+            SysExitStatus, any: Status and request result
+        """
         status = SysExitStatus.SUCCESS
-        self._easee = Easee(self._username, self._password)
-        site = await self._getSite(self._siteKey)
-        
-        if (None == site):
-            print("No site with key %s found." % self._siteKey)
+        result = None
+
+        try:
+            result = await request(self._site, self._circuit)
+        except NotFoundException:
+            if (False == self._isCachedCircuit):
+                raise
+
+            _LOGGER.info("Cached site id and circuit id are outdated.")
+            self._siteCache.invalidate(self._siteKey, self._circuitPanelId)
+            self._siteCache.save()
+
+            status = await self._resolve(False)
+
+            if (SysExitStatus.SUCCESS == status):
+                result = await request(self._site, self._circuit)
+
+        return status, result
+
+    async def _getCircuitSettings(self, site, circuit):
+        """Get the circuit settings.
+
+        Args:
+            site (dict): Site information
+            circuit (dict): Circuit information
+
+        Returns:
+            dict: EASEE cloud response
+        """
+        with _TRACER.span("read circuit settings"):
+            return await (await self._easee.get(self._getCircuitSettingsEndpoint(site, circuit))).json()
+
+    async def _getChargerIds(self, site, circuit):
+        """Get the ids of the chargers on the circuit. A circuit, which was
+        built from cached ids, doesn't know them, so the site details are
+        downloaded.
+
+        Args:
+            site (dict): Site information
+            circuit (dict): Circuit information
+
+        Returns:
+            list: Charger ids
+        """
+        if ("chargers" not in circuit):
+            site = await self._easee.get_site(site.id)
+            circuit = None
+
+            for siteCircuit in site.get_circuits():
+                if (self._circuit.id == siteCircuit.id):
+                    circuit = siteCircuit
+                    break
+
+            if (None == circuit):
+                raise NotFoundException("Circuit %d not found." % self._circuit.id)
+
+        return [charger["id"] for charger in circuit["chargers"]]
+
+    def _getCircuitSettingsEndpoint(self, site, circuit):
+        return f"/api/sites/{site.id}/circuits/{circuit.id}/settings"
+
+    def getCircuitSettingsEndpoint(self):
+        """Get the circuit settings endpoint of the resolved circuit.
+
+        Returns:
+            str: Circuit settings endpoint or None, if not connected.
+        """
+        endpoint = None
+
+        if (True == self.isConnected()):
+            endpoint = self._getCircuitSettingsEndpoint(self._site, self._circuit)
+
+        return endpoint
+
+    def getPhasePowerMax(self):
+        """Get the max. power of a single phase.
+
+        Returns:
+            int: Max. phase power in W
+        """
+        return self._chargeLogic.getPhasePowerMax()
+
+    def isCircuitPowerLimitChanged(self, powerLimit, phases=None):
+        """Would the circuit power limit change the last known phase currents
+        by more than the deadband?
+
+        Args:
+            powerLimit (int): Circuit power limit in W
+            phases (int, optional): Charge with 1 or 3 phases. Defaults to None, which means it depends on the power limit.
+
+        Returns:
+            bool: If it needs to be written, it will return True otherwise False.
+        """
+        isChanged = True
+
+        # In charger mode, it depends on the active chargers.
+        if (False == self.isChargerMode()):
+            lastCurrents = self._circuitState.getCurrents(self._siteKey, self._circuitPanelId)
+            currents = self._chargeLogic.calcPhaseCurrentLimits(powerLimit, phases)
+            isChanged = self._chargeLogic.isChanged(currents, lastCurrents)
+
+        return isChanged
+
+    async def connect(self, easee=None, sites=None):
+        """Login to the Easee cloud and resolve the site and the circuit.
+        The session is kept alive until disconnect() is called.
+
+        Args:
+            easee (EaseeClient, optional): Session shared with other controllers. Defaults to None, which means a own session is used.
+            sites (list, optional): Already downloaded sites. Defaults to None, which means they are downloaded if necessary.
+
+        Returns:
+            SysExitStatus: Status
+        """
+        if (None == easee):
+            self._easee = EaseeClient(self._username, self._password, self._tokenStore, self._baseUri, self._retryPolicy, self._circuitBreaker)
+            self._isSessionOwner = True
+        else:
+            self._easee = easee
+            self._isSessionOwner = False
+
+        with _TRACER.span("resolve site and circuit") as span:
+            status = await self._resolve(True, sites)
+            span.setArg("cached", self._isCachedCircuit)
+
+        if (SysExitStatus.SUCCESS != status):
+            await self.disconnect()
+
+        return status
+
+    async def disconnect(self):
+        """Close the Easee cloud session, unless it is shared.
+        """
+        if ((None != self._easee) and (True == self._isSessionOwner)):
+            await self._easee.close()
+
+        self._easee = None
+        self._site = None
+        self._circuit = None
+        self._telemetry = None
+        self._chargers = None
+
+    async def subscribe(self, telemetry):
+        """Subscribe to the observations of all chargers on the circuit,
+        which the Easee cloud pushes via its stream. As long as the stream
+        is connected, the circuit power limit is read from the snapshot
+        instead of the cloud.
+
+        Args:
+            telemetry (Telemetry): Snapshot, which is updated by the stream.
+
+        Returns:
+            SysExitStatus: Status
+        """
+        status = SysExitStatus.SUCCESS
+        chargerIds = []
+
+        if (False == self.isConnected()):
             status = SysExitStatus.FAILED
         else:
-            _LOGGER.info("Site: %s", site["createdOn"])
-            circuit = self._getCircuit(site, self._circuitPanelId)
+            status, chargerIds = await self._requestCircuit(self._getChargerIds)
 
-            if (None == circuit):
-                print("No circuit with panel id %s found." % self._circuitPanelId)
+        if (SysExitStatus.SUCCESS == status):
+            for chargerId in chargerIds:
+                _LOGGER.info("Subscribe to charger %s.", chargerId)
+                await self._easee.sr_subscribe(Charger({ "id": chargerId, "name": chargerId }, self._easee), telemetry.onObservation)
+
+            self._telemetry = telemetry
+
+        return status
+
+    def _getTelemetryCurrents(self):
+        """Get the dynamic circuit currents from the stream snapshot.
+
+        Returns:
+            list: Phase 1, 2 and 3 current in A or None, if not subscribed, the stream is disconnected or the currents are unknown yet or stale.
+        """
+        currents = None
+
+        if ((None != self._telemetry) and (True == self._easee.sr_is_connected())):
+            currents = self._telemetry.getCircuitCurrents()
+
+        return currents
+
+    async def _getChargerConfig(self, chargerId):
+        """Get the max. current and the number of phases of a charger. If its
+        configuration can't be read, the defaults of a circuit are used.
+
+        Args:
+            chargerId (str): Charger id
+
+        Returns:
+            dict: Charger with id, maxCurrent in A and phases
+        """
+        charger = {
+            "id": chargerId,
+            "maxCurrent": self._chargeLogic.getPhaseCurrentMax(),
+            "phases": 3
+        }
+
+        try:
+            config = await (await self._easee.get(f"/api/chargers/{chargerId}/config")).json()
+            charger["maxCurrent"] = config.get("maxChargerCurrent", charger["maxCurrent"])
+
+            # Phase mode 1 is locked to single phase.
+            if (1 == config.get("phaseMode")):
+                charger["phases"] = 1
+        except CloudUnavailableError:
+            raise
+        except Exception as ex:
+            _LOGGER.warning("Configuration of charger %s not read: %s", chargerId, ex)
+
+        return charger
+
+    async def _getChargerOpMode(self, chargerId):
+        """Get the operation mode of a charger from the stream snapshot or
+        by its state.
+
+        Args:
+            chargerId (str): Charger id
+
+        Returns:
+            int: Operation mode, see STATUS in pyeasee.charger.
+        """
+        opMode = None
+
+        if ((None != self._telemetry) and (True == self._easee.sr_is_connected())):
+            opMode = self._telemetry.getChargerOpMode(chargerId)
+
+        if (None == opMode):
+            state = await (await self._easee.get(f"/api/chargers/{chargerId}/state")).json()
+            opMode = state.get("chargerOpMode")
+
+        return opMode
+
+    async def _setChargerCurrent(self, chargerId, current):
+        """Set the dynamic current of a charger, within its own request budget.
+        If the current doesn't change, nothing is written.
+
+        Args:
+            chargerId (str): Charger id
+            current (float): Charger current in A
+        """
+        lastCurrent = self._chargerCurrents.get(chargerId)
+
+        if ((None != lastCurrent) and (False == self._chargeLogic.isChanged([current], [lastCurrent]))):
+            _METRICS.incCounter("evecc_charger_writes_skipped_total", "Number of charger currents, which were not written, because unchanged.")
+        else:
+            endpoint = f"/api/chargers/{chargerId}/settings"
+
+            with _TRACER.span("wait for budget", args={ "chargerId": chargerId }):
+                await self._rateLimiter.getBucket(endpoint).acquire()
+
+            # The written current is unknown, if the request fails.
+            self._chargerCurrents.pop(chargerId, None)
+            await self._easee.post(endpoint, json={ "dynamicChargerCurrent": current })
+            self._chargerCurrents[chargerId] = current
+            _METRICS.incCounter("evecc_charger_writes_total", "Number of written charger currents.")
+
+    async def _setChargerPowerLimit(self, site, circuit, powerLimit):
+        """Split the power limit across the active chargers of the circuit and
+        write the charger currents concurrently.
+
+        Args:
+            site (dict): Site information
+            circuit (dict): Circuit information
+            powerLimit (int): Circuit power limit in W
+        """
+        if (None == self._chargers):
+            with _TRACER.span("read charger configuration"):
+                chargerIds = await self._getChargerIds(site, circuit)
+                self._chargers = list(await asyncio.gather(*[self._getChargerConfig(chargerId) for chargerId in chargerIds]))
+
+        with _TRACER.span("read charger operation modes"):
+            opModes = await asyncio.gather(*[self._getChargerOpMode(charger["id"]) for charger in self._chargers])
+
+        activeChargers = [charger for charger, opMode in zip(self._chargers, opModes) if opMode in CHARGER_OP_MODES_ACTIVE]
+        currents = self._chargerAllocator.allocate(powerLimit, activeChargers)
+
+        for charger in self._chargers:
+            currents.setdefault(charger["id"], 0)
+            self._print("Charger %s: %d A" % (charger["id"], currents[charger["id"]]))
+
+        with _TRACER.span("write charger currents", args={ "currents": currents }):
+            results = await asyncio.gather(*[self._setChargerCurrent(chargerId, current) for chargerId, current in currents.items()], return_exceptions=True)
+
+        for result in results:
+            if (True == isinstance(result, BaseException)):
+                raise result
+
+    def isChargerMode(self):
+        """Is the power limit split across the chargers, instead of limiting
+        the circuit?
+
+        Returns:
+            bool: If in charger mode, it will return True otherwise False.
+        """
+        return None != self._chargerAllocator
+
+    def isConnected(self):
+        """Is a Easee cloud session established and the circuit resolved?
+
+        Returns:
+            bool: If connected, it will return True otherwise False.
+        """
+        return None != self._circuit
+
+    async def refreshToken(self):
+        """Refresh the access token of the established session.
+        """
+        if (None != self._easee):
+            await self._easee.refreshToken()
+
+    def getTokenExpiresIn(self):
+        """Get the remaining access token lifetime of the established session.
+
+        Returns:
+            float: Remaining lifetime in s
+        """
+        expiresIn = 0
+
+        if (None != self._easee):
+            expiresIn = self._easee.getTokenExpiresIn()
+
+        return expiresIn
+
+    async def _runWithDeadline(self, command, isOneShot):
+        """Run a command, whose cloud requests and retries share the deadline.
+
+        Args:
+            command (coroutine function): Command, which returns the status and its result.
+            isOneShot (bool): Connect before the command is run.
+
+        Returns:
+            SysExitStatus, any: Status and command result
+        """
+        status = SysExitStatus.SUCCESS
+        result = None
+        token = setDeadline(Deadline(self._timeout))
+
+        try:
+            if (True == isOneShot):
+                with _TRACER.span("connect"):
+                    status = await self.connect()
+
+            if (SysExitStatus.SUCCESS == status):
+                status, result = await command()
+        finally:
+            resetDeadline(token)
+
+        return status, result
+
+    async def _runCommand(self, name, command, defaultResult=None, isSessionKept=False):
+        """Run a command within its deadline. If no session is established,
+        a temporary one is used. A command, which exceeds the deadline, is
+        cancelled. While the circuit breaker is open, it fails fast. A rate
+        limit, which is still exceeded after the retries, is reported by its
+        own status, so the caller can repeat the command later. Errors of the
+        Easee cloud, e.g. a server failure or a lost connection, fail the
+        command.
+
+        Args:
+            name (str): Command name, which is traced.
+            command (coroutine function): Command, which returns the status and its result.
+            defaultResult (any, optional): Result, if the command fails. Defaults to None.
+            isSessionKept (bool, optional): Keep a session, which is established by the command. Defaults to False.
+
+        Returns:
+            SysExitStatus, any: Status and command result
+        """
+        status = SysExitStatus.SUCCESS
+        result = defaultResult
+        isOneShot = not self.isConnected()
+
+        with _TRACER.span(name, "command") as span:
+            try:
+                status, result = await asyncio.wait_for(self._runWithDeadline(command, isOneShot), self._timeout)
+            except asyncio.TimeoutError:
+                self._print("No response of the Easee cloud within %s s." % self._timeout)
+                _METRICS.incCounter("evecc_commands_timed_out_total", "Number of commands, which exceeded their deadline.")
+                status = SysExitStatus.TIMEOUT
+            except CloudUnavailableError as ex:
+                self._print(str(ex))
+                status = SysExitStatus.UNAVAILABLE
+            except TooManyRequestsException:
+                self._print("Easee cloud rate limit exceeded.")
+                status = SysExitStatus.RATE_LIMITED
+            except Exception as ex:
+                # Server failures, connection errors and any other HTTP error status.
+                self._print("Easee cloud request failed: %s" % (str(ex) or type(ex).__name__))
                 status = SysExitStatus.FAILED
-            else:
-                await self._setCircuitPowerLimit(circuit, powerLimit)
+            finally:
+                if ((True == isOneShot) and ((False == isSessionKept) or (SysExitStatus.SUCCESS != status))):
+                    with _TRACER.span("disconnect"):
+                        await self.disconnect()
+
+            span.setArg("status", status.name)
+
+        if (None == result):
+            result = defaultResult
+
+        return status, result
+
+    async def establishSession(self):
+        """Login to the Easee cloud and resolve the site and the circuit like
+        connect(), but within the deadline of a command and errors are
+        reported by the status. The session is kept alive until disconnect()
+        is called.
+
+        Returns:
+            SysExitStatus: Status
+        """
+        async def connected():
+            return SysExitStatus.SUCCESS, None
+
+        status, _ = await self._runCommand("connect", connected, isSessionKept=True)
+
+        return status
+
+    async def _getCircuitPowerLimit(self):
+        """Get the circuit power limit of the connected circuit.
+
+        Returns:
+            SysExitStatus, int: Status and circuit power limit in W
+        """
+        status = SysExitStatus.SUCCESS
+        settings = None
+        circuitPowerLimit = 0
+        currents = self._getTelemetryCurrents()
+
+        if (None != currents):
+            _METRICS.incCounter("evecc_telemetry_reads_total", "Number of circuit power limits, which were read from the stream snapshot.")
+            settings = {
+                "dynamicCircuitCurrentP1": currents[0],
+                "dynamicCircuitCurrentP2": currents[1],
+                "dynamicCircuitCurrentP3": currents[2]
+            }
+        else:
+            status, settings = await self._requestCircuit(self._getCircuitSettings)
+
+        if (SysExitStatus.SUCCESS == status):
+            currents = [
+                settings["dynamicCircuitCurrentP1"],
+                settings["dynamicCircuitCurrentP2"],
+                settings["dynamicCircuitCurrentP3"]
+            ]
+            circuitPowerLimit = self._chargeLogic.calcCircuitPowerLimit(currents)
+            self._circuitState.setCurrents(self._siteKey, self._circuitPanelId, currents)
+            self._circuitState.save()
+            self._record(HISTORY_READING, currents, circuitPowerLimit)
+
+        return status, circuitPowerLimit
+
+    async def getCircuitPowerLimit(self):
+        """Get the circuit power limit. If no session is established, a
+        temporary one is used.
+
+        Returns:
+            SysExitStatus, int: Status and circuit power limit in W
+        """
+        return await self._runCommand("getCircuitPowerLimit", self._getCircuitPowerLimit, 0)
+
+    async def setCircuitPowerLimit(self, powerLimit, phases=None):
+        """Set the circuit power limit. If no session is established, a
+        temporary one is used. In charger mode, it is split across the active
+        chargers and their phases are given by their configuration.
+
+        Args:
+            powerLimit (int): Circuit power limit in W
+            phases (int, optional): Charge with 1 or 3 phases. Defaults to None, which means it depends on the power limit.
+
+        Returns:
+            SysExitStatus: Status
+        """
+        if (True == self.isChargerMode()):
+            request = lambda site, circuit: self._setChargerPowerLimit(site, circuit, powerLimit)
+        else:
+            request = lambda site, circuit: self._setCircuitPowerLimit(circuit, powerLimit, phases)
 
-        await self._easee.close()
+        status, _ = await self._runCommand("setCircuitPowerLimit", lambda: self._requestCircuit(request))
 
         return status
 
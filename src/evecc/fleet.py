@@ -0,0 +1,742 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import asyncio
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import sys
+import time
+import zlib
+from .evecc import EVECC
+from .easeeClient import EaseeClient
+from .sysExitStatus import SysExitStatus
+from .siteCache import SiteCache
+from .circuitState import CircuitState
+from .rateLimiter import RateLimiter
+from .retryPolicy import RetryPolicy, CircuitBreaker
+from .setpointScheduler import SetpointScheduler
+from .metrics import MetricsServer, getMetrics
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+_METRICS = getMetrics()
+
+################################################################################
+# Classes
+################################################################################
+
+class FleetWorker():
+    """Controls the circuits of one shard in its own process with its own
+    event loop. Every account has its own session and circuit breaker, so a
+    failing account doesn't stall the others. The power limits of every
+    circuit are sent by its own setpoint scheduler, within the request budget
+    of its circuit settings endpoint.
+
+    The commands are received from the supervisor by a pipe. The results and
+    periodically the health and metrics are sent back by it.
+    """
+
+    def __init__(self, workerId, entries, connection, config):
+        """Creates the worker.
+
+        Args:
+            workerId (int): Worker id
+            entries (list): Circuits of the shard, each with siteKey, circuitPanelId and optional username and password.
+            connection (Connection): Pipe to the supervisor
+            config (dict): Configuration, see Fleet.
+        """
+        self._workerId              = workerId
+        self._entries               = entries
+        self._connection            = connection
+        self._config                = config
+        self._siteCache             = SiteCache()
+        self._circuitState          = CircuitState()
+        self._rateLimiter           = RateLimiter(config["rateLimit"])
+        self._sessions              = {}
+        self._circuits              = {}
+        self._schedulers            = {}
+        self._setpoints             = {}
+        self._tasks                 = set()
+        self._readTasks             = set()
+        self._connectedEvent        = asyncio.Event()
+        self._loopLag               = 0
+        self._RECONNECT_INTERVAL    = 60 # [s]
+
+    def _send(self, message):
+        try:
+            self._connection.send(message)
+        except (OSError, ValueError) as ex:
+            _LOGGER.warning("Worker %d: Supervisor not reachable: %s", self._workerId, ex)
+
+    def _startTask(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _getAccount(self, entry):
+        return entry.get("username", self._config["username"]), entry.get("password", self._config["password"])
+
+    async def _connectCircuit(self, username, password, easee, sites, entry):
+        """Resolve a circuit in the account session and start its setpoint
+        scheduler. A power limit, which was set before, is submitted.
+        """
+        key = getCircuitKey(entry)
+        evecc = EVECC(
+            username,
+            password,
+            entry["siteKey"],
+            entry["circuitPanelId"],
+            self._siteCache,
+            None,
+            self._circuitState,
+            self._config["deadband"],
+            isQuiet=True,
+            baseUri=self._config["baseUri"],
+            timeout=self._config["timeout"]
+        )
+
+        if (SysExitStatus.SUCCESS != await evecc.connect(easee, sites)):
+            _LOGGER.error("Worker %d: Circuit %d of site %s not found.", self._workerId, entry["circuitPanelId"], entry["siteKey"])
+        else:
+            self._circuits[key] = evecc
+            self._schedulers[key] = SetpointScheduler(evecc, self._rateLimiter)
+            self._startTask(self._schedulers[key].run())
+
+            if (key in self._setpoints):
+                self._schedulers[key].submit(self._setpoints.pop(key))
+
+    async def _connectAccount(self, username, password, entries):
+        """Login the account once and resolve its circuits with a single
+        download of its sites.
+        """
+        if (username not in self._sessions):
+            self._sessions[username] = EaseeClient(
+                username,
+                password,
+                baseUri=self._config["baseUri"],
+                retryPolicy=RetryPolicy(self._config["retries"]),
+                circuitBreaker=CircuitBreaker()
+            )
+
+        easee = self._sessions[username]
+
+        try:
+            sites = await asyncio.wait_for(easee.get_sites(), self._config["timeout"])
+
+            for entry in entries:
+                await self._connectCircuit(username, password, easee, sites, entry)
+        except Exception as ex:
+            _LOGGER.error("Worker %d: Account %s failed: %s", self._workerId, username, str(ex) or type(ex).__name__)
+
+    async def _keepConnected(self):
+        """Connect the circuits of the shard and try it again periodically
+        for the ones which failed.
+        """
+        while True:
+            accounts = {}
+
+            for entry in self._entries:
+                if (getCircuitKey(entry) not in self._circuits):
+                    accounts.setdefault(self._getAccount(entry), []).append(entry)
+
+            if (0 < len(accounts)):
+                await asyncio.gather(*[self._connectAccount(username, password, entries) for (username, password), entries in accounts.items()])
+
+            self._connectedEvent.set()
+            await asyncio.sleep(self._RECONNECT_INTERVAL)
+
+    def getHealth(self):
+        """Get the health of the worker.
+
+        Returns:
+            dict: Number of circuits, connected circuits, accounts, queued
+            setpoints, the event loop lag in s and the sum of the setpoint
+            scheduler statistics.
+        """
+        statistics = {}
+
+        for scheduler in self._schedulers.values():
+            for name, value in scheduler.getStatistics().items():
+                statistics[name] = statistics.get(name, 0) + value
+
+        return {
+            "workerId": self._workerId,
+            "pid": os.getpid(),
+            "circuits": len(self._entries),
+            "connected": len(self._circuits),
+            "accounts": len(self._sessions),
+            "loopLag": round(self._loopLag, 3),
+            "statistics": statistics
+        }
+
+    async def _report(self):
+        """Send the health and metrics to the supervisor periodically. The
+        supervisor considers the worker hanging, if they are missing.
+        """
+        loop = asyncio.get_running_loop()
+        interval = self._config["reportInterval"]
+
+        while True:
+            self._send({ "type": "report", "health": self.getHealth(), "metrics": _METRICS.export() })
+
+            # A saturated event loop wakes up late.
+            timestamp = loop.time()
+            await asyncio.sleep(interval)
+            self._loopLag = max(0, loop.time() - timestamp - interval)
+
+    async def _getPowerLimit(self, command):
+        """Read the circuit power limit and send the result. A read after
+        the start waits until the circuits are connected.
+
+        Args:
+            command (dict): Command
+        """
+        key = getCircuitKey(command)
+        result = { "type": "result", "id": command["id"], "status": SysExitStatus.FAILED.name, "powerLimit": None }
+
+        await self._connectedEvent.wait()
+
+        if (key not in self._circuits):
+            result["error"] = "Circuit not connected."
+        else:
+            try:
+                status, result["powerLimit"] = await self._circuits[key].getCircuitPowerLimit()
+                result["status"] = status.name
+            except Exception as ex:
+                result["error"] = str(ex) or type(ex).__name__
+
+        self._send(result)
+
+    def _processCommand(self, command):
+        """Process a command of the supervisor. The power limit of a circuit,
+        which is not connected yet, is submitted after it is connected.
+
+        Args:
+            command (dict): Command
+        """
+        key = getCircuitKey(command)
+
+        if ("get" == command["cmd"]):
+            task = asyncio.create_task(self._getPowerLimit(command))
+            self._readTasks.add(task)
+            task.add_done_callback(self._readTasks.discard)
+        elif ("set" == command["cmd"]):
+            if (key in self._schedulers):
+                self._schedulers[key].submit(command["powerLimit"])
+            else:
+                self._setpoints[key] = command["powerLimit"]
+
+    async def _finish(self):
+        """Wait for the outstanding reads and until the pending power limits
+        are sent, also the ones of circuits, which are still being connected.
+        """
+        if ((0 < len(self._readTasks)) or (0 < len(self._setpoints))):
+            await self._connectedEvent.wait()
+
+        await asyncio.gather(*list(self._readTasks))
+        await asyncio.gather(*[scheduler.flush() for scheduler in self._schedulers.values()])
+
+    async def run(self):
+        """Process the commands of the supervisor, until it requests to quit
+        or it is gone. Outstanding reads and pending power limits are
+        finished before, within the deadline.
+        """
+        loop = asyncio.get_running_loop()
+        isRunning = True
+
+        self._startTask(self._report())
+        self._startTask(self._keepConnected())
+
+        try:
+            while (True == isRunning):
+                try:
+                    command = await loop.run_in_executor(None, self._connection.recv)
+                except (EOFError, OSError):
+                    _LOGGER.warning("Worker %d: Supervisor is gone.", self._workerId)
+                    isRunning = False
+                else:
+                    if ("quit" == command["cmd"]):
+                        isRunning = False
+                    else:
+                        self._processCommand(command)
+
+            try:
+                await asyncio.wait_for(self._finish(), self._config["timeout"])
+            except asyncio.TimeoutError:
+                _LOGGER.warning("Worker %d: Outstanding commands not finished within %s s.", self._workerId, self._config["timeout"])
+        finally:
+            for task in list(self._tasks) + list(self._readTasks):
+                task.cancel()
+
+            for evecc in self._circuits.values():
+                await evecc.disconnect()
+
+            for easee in self._sessions.values():
+                await easee.close()
+
+            self._connection.close()
+
+class Fleet():
+    """Supervisor, which controls the circuits of many sites and accounts by
+    a pool of worker processes, so the throughput scales with the CPU cores.
+    Every site is assigned to a worker by the hash of its site key, so all
+    circuits of a site and their request budget are owned by a single worker.
+
+    The commands are read from stdin, one per line:
+    - <site-key> <circuit-panel-id> get     : Print the circuit power limit in W.
+    - <site-key> <circuit-panel-id> set <P> : Set the circuit power limit to P in W.
+    - <site-key> <circuit-panel-id> <P>     : Short form of set <P>.
+    - health                                : Print the health of every worker.
+    - quit                                  : Stop the fleet. End of input stops it too.
+
+    A worker, which crashed or stopped to report its health, is restarted
+    with a increasing delay and gets the last power limits of its circuits
+    again. The delay is reset, after the worker is healthy for a while. The metrics of all workers are served by the supervisor.
+    """
+
+    def __init__(self, entries, config, workerCount=None, inputStream=sys.stdin, outputStream=sys.stdout, metricsPort=None):
+        """Creates the fleet supervisor.
+
+        Args:
+            entries (list): Circuits, each with siteKey, circuitPanelId and optional username and password.
+            config (dict): Worker configuration with the default username and password, baseUri, deadband,
+                timeout, retries, rateLimit, reportInterval in s and loglevel.
+            workerCount (int, optional): Number of worker processes. Defaults to None, which means one per CPU core.
+            inputStream (file, optional): Command input stream. Defaults to sys.stdin.
+            outputStream (file, optional): Result output stream. Defaults to sys.stdout.
+            metricsPort (int, optional): Serve the metrics of all workers on this local TCP port. Defaults to None.
+        """
+        self._entries               = entries
+        self._config                = config
+        self._workerCount           = workerCount
+        self._inputStream           = inputStream
+        self._outputStream          = outputStream
+        self._metricsPort           = metricsPort
+        self._workers               = []
+        self._shards                = []
+        self._keys                  = set()
+        self._setpoints             = {}
+        self._pending               = {}
+        self._nextId                = 0
+        self._isStopping            = False
+        self._context               = multiprocessing.get_context("spawn")
+        self._MAX_RESTART_DELAY     = 60 # [s]
+        self._HEALTHY_PERIOD        = 60 # [s]
+        self._STOP_TIMEOUT          = 30 # [s]
+
+        if (None == self._workerCount):
+            self._workerCount = os.cpu_count() or 1
+
+        # More workers than circuits would idle.
+        self._workerCount = max(1, min(self._workerCount, len(entries)))
+        self._shards = [[] for _ in range(self._workerCount)]
+
+        for entry in entries:
+            self._shards[getShard(entry["siteKey"], self._workerCount)].append(entry)
+            self._keys.add(getCircuitKey(entry))
+
+        for workerId in range(self._workerCount):
+            self._workers.append({
+                "process": None,
+                "connection": None,
+                "health": None,
+                "reportedAt": None,
+                "startedAt": None,
+                "restarts": 0,
+                "crashes": 0,
+                "restartAt": 0
+            })
+
+    def _print(self, text):
+        print(text, file=self._outputStream, flush=True)
+
+    def _send(self, workerId, command):
+        connection = self._workers[workerId]["connection"]
+
+        # A crashed worker is detected and restarted by the supervision.
+        if (None != connection):
+            try:
+                connection.send(command)
+            except (OSError, ValueError) as ex:
+                _LOGGER.debug("Worker %d not reachable: %s", workerId, ex)
+
+    def _startWorker(self, workerId):
+        """Start a worker process and submit the last power limits of its
+        circuits.
+
+        Args:
+            workerId (int): Worker id
+        """
+        worker = self._workers[workerId]
+        connection, workerConnection = self._context.Pipe()
+
+        worker["process"] = self._context.Process(
+            target=runWorker,
+            args=(workerId, self._shards[workerId], workerConnection, self._config),
+            name="evecc-worker-%d" % workerId,
+            daemon=True
+        )
+        worker["process"].start()
+        worker["connection"] = connection
+        worker["startedAt"] = time.monotonic()
+        worker["reportedAt"] = worker["startedAt"]
+        workerConnection.close()
+
+        _LOGGER.info("Worker %d started with %d circuits, pid %d.", workerId, len(self._shards[workerId]), worker["process"].pid)
+        _METRICS.setGauge("evecc_fleet_worker_up", "1 if the worker process is running, otherwise 0.", 1, { "worker": workerId })
+
+        for key, powerLimit in self._setpoints.items():
+            if (workerId == getShard(key[0], self._workerCount)):
+                self._send(workerId, { "cmd": "set", "siteKey": key[0], "circuitPanelId": key[1], "powerLimit": powerLimit })
+
+    def _stopWorker(self, workerId, reason):
+        """Stop a crashed or hanging worker and schedule its restart. Its
+        pending reads fail.
+
+        Args:
+            workerId (int): Worker id
+            reason (str): Reason, which is logged.
+        """
+        worker = self._workers[workerId]
+
+        if (True == worker["process"].is_alive()):
+            worker["process"].terminate()
+            worker["process"].join(1)
+
+            if (True == worker["process"].is_alive()):
+                worker["process"].kill()
+                worker["process"].join()
+
+        if (None != worker["connection"]):
+            worker["connection"].close()
+
+        worker["process"] = None
+        worker["connection"] = None
+        worker["restarts"] += 1
+        worker["crashes"] += 1
+        delay = min(self._MAX_RESTART_DELAY, 2 ** (worker["crashes"] - 1))
+        worker["restartAt"] = time.monotonic() + delay
+
+        _LOGGER.error("Worker %d %s, restart in %d s.", workerId, reason, delay)
+        _METRICS.incCounter("evecc_fleet_worker_restarts_total", "Number of restarted worker processes.", { "worker": workerId })
+        _METRICS.setGauge("evecc_fleet_worker_up", "1 if the worker process is running, otherwise 0.", 0, { "worker": workerId })
+
+        for id, (pendingWorkerId, result) in list(self._pending.items()):
+            if (workerId == pendingWorkerId):
+                del self._pending[id]
+                result["error"] = "Worker %s." % reason
+                self._print(json.dumps(result))
+
+    def _handleMessage(self, workerId, message):
+        """Handle a message of a worker.
+
+        Args:
+            workerId (int): Worker id
+            message (dict): Health report or command result
+        """
+        worker = self._workers[workerId]
+
+        if ("report" == message["type"]):
+            worker["health"] = message["health"]
+            worker["reportedAt"] = time.monotonic()
+
+            # A worker, which crashes soon after its start, shall not be restarted at once again.
+            if (self._HEALTHY_PERIOD <= (worker["reportedAt"] - worker["startedAt"])):
+                worker["crashes"] = 0
+
+            _METRICS.merge(message["metrics"], { "worker": workerId })
+            _METRICS.setGauge("evecc_fleet_circuits_connected", "Number of connected circuits of the worker.", message["health"]["connected"], { "worker": workerId })
+            _METRICS.setGauge("evecc_fleet_loop_lag_seconds", "Event loop lag of the worker.", message["health"]["loopLag"], { "worker": workerId })
+        elif ("result" == message["type"]):
+            if (message["id"] in self._pending):
+                _, result = self._pending.pop(message["id"])
+                result["status"] = message["status"]
+                result["powerLimit"] = message["powerLimit"]
+
+                if ("error" in message):
+                    result["error"] = message["error"]
+
+                self._print(json.dumps(result))
+
+    def _superviseWorkers(self):
+        """Restart the workers, which crashed or stopped to report, after
+        their restart delay.
+        """
+        now = time.monotonic()
+        healthTimeout = 3 * self._config["reportInterval"]
+
+        for workerId, worker in enumerate(self._workers):
+            if (None == worker["process"]):
+                if ((False == self._isStopping) and (now >= worker["restartAt"])):
+                    self._startWorker(workerId)
+            elif (True == self._isStopping):
+                pass
+            elif (False == worker["process"].is_alive()):
+                self._stopWorker(workerId, "crashed with exit code %s" % worker["process"].exitcode)
+            elif (healthTimeout < (now - worker["reportedAt"])):
+                self._stopWorker(workerId, "hangs")
+
+    async def _supervise(self):
+        """Receive the messages of the workers and supervise them, until all
+        workers stopped after the fleet is stopped.
+        """
+        loop = asyncio.get_running_loop()
+
+        while ((False == self._isStopping) or (True == any([(None != worker["process"]) and (True == worker["process"].is_alive()) for worker in self._workers]))):
+            connections = {}
+
+            for workerId, worker in enumerate(self._workers):
+                if (None != worker["connection"]):
+                    connections[worker["connection"]] = workerId
+
+            # The pipes are closed only here, never while being waited for.
+            for connection in await loop.run_in_executor(None, multiprocessing.connection.wait, list(connections), 0.5):
+                self._receive(connections[connection])
+
+            self._superviseWorkers()
+
+        # The last results may be sent just before a worker exits.
+        for workerId, worker in enumerate(self._workers):
+            if (None != worker["connection"]):
+                self._receive(workerId)
+
+    def _receive(self, workerId):
+        """Handle all received messages of a worker.
+
+        Args:
+            workerId (int): Worker id
+        """
+        connection = self._workers[workerId]["connection"]
+
+        try:
+            while (True == connection.poll()):
+                self._handleMessage(workerId, connection.recv())
+        except (EOFError, OSError):
+            # The worker exits, which is detected by the supervision.
+            connection.close()
+            self._workers[workerId]["connection"] = None
+
+    def getHealth(self):
+        """Get the health of every worker.
+
+        Returns:
+            list: Health of every worker, with its last report.
+        """
+        health = []
+
+        for workerId, worker in enumerate(self._workers):
+            health.append({
+                "workerId": workerId,
+                "isAlive": (None != worker["process"]) and (True == worker["process"].is_alive()),
+                "restarts": worker["restarts"],
+                "shard": len(self._shards[workerId]),
+                "report": worker["health"]
+            })
+
+        return health
+
+    async def _readLine(self):
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(None, self._inputStream.readline)
+
+    def _processCommand(self, line):
+        """Process a single command line.
+
+        Args:
+            line (str): Command line
+
+        Returns:
+            bool: If the fleet shall continue, it will return True otherwise False.
+        """
+        isRunning = True
+        tokens = line.split()
+
+        if (0 == len(tokens)):
+            pass
+        elif ("quit" == tokens[0]):
+            isRunning = False
+        elif ("health" == tokens[0]):
+            self._print(json.dumps(self.getHealth()))
+        else:
+            try:
+                key = (tokens[0], int(tokens[1]))
+                cmd = tokens[2]
+
+                if ("get" != cmd):
+                    if ("set" == cmd):
+                        tokens = tokens[1:]
+
+                    powerLimit = int(tokens[2])
+                    cmd = "set"
+            except (IndexError, ValueError):
+                _LOGGER.warning("Invalid command: %s", line.strip())
+            else:
+                workerId = getShard(key[0], self._workerCount)
+                command = { "cmd": cmd, "siteKey": key[0], "circuitPanelId": key[1] }
+
+                if (key not in self._keys):
+                    _LOGGER.warning("Circuit %d of site %s is not in the fleet.", key[1], key[0])
+                elif ("get" == cmd):
+                    self._nextId += 1
+                    command["id"] = self._nextId
+                    self._pending[command["id"]] = (workerId, {
+                        "siteKey": key[0],
+                        "circuitPanelId": key[1],
+                        "cmd": "getCircuitPowerLimit",
+                        "status": SysExitStatus.FAILED.name,
+                        "powerLimit": None
+                    })
+                    self._send(workerId, command)
+                else:
+                    # Kept to restore it, if the worker is restarted.
+                    self._setpoints[key] = powerLimit
+                    command["powerLimit"] = powerLimit
+                    self._send(workerId, command)
+
+        return isRunning
+
+    async def run(self):
+        """Start the workers and process commands until the input ends.
+        Afterwards the workers finish their outstanding commands and stop.
+        A read without result fails then.
+
+        Returns:
+            SysExitStatus: Status
+        """
+        metricsServer = None
+        isRunning = True
+
+        if (None != self._metricsPort):
+            metricsServer = MetricsServer(_METRICS, self._metricsPort)
+            await metricsServer.start()
+
+        for workerId in range(self._workerCount):
+            self._startWorker(workerId)
+
+        superviseTask = asyncio.create_task(self._supervise())
+
+        try:
+            while (True == isRunning):
+                line = await self._readLine()
+
+                if (0 == len(line)):
+                    isRunning = False
+                else:
+                    isRunning = self._processCommand(line)
+
+            self._isStopping = True
+
+            for workerId in range(self._workerCount):
+                self._send(workerId, { "cmd": "quit" })
+
+            # The workers finish their outstanding commands within the deadline.
+            stopTimeout = (self._config["timeout"] or 0) + self._STOP_TIMEOUT
+
+            try:
+                await asyncio.wait_for(asyncio.shield(superviseTask), stopTimeout)
+            except asyncio.TimeoutError:
+                _LOGGER.warning("Workers didn't stop within %d s.", stopTimeout)
+        finally:
+            superviseTask.cancel()
+
+            for worker in self._workers:
+                if ((None != worker["process"]) and (True == worker["process"].is_alive())):
+                    worker["process"].terminate()
+
+            for _, result in self._pending.values():
+                result["error"] = "No result before the fleet stopped."
+                self._print(json.dumps(result))
+
+            self._pending = {}
+
+            if (None != metricsServer):
+                await metricsServer.stop()
+
+        return SysExitStatus.SUCCESS
+
+################################################################################
+# Functions
+################################################################################
+
+def getShard(siteKey, workerCount):
+    """Get the worker of a site. The hash is stable, unlike the builtin one,
+    so a site keeps its worker after a restart.
+
+    Args:
+        siteKey (str): Site key
+        workerCount (int): Number of workers
+
+    Returns:
+        int: Worker id
+    """
+    return zlib.crc32(siteKey.encode("utf-8")) % workerCount
+
+def getCircuitKey(entry):
+    """Get the key, which identifies a circuit of a fleet file entry or a
+    command.
+
+    Args:
+        entry (dict): Entry with siteKey and circuitPanelId
+
+    Returns:
+        tuple: Site key and circuit panel id
+    """
+    return (entry["siteKey"], int(entry["circuitPanelId"]))
+
+def runWorker(workerId, entries, connection, config):
+    """Entry point of a worker process.
+
+    Args:
+        workerId (int): Worker id
+        entries (list): Circuits of the shard
+        connection (Connection): Pipe to the supervisor
+        config (dict): Configuration, see Fleet.
+    """
+    # The supervisor handles Ctrl-C and stops the workers.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    logging.basicConfig(
+        format="%(asctime)-15s %(name)-5s %(levelname)-8s %(message)s",
+        level=config["loglevel"],
+    )
+
+    # The default proactor event loop on Windows doesn't work with aiohttp.
+    if ("win32" == sys.platform):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    asyncio.run(FleetWorker(workerId, entries, connection, config).run())
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,323 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import math
+import mmap
+import os
+import struct
+import time
+from datetime import datetime
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+# File header: Magic and record size.
+_HEADER = struct.Struct("<8sI4x")
+_MAGIC = b"EVECCHST"
+
+# Record: Timestamp in s, site id, circuit id, kind, phase currents in cA
+# and power limit in W.
+_RECORD = struct.Struct("<dIIB3Hxf")
+
+# Record kinds
+HISTORY_SETPOINT    = 1 # Written phase currents
+HISTORY_SKIPPED     = 2 # Not written, because unchanged
+HISTORY_READING     = 3 # Phase currents read back
+
+_KIND_NAMES = {
+    HISTORY_SETPOINT:   "setpoint",
+    HISTORY_SKIPPED:    "skipped",
+    HISTORY_READING:    "reading"
+}
+
+################################################################################
+# Classes
+################################################################################
+
+class History():
+    """Append only log of the written and read back dynamic circuit currents,
+    with fixed size binary records. A record takes 28 byte, so a month of
+    one record per second takes about 73 MB.
+
+    Queries memory-map the file and find the time range by binary search, so
+    only the pages of the requested range are read. The records are expected
+    in ascending time order, like they are appended.
+    """
+
+    def __init__(self, fileName, clock=time.time):
+        """Creates the history.
+
+        Args:
+            fileName (str): History file name
+            clock (function, optional): Time source in s since epoch. Defaults to time.time.
+        """
+        self._fileName  = fileName
+        self._clock     = clock
+
+    def append(self, kind, siteId, circuitId, currents, powerLimit):
+        """Append a record. If the file doesn't exist, it is created. A
+        incomplete record at the end, e.g. after a crash while writing, is
+        removed before, so the records stay aligned.
+
+        Args:
+            kind (int): Record kind, e.g. HISTORY_SETPOINT.
+            siteId (int): Site id
+            circuitId (int): Circuit id
+            currents (list): Phase 1, 2 and 3 current in A
+            powerLimit (float): Requested or read back circuit power limit in W
+        """
+        record = _RECORD.pack(
+            self._clock(),
+            siteId,
+            circuitId,
+            kind,
+            *[min(max(0, round(current * 100)), 0xFFFF) for current in currents],
+            powerLimit
+        )
+
+        with open(self._fileName, "ab") as fd:
+            size = fd.seek(0, os.SEEK_END)
+
+            if (_HEADER.size > size):
+                fd.truncate(0)
+                fd.write(_HEADER.pack(_MAGIC, _RECORD.size))
+            elif (0 != ((size - _HEADER.size) % _RECORD.size)):
+                _LOGGER.warning("Incomplete record at the end of %s removed.", self._fileName)
+                fd.truncate(size - (size - _HEADER.size) % _RECORD.size)
+
+            fd.write(record)
+
+    def _open(self, fd):
+        """Memory-map the history file and check its header.
+
+        Args:
+            fd (file): Opened history file
+
+        Raises:
+            ValueError: No history file
+
+        Returns:
+            mmap, int: Memory map and number of complete records, the memory map is None if there are no records.
+        """
+        size = os.fstat(fd.fileno()).st_size
+        buffer = None
+        count = 0
+
+        if (_HEADER.size <= size):
+            header = fd.read(_HEADER.size)
+            magic, recordSize = _HEADER.unpack(header)
+
+            if ((_MAGIC != magic) or (_RECORD.size != recordSize)):
+                raise ValueError("%s is no history file." % self._fileName)
+
+            # A incomplete record at the end, e.g. after a power loss, is ignored.
+            count = (size - _HEADER.size) // _RECORD.size
+        elif (0 < size):
+            raise ValueError("%s is no history file." % self._fileName)
+
+        if (0 < count):
+            buffer = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return buffer, count
+
+    def _findIndex(self, buffer, count, timestamp):
+        """Find the first record, which is not older than the timestamp.
+
+        Args:
+            buffer (mmap): Memory mapped history file
+            count (int): Number of records
+            timestamp (float): Timestamp in s since epoch
+
+        Returns:
+            int: Record index
+        """
+        low = 0
+        high = count
+
+        while (low < high):
+            middle = (low + high) // 2
+
+            if (struct.unpack_from("<d", buffer, _HEADER.size + middle * _RECORD.size)[0] < timestamp):
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def getRecordCount(self):
+        """Get the number of records.
+
+        Returns:
+            int: Number of records, 0 if the file doesn't exist.
+        """
+        count = 0
+
+        try:
+            count = max(0, os.path.getsize(self._fileName) - _HEADER.size) // _RECORD.size
+        except FileNotFoundError:
+            pass
+
+        return count
+
+    def query(self, start=None, end=None, circuitId=None):
+        """Get the records of a time range.
+
+        Args:
+            start (float, optional): Start of the range in s since epoch. Defaults to None, which means the first record.
+            end (float, optional): End of the range in s since epoch, not included. Defaults to None, which means after the last record.
+            circuitId (int, optional): Only the records of this circuit. Defaults to None, which means all.
+
+        Raises:
+            ValueError: No history file
+
+        Yields:
+            dict: Record with timestamp, siteId, circuitId, kind, currents in A and powerLimit in W.
+        """
+        try:
+            fd = open(self._fileName, "rb")
+        except FileNotFoundError:
+            return
+
+        with fd:
+            buffer, count = self._open(fd)
+
+            if (None == buffer):
+                return
+
+            with buffer:
+                first = 0
+                last = count
+
+                if (None != start):
+                    first = self._findIndex(buffer, count, start)
+
+                if (None != end):
+                    last = self._findIndex(buffer, count, end)
+
+                for index in range(first, last):
+                    timestamp, siteId, recordCircuitId, kind, currentP1, currentP2, currentP3, powerLimit = _RECORD.unpack_from(
+                        buffer,
+                        _HEADER.size + index * _RECORD.size
+                    )
+
+                    if ((None == circuitId) or (circuitId == recordCircuitId)):
+                        yield {
+                            "timestamp": timestamp,
+                            "siteId": siteId,
+                            "circuitId": recordCircuitId,
+                            "kind": _KIND_NAMES.get(kind, kind),
+                            "currents": [currentP1 / 100, currentP2 / 100, currentP3 / 100],
+                            "powerLimit": powerLimit
+                        }
+
+    def aggregate(self, interval, start=None, end=None, circuitId=None):
+        """Downsample the records of a time range into intervals, separately
+        per circuit.
+
+        Args:
+            interval (float): Interval length in s
+            start (float, optional): Start of the range in s since epoch. Defaults to None, which means the first record.
+            end (float, optional): End of the range in s since epoch, not included. Defaults to None, which means after the last record.
+            circuitId (int, optional): Only the records of this circuit. Defaults to None, which means all.
+
+        Raises:
+            ValueError: No history file or the interval is not greater than 0.
+
+        Returns:
+            list: Per interval and circuit: start, siteId, circuitId, number of records and setpoints, min., mean and max. powerLimit in W and mean currents in A.
+        """
+        aggregates = []
+        openAggregates = {}
+
+        if ((False == math.isfinite(interval)) or (0 >= interval)):
+            raise ValueError("Interval %s s is not greater than 0." % interval)
+
+        for record in self.query(start, end, circuitId):
+            intervalStart = record["timestamp"] - (record["timestamp"] % interval)
+            aggregate = openAggregates.get(record["circuitId"])
+
+            if ((None == aggregate) or (aggregate["start"] != intervalStart)):
+                aggregate = {
+                    "start": intervalStart,
+                    "siteId": record["siteId"],
+                    "circuitId": record["circuitId"],
+                    "count": 0,
+                    "setpoints": 0,
+                    "powerLimitMin": record["powerLimit"],
+                    "powerLimitMean": 0,
+                    "powerLimitMax": record["powerLimit"],
+                    "currentsMean": [0, 0, 0]
+                }
+                openAggregates[record["circuitId"]] = aggregate
+                aggregates.append(aggregate)
+
+            aggregate["count"] += 1
+
+            if ("setpoint" == record["kind"]):
+                aggregate["setpoints"] += 1
+
+            aggregate["powerLimitMin"] = min(aggregate["powerLimitMin"], record["powerLimit"])
+            aggregate["powerLimitMax"] = max(aggregate["powerLimitMax"], record["powerLimit"])
+            aggregate["powerLimitMean"] += record["powerLimit"]
+
+            for phase in range(3):
+                aggregate["currentsMean"][phase] += record["currents"][phase]
+
+        for aggregate in aggregates:
+            aggregate["powerLimitMean"] = round(aggregate["powerLimitMean"] / aggregate["count"], 1)
+            aggregate["currentsMean"] = [round(current / aggregate["count"], 2) for current in aggregate["currentsMean"]]
+
+        return aggregates
+
+################################################################################
+# Functions
+################################################################################
+
+def parseTimestamp(text):
+    """Parse a timestamp.
+
+    Args:
+        text (str): Timestamp in s since epoch or as ISO 8601 date time, in local time if without offset.
+
+    Raises:
+        ValueError: Invalid timestamp
+
+    Returns:
+        float: Timestamp in s since epoch
+    """
+    try:
+        timestamp = float(text)
+    except ValueError:
+        timestamp = datetime.fromisoformat(text).timestamp()
+
+    return timestamp
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,147 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import json
+import os
+import tempfile
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+################################################################################
+# Classes
+################################################################################
+
+class JsonStore():
+    """Entries per circuit, which are kept in memory and optionally stored
+    in a JSON file for the next program run.
+    """
+
+    def __init__(self, fileName=None, title="JSON store"):
+        """Creates the store and loads the entries from the file.
+
+        Args:
+            fileName (str, optional): File name. Defaults to None, which means the entries are in memory only.
+            title (str, optional): Title of the store in log messages. Defaults to "JSON store".
+        """
+        self._fileName  = fileName
+        self._title     = title
+        self._entries   = {}
+
+        self._load()
+
+    def _getKey(self, siteKey, circuitPanelId):
+        return "%s/%d" % (siteKey, circuitPanelId)
+
+    def _load(self):
+        """Load the entries from the file. A missing or invalid file results
+        in a empty store.
+        """
+        if (None != self._fileName):
+            try:
+                with open(self._fileName, "r", encoding="utf-8") as fd:
+                    self._entries = json.load(fd)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as ex:
+                _LOGGER.warning("%s %s ignored: %s", self._title, self._fileName, ex)
+
+            if (False == isinstance(self._entries, dict)):
+                self._entries = {}
+
+    def save(self):
+        """Store the entries in the file. A failure is only logged, because
+        the entries are kept in memory too.
+        """
+        if (None != self._fileName):
+            try:
+                saveJsonFile(self._fileName, self._entries, indent=4)
+            except OSError as ex:
+                _LOGGER.warning("%s not stored: %s", self._title, ex)
+
+################################################################################
+# Functions
+################################################################################
+
+def saveJsonFile(fileName, data, indent=None, dirMode=0o777):
+    """Store the data in a JSON file, which is replaced atomically, see
+    saveTextFile(). The file is only accessible by the owner.
+
+    Args:
+        fileName (str): File name
+        data (any): JSON serializable data
+        indent (int, optional): Indentation of the JSON text. Defaults to None, which means compact.
+        dirMode (int, optional): Mode of a created directory. Defaults to 0o777, which is reduced by the umask.
+
+    Raises:
+        OSError: File not stored
+    """
+    saveTextFile(fileName, json.dumps(data, indent=indent), dirMode)
+
+def saveTextFile(fileName, text, dirMode=0o777, fileMode=None):
+    """Store the text in a file, which is replaced atomically. The text is
+    written to a unique temporary file in the same directory first, so
+    concurrent writers never mix their data and a reader never sees a
+    partial file.
+
+    Args:
+        fileName (str): File name
+        text (str): Text
+        dirMode (int, optional): Mode of a created directory. Defaults to 0o777, which is reduced by the umask.
+        fileMode (int, optional): Mode of the file. Defaults to None, which means only accessible by the owner.
+
+    Raises:
+        OSError: File not stored
+    """
+    dirName = os.path.dirname(fileName)
+
+    if (0 < len(dirName)):
+        os.makedirs(dirName, mode=dirMode, exist_ok=True)
+
+    fd, tmpFileName = tempfile.mkstemp(prefix=os.path.basename(fileName) + ".", suffix=".tmp", dir=os.path.dirname(os.path.abspath(fileName)))
+
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fileObj:
+            fileObj.write(text)
+
+        if (None != fileMode):
+            os.chmod(tmpFileName, fileMode)
+
+        os.replace(tmpFileName, fileName)
+    except BaseException:
+        try:
+            os.remove(tmpFileName)
+        except OSError:
+            pass
+
+        raise
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,272 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+from .jsonStore import saveTextFile
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+_DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10) # [s]
+
+_metrics = None
+
+################################################################################
+# Classes
+################################################################################
+
+class Histogram():
+    """Histogram with cumulative buckets, like Prometheus uses it.
+    """
+
+    def __init__(self, buckets):
+        """Creates a empty histogram.
+
+        Args:
+            buckets (tuple): Upper bounds of the buckets in ascending order.
+        """
+        self.buckets    = buckets
+        self.counts     = [0] * len(buckets)
+        self.count      = 0
+        self.sum        = 0
+
+    def observe(self, value):
+        """Add a value.
+
+        Args:
+            value (float): Value
+        """
+        for index, upperBound in enumerate(self.buckets):
+            if (value <= upperBound):
+                self.counts[index] += 1
+
+        self.count += 1
+        self.sum += value
+
+class Metrics():
+    """Counters, gauges and histograms of the cloud requests and the control
+    decisions. They are provided in the Prometheus text format.
+    """
+
+    def __init__(self):
+        """Creates empty metrics.
+        """
+        self._help          = {}
+        self._types         = {}
+        self._values        = {}
+
+    def _getKey(self, name, labels):
+        return (name, tuple(sorted(labels.items())) if (None != labels) else ())
+
+    def _register(self, name, type, help):
+        if (name not in self._types):
+            self._types[name] = type
+            self._help[name] = help
+
+    def incCounter(self, name, help, labels=None, value=1):
+        """Increase a counter.
+
+        Args:
+            name (str): Metric name
+            help (str): Metric description
+            labels (dict, optional): Labels. Defaults to None.
+            value (float, optional): Increment. Defaults to 1.
+        """
+        key = self._getKey(name, labels)
+
+        self._register(name, "counter", help)
+        self._values[key] = self._values.get(key, 0) + value
+
+    def setGauge(self, name, help, value, labels=None):
+        """Set a gauge.
+
+        Args:
+            name (str): Metric name
+            help (str): Metric description
+            value (float): Value
+            labels (dict, optional): Labels. Defaults to None.
+        """
+        self._register(name, "gauge", help)
+        self._values[self._getKey(name, labels)] = value
+
+    def observe(self, name, help, value, labels=None, buckets=_DURATION_BUCKETS):
+        """Add a value to a histogram.
+
+        Args:
+            name (str): Metric name
+            help (str): Metric description
+            value (float): Value
+            labels (dict, optional): Labels. Defaults to None.
+            buckets (tuple, optional): Upper bounds of the buckets. Defaults to durations in s.
+        """
+        key = self._getKey(name, labels)
+
+        self._register(name, "histogram", help)
+
+        if (key not in self._values):
+            self._values[key] = Histogram(buckets)
+
+        self._values[key].observe(value)
+
+    def export(self):
+        """Get all metrics, e.g. to send them to another process.
+
+        Returns:
+            dict: Help texts, types and values
+        """
+        return { "help": dict(self._help), "types": dict(self._types), "values": dict(self._values) }
+
+    def merge(self, exported, labels):
+        """Take over the metrics of another process, e.g. of a fleet worker.
+        They replace the previously taken over ones with the same labels.
+
+        Args:
+            exported (dict): Metrics, see export().
+            labels (dict): Labels, which identify the other process.
+        """
+        for name, type in exported["types"].items():
+            self._register(name, type, exported["help"][name])
+
+        for key, value in exported["values"].items():
+            self._values[self._getKey(key[0], dict(key[1], **labels))] = value
+
+    def _formatLabels(self, labels, extraLabels=()):
+        labels = labels + extraLabels
+        text = ""
+
+        if (0 < len(labels)):
+            text = "{" + ",".join(["%s=\"%s\"" % (label, str(value).replace("\\", "\\\\").replace("\"", "\\\"")) for label, value in labels]) + "}"
+
+        return text
+
+    def render(self):
+        """Get all metrics in the Prometheus text format.
+
+        Returns:
+            str: Metrics
+        """
+        lines = []
+
+        for name in sorted(self._types):
+            lines.append("# HELP %s %s" % (name, self._help[name]))
+            lines.append("# TYPE %s %s" % (name, self._types[name]))
+
+            for key in sorted(self._values):
+                if (name == key[0]):
+                    value = self._values[key]
+
+                    if ("histogram" == self._types[name]):
+                        for upperBound, count in zip(value.buckets, value.counts):
+                            lines.append("%s_bucket%s %d" % (name, self._formatLabels(key[1], (("le", upperBound),)), count))
+
+                        lines.append("%s_bucket%s %d" % (name, self._formatLabels(key[1], (("le", "+Inf"),)), value.count))
+                        lines.append("%s_sum%s %f" % (name, self._formatLabels(key[1]), value.sum))
+                        lines.append("%s_count%s %d" % (name, self._formatLabels(key[1]), value.count))
+                    else:
+                        lines.append("%s%s %s" % (name, self._formatLabels(key[1]), value))
+
+        return "\n".join(lines) + "\n"
+
+    def writeTextfile(self, fileName):
+        """Write all metrics to a file for the node exporter textfile
+        collector. The file is replaced atomically, so the collector never
+        reads a partial file, even if several programs write it concurrently.
+        It is readable by the collector, which may run as another user.
+
+        Args:
+            fileName (str): File name, should end with .prom
+
+        Raises:
+            OSError: File not written
+        """
+        saveTextFile(fileName, self.render(), fileMode=0o644)
+
+class MetricsServer():
+    """Provides the metrics in the Prometheus text format via HTTP.
+    """
+
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        """Creates the metrics server.
+
+        Args:
+            metrics (Metrics): Metrics
+            port (int): TCP port
+            host (str, optional): Host address. Defaults to "127.0.0.1".
+        """
+        self._metrics   = metrics
+        self._port      = port
+        self._host      = host
+        self._runner    = None
+
+    async def _handleMetrics(self, request):
+        from aiohttp import web
+
+        return web.Response(text=self._metrics.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self):
+        """Start serving /metrics.
+        """
+        # The HTTP server is only needed by long running commands.
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/metrics", self._handleMetrics)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self._host, self._port).start()
+
+        _LOGGER.info("Metrics on http://%s:%d/metrics", self._host, self._port)
+
+    async def stop(self):
+        """Stop serving.
+        """
+        if (None != self._runner):
+            await self._runner.cleanup()
+            self._runner = None
+
+################################################################################
+# Functions
+################################################################################
+
+def getMetrics():
+    """Get the metrics of this process.
+
+    Returns:
+        Metrics: Metrics
+    """
+    global _metrics
+
+    if (None == _metrics):
+        _metrics = Metrics()
+
+    return _metrics
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,269 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import csv
+import numpy
+from .schedule import SCHEDULE_FIELDS
+
+try:
+    import pyarrow.parquet as parquet
+except ImportError:
+    parquet = None
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+################################################################################
+# Classes
+################################################################################
+
+class Planner():
+    """Plans the circuit power limits of many circuits over many time slots
+    at once, e.g. a year in minute resolution. The PV forecast is converted
+    to phase currents and phase mode with array operations instead of a
+    loop per slot.
+
+    Like the controller, up to the max. single phase power is charged over
+    one phase, above over three phases.
+    """
+
+    def __init__(self, voltage=230, phaseCurrentMax=16, currentStep=1, baseLoad=0):
+        """Creates the planner.
+
+        Args:
+            voltage (float, optional): Phase voltage in V. Defaults to 230.
+            phaseCurrentMax (float, optional): Max. phase current in A. Defaults to 16.
+            currentStep (float, optional): The phase currents are rounded down to a multiple of it in A, 0 to disable. Defaults to 1.
+            baseLoad (float, optional): Power in W, which is consumed by others and not available for charging. Defaults to 0.
+        """
+        self._voltage           = voltage
+        self._phaseCurrentMax   = phaseCurrentMax
+        self._currentStep       = currentStep
+        self._baseLoad          = baseLoad
+
+    def calcPhaseCurrentLimits(self, power):
+        """Calculate the phase current limits and determines 1 or 3 phase
+        charging for every element.
+
+        Args:
+            power (numpy.ndarray): Available power in W
+
+        Returns:
+            numpy.ndarray, numpy.ndarray: Current limit in A of every used phase and number of phases.
+        """
+        phasePowerMax = self._voltage * self._phaseCurrentMax
+        currents = numpy.clip(power, 0, 3 * phasePowerMax).astype(numpy.float32)
+        isThreePhase = currents > phasePowerMax
+        phases = (2 * isThreePhase + 1).astype(numpy.int8)
+
+        # The operations work in place, because of the array size.
+        numpy.multiply(currents, 1 / self._voltage, out=currents)
+        numpy.divide(currents, 3, out=currents, where=isThreePhase)
+
+        if (0 < self._currentStep):
+            # The tolerance compensates the float rounding, e.g. of 3680 W / 230 V.
+            numpy.multiply(currents, 1 / self._currentStep, out=currents)
+            numpy.add(currents, 1e-3, out=currents)
+            numpy.floor(currents, out=currents)
+            numpy.multiply(currents, self._currentStep, out=currents)
+
+        return currents, phases
+
+    def plan(self, timestamps, power):
+        """Plan the circuit power limits.
+
+        Args:
+            timestamps (numpy.ndarray): Slot start in s since epoch, ascending.
+            power (numpy.ndarray): Forecasted power in W, one row per slot and one column per circuit.
+
+        Returns:
+            dict: Arrays with one row per slot and one column per circuit:
+            currents in A of every used phase, phases, powerLimits in W and
+            energy in Wh of the slot. The changes mark the slots, where the
+            power limit or the phases change.
+        """
+        if ((2 > len(timestamps)) or (numpy.any(numpy.diff(timestamps) <= 0))):
+            raise ValueError("At least two slots with ascending timestamps are required.")
+
+        currents, phases = self.calcPhaseCurrentLimits(power - self._baseLoad)
+        powerLimits = currents * phases * self._voltage
+
+        # The last slot lasts as long as the one before.
+        durations = numpy.diff(timestamps, append=2 * timestamps[-1] - timestamps[-2])
+        energy = powerLimits * (durations / 3600).astype(numpy.float32)[:, numpy.newaxis]
+
+        changes = numpy.empty(powerLimits.shape, dtype=bool)
+        changes[0] = True
+        changes[1:] = (powerLimits[1:] != powerLimits[:-1]) | (phases[1:] != phases[:-1])
+
+        return {
+            "currents": currents,
+            "phases": phases,
+            "powerLimits": powerLimits,
+            "energy": energy,
+            "changes": changes
+        }
+
+################################################################################
+# Functions
+################################################################################
+
+def _parseCircuits(fileName, columnNames):
+    """Parse the circuit column names of a forecast.
+
+    Args:
+        fileName (str): Forecast file name
+        columnNames (list): Column names, e.g. "SITE-KEY/1".
+
+    Raises:
+        ValueError: Invalid column name
+
+    Returns:
+        list: Site key and circuit panel id of every column
+    """
+    circuits = []
+
+    for columnName in columnNames:
+        siteKey, _, circuitPanelId = columnName.strip().rpartition("/")
+
+        if ((0 == len(siteKey)) or (False == circuitPanelId.isdigit())):
+            raise ValueError("%s: Column %s is not siteKey/circuitPanelId." % (fileName, columnName))
+
+        circuits.append((siteKey, int(circuitPanelId)))
+
+    return circuits
+
+def _toSeconds(timestamps):
+    """Convert timestamps to s since epoch.
+
+    Args:
+        timestamps (numpy.ndarray): Numbers in s, date times or ISO 8601 strings in UTC.
+
+    Returns:
+        numpy.ndarray: Timestamps in s since epoch
+    """
+    if (True == numpy.issubdtype(timestamps.dtype, numpy.number)):
+        seconds = timestamps.astype(numpy.float64)
+    else:
+        seconds = timestamps.astype("datetime64[ms]").astype(numpy.int64) / 1000
+
+    return seconds
+
+def loadForecast(fileName):
+    """Load a PV forecast from a CSV or Parquet file. The first column is the
+    slot start, either in s since epoch or as ISO 8601 date time in UTC.
+    Every further column is the forecasted power in W of a circuit, named
+    siteKey/circuitPanelId.
+
+    Args:
+        fileName (str): Forecast file name, with .csv or .parquet extension.
+
+    Raises:
+        ValueError: Invalid forecast file
+
+    Returns:
+        numpy.ndarray, list, numpy.ndarray: Timestamps in s since epoch, circuits and power in W with one row per slot and one column per circuit.
+    """
+    if (True == fileName.endswith(".parquet")):
+        if (None == parquet):
+            raise ValueError("Parquet is not supported, please install pyarrow.")
+
+        table = parquet.read_table(fileName)
+        circuits = _parseCircuits(fileName, table.column_names[1:])
+        timestamps = _toSeconds(table.column(0).to_numpy())
+        power = numpy.column_stack([table.column(index).to_numpy().astype(numpy.float32) for index in range(1, table.num_columns)])
+    else:
+        with open(fileName, "r", encoding="utf-8") as fd:
+            columnNames = fd.readline().strip().split(",")
+            circuits = _parseCircuits(fileName, columnNames[1:])
+            data = numpy.loadtxt(fd, delimiter=",", dtype=str, ndmin=2)
+
+        timestamps = data[:, 0]
+
+        try:
+            timestamps = timestamps.astype(numpy.float64)
+        except ValueError:
+            pass
+
+        timestamps = _toSeconds(timestamps)
+        power = data[:, 1:].astype(numpy.float32)
+
+    if ((0 == len(circuits)) or (power.shape != (len(timestamps), len(circuits)))):
+        raise ValueError("%s has no power column per circuit." % fileName)
+
+    return timestamps, circuits, power
+
+def writeSchedule(fileName, timestamps, circuits, plan):
+    """Write the changes of a plan as schedule, which the daemon can run.
+
+    Args:
+        fileName (str): Schedule file name (CSV)
+        timestamps (numpy.ndarray): Slot start in s since epoch
+        circuits (list): Site key and circuit panel id of every column
+        plan (dict): Plan, see Planner.plan().
+
+    Returns:
+        int: Number of written entries
+    """
+    slots, columns = numpy.nonzero(plan["changes"])
+    powerLimits = plan["powerLimits"][slots, columns]
+
+    # A entry lasts until the next entry of the same circuit or the end of
+    # the last slot.
+    order = numpy.lexsort((slots, columns))
+    isSameCircuit = columns[order][1:] == columns[order][:-1]
+    nextSlots = numpy.full(len(slots), len(timestamps))
+    nextSlots[order[:-1][isSameCircuit]] = slots[order][1:][isSameCircuit]
+    slotEnds = numpy.append(timestamps, 2 * timestamps[-1] - timestamps[-2])
+    energy = powerLimits * (slotEnds[nextSlots] - timestamps[slots]) / 3600
+
+    currents = plan["currents"][slots, columns]
+    phases = plan["phases"][slots, columns]
+    isThreePhase = 3 == phases
+
+    with open(fileName, "w", encoding="utf-8", newline="") as fd:
+        writer = csv.writer(fd)
+        writer.writerow(SCHEDULE_FIELDS)
+        writer.writerows(zip(
+            timestamps[slots].round(3).tolist(),
+            [circuits[column][0] for column in columns.tolist()],
+            [circuits[column][1] for column in columns.tolist()],
+            phases.tolist(),
+            currents.round(2).tolist(),
+            numpy.where(isThreePhase, currents, 0).round(2).tolist(),
+            numpy.where(isThreePhase, currents, 0).round(2).tolist(),
+            powerLimits.round(1).tolist(),
+            energy.round(1).tolist()
+        ))
+
+    return len(slots)
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,148 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import asyncio
+import time
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+class TokenBucket():
+    """Token bucket, which limits the number of requests per period. Every
+    request takes one token and the bucket is refilled continuously.
+    """
+
+    def __init__(self, capacity=20, period=60, clock=time.monotonic):
+        """Creates a full token bucket.
+
+        Args:
+            capacity (int, optional): Max. number of requests per period. Defaults to 20.
+            period (float, optional): Period in s. Defaults to 60.
+            clock (function, optional): Clock, which returns the time in s. Defaults to time.monotonic.
+        """
+        self._capacity      = capacity
+        self._refillRate    = capacity / period # [1/s]
+        self._clock         = clock
+        self._tokens        = capacity
+        self._timestamp     = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self._capacity, self._tokens + (now - self._timestamp) * self._refillRate)
+        self._timestamp = now
+
+    def getTokens(self):
+        """Get the number of available tokens.
+
+        Returns:
+            float: Available tokens
+        """
+        self._refill()
+
+        return self._tokens
+
+    def getWaitTime(self):
+        """Get the time until the next token is available.
+
+        Returns:
+            float: Wait time in s, 0 if a token is available.
+        """
+        self._refill()
+
+        return max(0, (1 - self._tokens) / self._refillRate)
+
+    def tryAcquire(self):
+        """Take a token, if one is available.
+
+        Returns:
+            bool: If a token was taken, it will return True otherwise False.
+        """
+        isAcquired = False
+
+        self._refill()
+
+        if (1 <= self._tokens):
+            self._tokens -= 1
+            isAcquired = True
+
+        return isAcquired
+
+    async def acquire(self):
+        """Wait until a token is available and take it.
+        """
+        while (False == self.tryAcquire()):
+            await asyncio.sleep(self.getWaitTime())
+
+    def drain(self):
+        """Take all available tokens, e.g. if the server reported that the
+        rate limit is exceeded.
+        """
+        self._refill()
+        self._tokens = min(0, self._tokens)
+
+class RateLimiter():
+    """Tracks the request budget of every Easee cloud REST API endpoint with
+    its own token bucket.
+    """
+
+    def __init__(self, requestsPerPeriod=20, period=60, clock=time.monotonic):
+        """Creates the rate limiter.
+
+        Args:
+            requestsPerPeriod (int, optional): Max. number of requests per period and endpoint. Defaults to 20.
+            period (float, optional): Period in s. Defaults to 60.
+            clock (function, optional): Clock, which returns the time in s. Defaults to time.monotonic.
+        """
+        self._requestsPerPeriod = requestsPerPeriod
+        self._period            = period
+        self._clock             = clock
+        self._buckets           = {}
+
+    def getBucket(self, endpoint):
+        """Get the token bucket of a endpoint.
+
+        Args:
+            endpoint (str): Endpoint, e.g. "/api/sites/1/circuits/2/settings"
+
+        Returns:
+            TokenBucket: Token bucket of the endpoint
+        """
+        if (endpoint not in self._buckets):
+            self._buckets[endpoint] = TokenBucket(self._requestsPerPeriod, self._period, self._clock)
+
+        return self._buckets[endpoint]
+
+################################################################################
+# Functions
+################################################################################
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,323 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import contextvars
+import json
+import math
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from .jsonStore import saveJsonFile
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+# Deadline of the command, which is processed by the current task.
+_DEADLINE = contextvars.ContextVar("deadline", default=None)
+
+################################################################################
+# Classes
+################################################################################
+
+class CloudUnavailableError(Exception):
+    """The Easee cloud is considered unavailable by the circuit breaker,
+    therefore the request was not sent.
+    """
+
+class Deadline():
+    """Point in time, until a command shall be done. All requests and retries
+    of the command have to fit into it.
+    """
+
+    def __init__(self, timeout=None, clock=time.monotonic):
+        """Creates the deadline.
+
+        Args:
+            timeout (float, optional): Time from now on in s. Defaults to None, which means unlimited.
+            clock (function, optional): Clock, which returns the time in s. Defaults to time.monotonic.
+        """
+        self._clock     = clock
+        self._expiresAt = math.inf
+
+        if (None != timeout):
+            self._expiresAt = clock() + timeout
+
+    def getRemaining(self):
+        """Get the remaining time.
+
+        Returns:
+            float: Remaining time in s, 0 if expired and math.inf if unlimited.
+        """
+        return max(0, self._expiresAt - self._clock())
+
+    def isExpired(self):
+        """Is the deadline expired?
+
+        Returns:
+            bool: If expired, it will return True otherwise False.
+        """
+        return 0 == self.getRemaining()
+
+class RetryPolicy():
+    """Decides how often and after which delay a failed request is repeated.
+    The delay grows exponentially with every attempt and is jittered, so
+    that many clients don't repeat their requests at the same time. A delay
+    requested by the server via Retry-After is honoured.
+    """
+
+    def __init__(self, maxRetries=3, baseDelay=0.5, maxDelay=8, requestTimeout=10, rand=random.random):
+        """Creates the retry policy.
+
+        Args:
+            maxRetries (int, optional): Max. number of repetitions of a request. Defaults to 3.
+            baseDelay (float, optional): Delay before the first repetition in s. Defaults to 0.5.
+            maxDelay (float, optional): Max. delay between two attempts in s. Defaults to 8.
+            requestTimeout (float, optional): Max. duration of a single attempt in s. Defaults to 10.
+            rand (function, optional): Random number generator, which returns a number between 0 and 1. Defaults to random.random.
+        """
+        self._maxRetries        = maxRetries
+        self._baseDelay         = baseDelay
+        self._maxDelay          = maxDelay
+        self._requestTimeout    = requestTimeout
+        self._rand              = rand
+
+    def getMaxRetries(self):
+        """Get the max. number of repetitions of a request.
+
+        Returns:
+            int: Max. number of repetitions
+        """
+        return self._maxRetries
+
+    def getRequestTimeout(self):
+        """Get the max. duration of a single attempt.
+
+        Returns:
+            float: Request timeout in s
+        """
+        return self._requestTimeout
+
+    def getDelay(self, retry, retryAfter=None):
+        """Get the delay before a request is repeated. Without Retry-After,
+        the delay is a random time up to the exponential backoff ("full jitter").
+        With Retry-After, a random time up to the base delay is added to it.
+
+        Args:
+            retry (int): Number of the repetition, starting with 0.
+            retryAfter (float, optional): Delay requested by the server in s. Defaults to None.
+
+        Returns:
+            float: Delay in s
+        """
+        if (None == retryAfter):
+            delay = self._rand() * min(self._maxDelay, self._baseDelay * (2 ** retry))
+        else:
+            delay = retryAfter + self._rand() * self._baseDelay
+
+        return delay
+
+class CircuitBreaker():
+    """Fails fast, while the Easee cloud is degraded. After a number of
+    failed requests in a row, the breaker opens and no request is sent
+    until the reset timeout is over. Then requests are tried again (half
+    open). The first success closes the breaker, the first failure opens it
+    again.
+
+    The state is kept in memory and optionally stored in a file, so that
+    single commands, e.g. started by cron, share it.
+    """
+
+    CLOSED      = "closed"
+    OPEN        = "open"
+    HALF_OPEN   = "halfOpen"
+
+    def __init__(self, failureThreshold=5, resetTimeout=60, fileName=None, clock=time.time):
+        """Creates the circuit breaker and loads its state from the file.
+
+        Args:
+            failureThreshold (int, optional): Number of failed requests in a row, which open the breaker. Defaults to 5.
+            resetTimeout (float, optional): Time in s, after that a open breaker tries requests again. Defaults to 60.
+            fileName (str, optional): State file name. Defaults to None, which means the state is in memory only.
+            clock (function, optional): Clock, which returns the time in s. Defaults to time.time.
+        """
+        self._failureThreshold  = failureThreshold
+        self._resetTimeout      = resetTimeout
+        self._fileName          = fileName
+        self._clock             = clock
+        self._failures          = 0
+        self._openedAt          = None
+
+        self._load()
+
+    def _load(self):
+        """Load the state from the file. A missing or invalid state file
+        results in a closed breaker.
+        """
+        if (None != self._fileName):
+            try:
+                with open(self._fileName, "r", encoding="utf-8") as fd:
+                    data = json.load(fd)
+
+                self._failures = int(data["failures"])
+                self._openedAt = data["openedAt"]
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, KeyError, TypeError) as ex:
+                _LOGGER.warning("Circuit breaker state %s ignored: %s", self._fileName, ex)
+
+    def _save(self):
+        """Store the state in the file. A failure is only logged, because
+        the breaker works in memory too.
+        """
+        if (None != self._fileName):
+            try:
+                saveJsonFile(self._fileName, { "failures": self._failures, "openedAt": self._openedAt }, indent=4)
+            except OSError as ex:
+                _LOGGER.warning("Circuit breaker state not stored: %s", ex)
+
+    def getState(self):
+        """Get the state of the breaker.
+
+        Returns:
+            str: CLOSED, OPEN or HALF_OPEN
+        """
+        state = CircuitBreaker.CLOSED
+
+        if (None != self._openedAt):
+            if (self._resetTimeout > (self._clock() - self._openedAt)):
+                state = CircuitBreaker.OPEN
+            else:
+                state = CircuitBreaker.HALF_OPEN
+
+        return state
+
+    def getRetryIn(self):
+        """Get the time until a open breaker tries requests again.
+
+        Returns:
+            float: Time in s, 0 if not open.
+        """
+        retryIn = 0
+
+        if (CircuitBreaker.OPEN == self.getState()):
+            retryIn = self._resetTimeout - (self._clock() - self._openedAt)
+
+        return retryIn
+
+    def isAllowed(self):
+        """May a request be sent?
+
+        Returns:
+            bool: If the breaker is not open, it will return True otherwise False.
+        """
+        return CircuitBreaker.OPEN != self.getState()
+
+    def onSuccess(self):
+        """A request succeeded, which closes the breaker.
+        """
+        if ((0 < self._failures) or (None != self._openedAt)):
+            if (None != self._openedAt):
+                _LOGGER.warning("Easee cloud available again, circuit breaker closed.")
+
+            self._failures = 0
+            self._openedAt = None
+            self._save()
+
+    def onFailure(self):
+        """A request failed, which opens the breaker after too many failures
+        in a row or immediately, if half open.
+        """
+        self._failures += 1
+
+        if (self._failureThreshold <= self._failures):
+            if (CircuitBreaker.OPEN != self.getState()):
+                _LOGGER.warning("Easee cloud degraded, circuit breaker open for %d s.", self._resetTimeout)
+
+            self._openedAt = self._clock()
+
+        self._save()
+
+################################################################################
+# Functions
+################################################################################
+
+def getDeadline():
+    """Get the deadline of the command, which is processed by the current task.
+
+    Returns:
+        Deadline: Deadline or None, if unlimited.
+    """
+    return _DEADLINE.get()
+
+def setDeadline(deadline):
+    """Set the deadline of the command, which is processed by the current task.
+
+    Args:
+        deadline (Deadline): Deadline or None, if unlimited.
+
+    Returns:
+        Token: Token to reset the deadline, see resetDeadline().
+    """
+    return _DEADLINE.set(deadline)
+
+def resetDeadline(token):
+    """Restore the deadline, which was valid before setDeadline() was called.
+
+    Args:
+        token (Token): Token returned by setDeadline().
+    """
+    _DEADLINE.reset(token)
+
+def parseRetryAfter(value):
+    """Parse the Retry-After header, which is either a number of seconds or
+    a HTTP date.
+
+    Args:
+        value (str): Header value or None
+
+    Returns:
+        float: Delay in s or None, if missing or invalid.
+    """
+    delay = None
+
+    if (None != value):
+        try:
+            delay = max(0, float(value))
+        except ValueError:
+            try:
+                delay = max(0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                _LOGGER.debug("Invalid Retry-After: %s", value)
+
+    return delay
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,92 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import csv
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+# Columns of a schedule file.
+SCHEDULE_FIELDS = (
+    "timestamp",
+    "siteKey",
+    "circuitPanelId",
+    "phases",
+    "currentP1",
+    "currentP2",
+    "currentP3",
+    "powerLimit",
+    "energy"
+)
+
+################################################################################
+# Classes
+################################################################################
+
+################################################################################
+# Functions
+################################################################################
+
+def loadSchedule(fileName, siteKey, circuitPanelId):
+    """Load the schedule entries of a single circuit from a schedule file,
+    which was created by the planner. Each entry applies from its timestamp
+    until the next one.
+
+    Args:
+        fileName (str): Schedule file name (CSV)
+        siteKey (str): Site key
+        circuitPanelId (int): Circuit panel id
+
+    Raises:
+        ValueError: Invalid schedule file
+
+    Returns:
+        list: Entries (timestamp in s since epoch, power limit in W, phases), sorted by timestamp.
+    """
+    entries = []
+
+    with open(fileName, "r", encoding="utf-8", newline="") as fd:
+        reader = csv.DictReader(fd)
+
+        if ((None == reader.fieldnames) or (False == set(SCHEDULE_FIELDS).issubset(reader.fieldnames))):
+            raise ValueError("%s is no schedule file." % fileName)
+
+        for row in reader:
+            if ((siteKey == row["siteKey"]) and (circuitPanelId == int(row["circuitPanelId"]))):
+                entries.append((float(row["timestamp"]), float(row["powerLimit"]), int(row["phases"])))
+
+    entries.sort(key=lambda entry: entry[0])
+
+    _LOGGER.info("%d schedule entries for %s/%d loaded.", len(entries), siteKey, circuitPanelId)
+
+    return entries
+
+################################################################################
+# Main
+################################################################################
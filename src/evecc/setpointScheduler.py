@@ -0,0 +1,202 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import asyncio
+from .metrics import getMetrics
+from .sysExitStatus import SysExitStatus
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+_METRICS = getMetrics()
+
+################################################################################
+# Classes
+################################################################################
+
+class SetpointScheduler():
+    """Sends circuit power limits to the Easee cloud, without exceeding the
+    request budget of the circuit settings endpoint. If a power limit is
+    submitted while a older one still waits for budget, the older one is
+    replaced (latest wins), because only the newest setpoint matters.
+    A power limit which doesn't change the phase currents is skipped, without
+    using budget.
+    """
+
+    def __init__(self, evecc, rateLimiter):
+        """Creates the setpoint scheduler.
+
+        Args:
+            evecc (EVECC): Connected electric vehicle easee charge controller
+            rateLimiter (RateLimiter): Rate limiter
+        """
+        self._evecc         = evecc
+        self._rateLimiter   = rateLimiter
+        self._pending       = None
+        self._isSending     = False
+        self._submitEvent   = asyncio.Event()
+        self._idleEvent     = asyncio.Event()
+        self._statistics    = {
+            "submitted": 0,
+            "sent": 0,
+            "coalesced": 0,
+            "skipped": 0,
+            "dropped": 0,
+            "rateLimited": 0
+        }
+
+        self._idleEvent.set()
+
+    def submit(self, powerLimit, phases=None):
+        """Submit a circuit power limit. It replaces a still pending one.
+
+        Args:
+            powerLimit (int): Circuit power limit in W
+            phases (int, optional): Charge with 1 or 3 phases. Defaults to None, which means it depends on the power limit.
+        """
+        self._statistics["submitted"] += 1
+
+        if (None != self._pending):
+            self._statistics["coalesced"] += 1
+            _METRICS.incCounter("evecc_setpoints_coalesced_total", "Number of setpoints, which were replaced by a newer one before sent.")
+
+        self._pending = (powerLimit, phases)
+        self._updateQueueDepth()
+        self._idleEvent.clear()
+        self._submitEvent.set()
+
+    def _updateQueueDepth(self):
+        _METRICS.setGauge("evecc_setpoint_queue_depth", "Number of setpoints, which wait for budget or are being sent.", self.getQueueDepth())
+
+    def getQueueDepth(self):
+        """Get the number of power limits, which wait for budget or are
+        being sent.
+
+        Returns:
+            int: Queue depth
+        """
+        queueDepth = 0
+
+        if (None != self._pending):
+            queueDepth += 1
+
+        if (True == self._isSending):
+            queueDepth += 1
+
+        return queueDepth
+
+    def getStatistics(self):
+        """Get the statistics.
+
+        Returns:
+            dict: Queue depth and number of submitted, sent, coalesced,
+            skipped, dropped and by the server rate limited power limits.
+        """
+        statistics = dict(self._statistics)
+        statistics["queueDepth"] = self.getQueueDepth()
+
+        return statistics
+
+    async def flush(self):
+        """Wait until all pending power limits are sent.
+        """
+        await self._idleEvent.wait()
+
+    async def _send(self, bucket):
+        """Wait for budget and send the latest pending power limit.
+
+        Args:
+            bucket (TokenBucket): Token bucket of the circuit settings endpoint
+        """
+        if (False == self._evecc.isCircuitPowerLimitChanged(*self._pending)):
+            self._pending = None
+            self._statistics["skipped"] += 1
+            _METRICS.incCounter("evecc_writes_skipped_total", "Number of circuit power limits, which were not written, because unchanged.")
+            self._updateQueueDepth()
+            return
+
+        # In charger mode, every charger has its own budget.
+        if (None != bucket):
+            await bucket.acquire()
+
+        powerLimit, phases = self._pending
+        self._pending = None
+        self._isSending = True
+
+        try:
+            status = await self._evecc.setCircuitPowerLimit(powerLimit, phases)
+
+            if (SysExitStatus.SUCCESS == status):
+                self._statistics["sent"] += 1
+            elif (SysExitStatus.RATE_LIMITED == status):
+                _LOGGER.warning("Rate limit exceeded, power limit %d W will be repeated.", powerLimit)
+                self._statistics["rateLimited"] += 1
+
+                if (None != bucket):
+                    bucket.drain()
+
+                # A newer power limit, which was submitted meanwhile, wins.
+                if (None == self._pending):
+                    self._pending = (powerLimit, phases)
+            else:
+                _LOGGER.error("Power limit %d W dropped: %s", powerLimit, status.name)
+                self._statistics["dropped"] += 1
+                _METRICS.incCounter("evecc_setpoints_dropped_total", "Number of setpoints, which failed to be sent.")
+        except Exception as ex:
+            _LOGGER.error("Power limit %d W dropped: %s", powerLimit, ex)
+            self._statistics["dropped"] += 1
+            _METRICS.incCounter("evecc_setpoints_dropped_total", "Number of setpoints, which failed to be sent.")
+        finally:
+            self._isSending = False
+            self._updateQueueDepth()
+
+    async def run(self):
+        """Send the submitted power limits until cancelled.
+        """
+        bucket = None
+
+        if (False == self._evecc.isChargerMode()):
+            bucket = self._rateLimiter.getBucket(self._evecc.getCircuitSettingsEndpoint())
+
+        while True:
+            await self._submitEvent.wait()
+            self._submitEvent.clear()
+
+            while (None != self._pending):
+                await self._send(bucket)
+
+            self._idleEvent.set()
+
+################################################################################
+# Functions
+################################################################################
+
+################################################################################
+# Main
+################################################################################
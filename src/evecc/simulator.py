@@ -0,0 +1,261 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import csv
+from .rateLimiter import TokenBucket
+from .history import parseTimestamp
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+################################################################################
+# Classes
+################################################################################
+
+class VirtualClock():
+    """Clock of the simulation, which is set to the time of the replayed
+    samples instead of running in real time.
+    """
+
+    def __init__(self, timestamp=0):
+        """Creates the clock.
+
+        Args:
+            timestamp (float, optional): Start time in s. Defaults to 0.
+        """
+        self._timestamp = timestamp
+
+    def getTime(self):
+        """Get the time.
+
+        Returns:
+            float: Time in s
+        """
+        return self._timestamp
+
+    def setTime(self, timestamp):
+        """Set the time.
+
+        Args:
+            timestamp (float): Time in s
+        """
+        self._timestamp = timestamp
+
+class Simulator():
+    """Replays a trace of PV and consumption power through the surplus
+    controller and the charge logic, much faster than real time. The power
+    limits are sent like by the setpoint scheduler: Latest wins, unchanged
+    ones are skipped and the request budget is kept by a token bucket on the
+    virtual clock.
+
+    The vehicle is expected to charge with the written circuit power limit
+    and the consumption without the vehicle.
+
+    With a adaptive interval, the power limits are only sent in control
+    cycles, like by the stream command. Every cycle reads the power limit
+    back.
+    """
+
+    def __init__(self, chargeLogic, surplusController, requestsPerPeriod=20, period=60, adaptiveInterval=None):
+        """Creates the simulator.
+
+        Args:
+            chargeLogic (ChargeLogic): Charge logic
+            surplusController (SurplusController): Surplus controller
+            requestsPerPeriod (int, optional): Max. number of circuit settings requests per period. Defaults to 20.
+            period (float, optional): Period in s. Defaults to 60.
+            adaptiveInterval (AdaptiveInterval, optional): Interval of the control cycles. Defaults to None, which means every sample is a cycle.
+        """
+        self._chargeLogic       = chargeLogic
+        self._surplusController = surplusController
+        self._requestsPerPeriod = requestsPerPeriod
+        self._period            = period
+        self._adaptiveInterval  = adaptiveInterval
+
+    def run(self, trace):
+        """Replay the trace. Each sample lasts until the next one.
+
+        Args:
+            trace (list): Samples (timestamp in s, PV power in W, consumption in W), sorted by timestamp.
+
+        Returns:
+            dict: Energy in Wh, self-consumption, number of cloud requests, setpoints and phase switches.
+        """
+        clock = VirtualClock()
+        bucket = None
+        pending = None
+        currents = None
+        chargePower = 0
+        energy = { "pv": 0, "consumption": 0, "vehicle": 0, "selfConsumed": 0, "gridImport": 0, "feedIn": 0 }
+        statistics = { "submitted": 0, "coalesced": 0, "skipped": 0, "requests": 0, "phaseSwitches": 0 }
+        cycleTime = None
+        nextCycleTime = None
+        intervalSum = 0
+
+        if (None != self._adaptiveInterval):
+            statistics["reads"] = 0
+            statistics["cycles"] = 0
+
+        for index, (timestamp, pvPower, consumption) in enumerate(trace):
+            clock.setTime(timestamp)
+            isCycle = True
+
+            if (None == bucket):
+                bucket = TokenBucket(self._requestsPerPeriod, self._period, clock.getTime)
+
+            powerLimit, phases = self._surplusController.update(pvPower - consumption, timestamp)
+
+            if (None != powerLimit):
+                statistics["submitted"] += 1
+
+                if (None != pending):
+                    statistics["coalesced"] += 1
+
+                pending = (powerLimit, phases)
+
+                if (None != self._adaptiveInterval):
+                    self._adaptiveInterval.addSetpoint()
+
+            if (None != self._adaptiveInterval):
+                isWakeUp = self._adaptiveInterval.addSample(pvPower - consumption, self._surplusController.getFilteredPower())
+
+                if ((None != cycleTime) and (timestamp < nextCycleTime)):
+                    isCycle = isWakeUp and ((cycleTime + self._adaptiveInterval.getMinInterval()) <= timestamp)
+
+            isWritten = False
+
+            if ((True == isCycle) and (None != pending)):
+                newCurrents, isWrite, isPhaseSwitch = self._chargeLogic.decide(pending[0], pending[1], currents)
+
+                if (False == isWrite):
+                    statistics["skipped"] += 1
+                    pending = None
+                elif (True == bucket.tryAcquire()):
+                    statistics["requests"] += 1
+
+                    if (True == isPhaseSwitch):
+                        statistics["phaseSwitches"] += 1
+
+                    currents = newCurrents
+                    chargePower = self._chargeLogic.calcCircuitPowerLimit(currents)
+                    pending = None
+                    isWritten = True
+
+            if ((True == isCycle) and (None != self._adaptiveInterval)):
+                interval, reason = self._adaptiveInterval.update(chargePower, isWritten)
+                statistics["reads"] += 1
+                statistics["cycles"] += 1
+                intervalSum += interval
+                cycleTime = timestamp
+                nextCycleTime = timestamp + interval
+
+            if ((index + 1) < len(trace)):
+                duration = (trace[index + 1][0] - timestamp) / 3600 # [h]
+            else:
+                duration = 0
+
+            totalConsumption = consumption + chargePower
+            energy["pv"] += pvPower * duration
+            energy["consumption"] += consumption * duration
+            energy["vehicle"] += chargePower * duration
+            energy["selfConsumed"] += min(pvPower, totalConsumption) * duration
+            energy["gridImport"] += max(0, totalConsumption - pvPower) * duration
+            energy["feedIn"] += max(0, pvPower - totalConsumption) * duration
+
+        report = { name: round(value, 1) for name, value in energy.items() }
+        report["selfConsumption"] = round(energy["selfConsumed"] / energy["pv"], 4) if (0 < energy["pv"]) else 0
+        report.update(statistics)
+
+        if (None != self._adaptiveInterval):
+            report["meanInterval"] = round(intervalSum / statistics["cycles"], 1) if (0 < statistics["cycles"]) else 0
+
+        if (1 < len(trace)):
+            report["duration"] = trace[-1][0] - trace[0][0]
+        else:
+            report["duration"] = 0
+
+        return report
+
+################################################################################
+# Functions
+################################################################################
+
+def loadTrace(fileName):
+    """Load a recorded trace from a CSV file with the columns timestamp, pv
+    and optional consumption. The timestamp is in s since epoch or a ISO 8601
+    date time, the power in W.
+
+    Args:
+        fileName (str): Trace file name
+
+    Raises:
+        ValueError: Invalid trace file
+
+    Returns:
+        list: Samples (timestamp in s, PV power in W, consumption in W), sorted by timestamp.
+    """
+    trace = []
+
+    with open(fileName, "r", encoding="utf-8", newline="") as fd:
+        reader = csv.reader(fd)
+        columnNames = [name.strip() for name in next(reader, [])]
+
+        if (("timestamp" not in columnNames) or ("pv" not in columnNames)):
+            raise ValueError("%s has no timestamp and pv column." % fileName)
+
+        timestampIndex = columnNames.index("timestamp")
+        pvIndex = columnNames.index("pv")
+        consumptionIndex = columnNames.index("consumption") if ("consumption" in columnNames) else None
+        columnCount = max([index for index in (timestampIndex, pvIndex, consumptionIndex) if None != index]) + 1
+
+        for row in reader:
+            if (0 == len(row)):
+                continue
+
+            # E.g. the last row of a trace, which is still being recorded.
+            if (columnCount > len(row)):
+                raise ValueError("%s line %d has %d columns, but %d are expected." % (fileName, reader.line_num, len(row), columnCount))
+
+            consumption = 0
+
+            try:
+                if (None != consumptionIndex):
+                    consumption = float(row[consumptionIndex])
+
+                trace.append((parseTimestamp(row[timestampIndex]), float(row[pvIndex]), consumption))
+            except ValueError as ex:
+                raise ValueError("%s line %d: %s" % (fileName, reader.line_num, ex)) from ex
+
+    trace.sort(key=lambda sample: sample[0])
+
+    return trace
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,138 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import time
+from .jsonStore import JsonStore
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+class SiteCache(JsonStore):
+    """Maps the site key and circuit panel id to the site id and circuit id,
+    which are used in the Easee cloud REST API. The entries are kept in memory
+    and optionally stored in a file, to skip the site discovery next time.
+    """
+
+    def __init__(self, fileName=None, ttl=86400):
+        """Creates the site cache and loads the entries from the file.
+
+        Args:
+            fileName (str, optional): Cache file name. Defaults to None, which means the cache is in memory only.
+            ttl (int, optional): Time to live of a entry in s. Defaults to 86400.
+        """
+        self._ttl = ttl
+
+        super().__init__(fileName, "Site cache")
+
+    def get(self, siteKey, circuitPanelId):
+        """Get the site id and circuit id.
+
+        Args:
+            siteKey (str): The site key which identifies the site.
+            circuitPanelId (int): The circuit panel id which identifies the circuit.
+
+        Returns:
+            int, int: Site id and circuit id or None, None if not cached or expired.
+        """
+        siteId = None
+        circuitId = None
+        entry = self._entries.get(self._getKey(siteKey, circuitPanelId))
+
+        if (None != entry):
+            if ((time.time() - entry["timestamp"]) < self._ttl):
+                siteId = entry["siteId"]
+                circuitId = entry["circuitId"]
+
+        return siteId, circuitId
+
+    def getSiteId(self, siteKey):
+        """Get the site id of any cached circuit of the site.
+
+        Args:
+            siteKey (str): The site key which identifies the site.
+
+        Returns:
+            int: Site id or None if not cached or expired.
+        """
+        siteId = None
+        now = time.time()
+
+        for key, entry in self._entries.items():
+            if ((siteKey == key.rsplit("/", 1)[0]) and ((now - entry["timestamp"]) < self._ttl)):
+                siteId = entry["siteId"]
+                break
+
+        return siteId
+
+    def set(self, siteKey, circuitPanelId, siteId, circuitId):
+        """Add or update a entry.
+
+        Args:
+            siteKey (str): The site key which identifies the site.
+            circuitPanelId (int): The circuit panel id which identifies the circuit.
+            siteId (int): Site id
+            circuitId (int): Circuit id
+        """
+        self._entries[self._getKey(siteKey, circuitPanelId)] = {
+            "siteId": siteId,
+            "circuitId": circuitId,
+            "timestamp": time.time()
+        }
+
+    def invalidate(self, siteKey, circuitPanelId):
+        """Remove a entry.
+
+        Args:
+            siteKey (str): The site key which identifies the site.
+            circuitPanelId (int): The circuit panel id which identifies the circuit.
+        """
+        self._entries.pop(self._getKey(siteKey, circuitPanelId), None)
+
+    def invalidateSite(self, siteKey):
+        """Remove the entries of all circuits of a site.
+
+        Args:
+            siteKey (str): The site key which identifies the site.
+        """
+        for key in [key for key in self._entries if siteKey == key.rsplit("/", 1)[0]]:
+            del self._entries[key]
+
+    def clear(self):
+        """Remove all entries.
+        """
+        self._entries = {}
+
+################################################################################
+# Functions
+################################################################################
+
+################################################################################
+# Main
+################################################################################
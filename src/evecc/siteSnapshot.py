@@ -0,0 +1,311 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import asyncio
+import time
+from pyeasee.exceptions import NotFoundException
+from .easeeClient import EaseeClient
+from .siteCache import SiteCache
+from .chargeLogic import ChargeLogic
+from .history import HISTORY_READING
+from .retryPolicy import CloudUnavailableError, Deadline, setDeadline, resetDeadline
+from .sysExitStatus import SysExitStatus
+from .tracer import getTracer
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+_TRACER = getTracer()
+
+################################################################################
+# Classes
+################################################################################
+
+class SiteSnapshot():
+    """Reads the settings of all circuits of a site and optionally the state
+    of their chargers concurrently in a single Easee cloud session. The
+    result is a single document, e.g. for monitoring.
+    """
+
+    def __init__(self, username, password, siteKey, siteCache=None, tokenStore=None, concurrency=8, isChargerState=False, baseUri=None, history=None, timeout=None, retryPolicy=None, circuitBreaker=None):
+        """Creates the site snapshot.
+
+        Args:
+            username (str): Easee cloud user login name
+            password (str): Easee cloud user login password
+            siteKey (str): Easee cloud registered site key
+            siteCache (SiteCache, optional): Site and circuit id cache. Defaults to None, which means a in memory cache is used.
+            tokenStore (TokenStore, optional): Access token store. Defaults to None, which means a login is done.
+            concurrency (int, optional): Max. number of concurrent requests. Defaults to 8.
+            isChargerState (bool, optional): Read the state of every charger too. Defaults to False.
+            baseUri (str, optional): Easee cloud base URI. Defaults to None, which means the official one.
+            history (History, optional): Record the read phase currents. Defaults to None.
+            timeout (float, optional): Deadline of the snapshot in s, including all retries. Defaults to None, which means unlimited.
+            retryPolicy (RetryPolicy, optional): Retry policy. Defaults to None, which means the default policy.
+            circuitBreaker (CircuitBreaker, optional): Circuit breaker. Defaults to None.
+        """
+        self._username          = username
+        self._password          = password
+        self._siteKey           = siteKey
+        self._siteCache         = siteCache
+        self._tokenStore        = tokenStore
+        self._concurrency       = concurrency
+        self._isChargerState    = isChargerState
+        self._baseUri           = baseUri
+        self._history           = history
+        self._timeout           = timeout
+        self._retryPolicy       = retryPolicy
+        self._circuitBreaker    = circuitBreaker
+        self._chargeLogic       = ChargeLogic()
+        self._easee             = None
+        self._semaphore         = None
+
+        if (None == self._siteCache):
+            self._siteCache = SiteCache()
+
+    def _setError(self, record, ex):
+        """Set the status and the error of a record, whose request failed.
+
+        Args:
+            record (dict): Site, circuit or charger record
+            ex (Exception): Raised exception
+
+        Returns:
+            SysExitStatus: Status
+        """
+        status = SysExitStatus.FAILED
+
+        if (True == isinstance(ex, asyncio.TimeoutError)):
+            status = SysExitStatus.TIMEOUT
+        elif (True == isinstance(ex, CloudUnavailableError)):
+            status = SysExitStatus.UNAVAILABLE
+
+        record["status"] = status.name
+        record["error"] = str(ex) if (0 < len(str(ex))) else type(ex).__name__
+
+        return status
+
+    async def _getSite(self):
+        """Get the site details with all circuits and chargers. If the site
+        id is cached, the site discovery is skipped. The ids of all circuits
+        are cached for the other commands.
+
+        Returns:
+            Site: Site or None, if not found.
+        """
+        site = None
+        siteId = self._siteCache.getSiteId(self._siteKey)
+
+        if (None != siteId):
+            try:
+                site = await self._easee.get_site(siteId)
+            except NotFoundException:
+                _LOGGER.info("Cached site id %d is outdated.", siteId)
+                self._siteCache.invalidateSite(self._siteKey)
+
+        # The discovered sites are already detailed.
+        if (None == site):
+            for entry in await self._easee.get_sites():
+                if (self._siteKey == entry["siteKey"]):
+                    site = entry
+                    break
+
+        if (None != site):
+            for circuit in site.get_circuits():
+                self._siteCache.set(self._siteKey, circuit["circuitPanelId"], site.id, circuit.id)
+
+            self._siteCache.save()
+
+        return site
+
+    async def _readChargerState(self, charger):
+        """Read the state of a charger.
+
+        Args:
+            charger (dict): Charger information
+
+        Returns:
+            dict: Charger record
+        """
+        result = {
+            "id": charger["id"],
+            "name": charger.get("name"),
+            "status": SysExitStatus.SUCCESS.name
+        }
+
+        async with self._semaphore:
+            try:
+                result["state"] = await (await self._easee.get(f"/api/chargers/{charger['id']}/state")).json()
+            except Exception as ex:
+                self._setError(result, ex)
+                _LOGGER.error("State of charger %s failed: %s", charger["id"], result["error"])
+
+        return result
+
+    async def _readCircuitSettings(self, site, circuit):
+        """Read the dynamic circuit currents.
+
+        Args:
+            site (Site): Site
+            circuit (Circuit): Circuit
+
+        Returns:
+            dict: Circuit record
+        """
+        result = {
+            "circuitId": circuit.id,
+            "circuitPanelId": circuit["circuitPanelId"],
+            "panelName": circuit.get("panelName"),
+            "status": SysExitStatus.SUCCESS.name
+        }
+
+        async with self._semaphore:
+            try:
+                settings = await (await self._easee.get(f"/api/sites/{site.id}/circuits/{circuit.id}/settings")).json()
+                currents = [
+                    settings["dynamicCircuitCurrentP1"],
+                    settings["dynamicCircuitCurrentP2"],
+                    settings["dynamicCircuitCurrentP3"]
+                ]
+                result["currents"] = currents
+                result["powerLimit"] = self._chargeLogic.calcCircuitPowerLimit(currents)
+                self._record(site, circuit, currents, result["powerLimit"])
+            except Exception as ex:
+                self._setError(result, ex)
+                _LOGGER.error("Circuit %d of site %s failed: %s", circuit["circuitPanelId"], self._siteKey, result["error"])
+
+        return result
+
+    async def _readCircuit(self, site, circuit):
+        """Read the settings of a circuit and the state of its chargers
+        concurrently.
+
+        Args:
+            site (Site): Site
+            circuit (Circuit): Circuit
+
+        Returns:
+            dict: Circuit record
+        """
+        requests = [self._readCircuitSettings(site, circuit)]
+
+        if (True == self._isChargerState):
+            requests.extend([self._readChargerState(charger) for charger in circuit.get("chargers", [])])
+
+        with _TRACER.span("read circuit", args={ "circuitId": circuit.id }):
+            results = await asyncio.gather(*requests)
+
+        result = results[0]
+        result["chargers"] = [{ "id": charger["id"], "name": charger.get("name") } for charger in circuit.get("chargers", [])]
+
+        if (True == self._isChargerState):
+            result["chargers"] = list(results[1:])
+
+        return result
+
+    def _record(self, site, circuit, currents, powerLimit):
+        """Record the read phase currents in the history. A failure is only
+        logged, because the snapshot doesn't depend on it.
+        """
+        if (None != self._history):
+            try:
+                self._history.append(HISTORY_READING, site.id, circuit.id, currents, powerLimit)
+            except OSError as ex:
+                _LOGGER.warning("History not recorded: %s", ex)
+
+    async def _read(self):
+        """Read the snapshot.
+
+        Returns:
+            SysExitStatus, dict: Status and snapshot
+        """
+        status = SysExitStatus.SUCCESS
+        snapshot = {
+            "timestamp": round(time.time(), 3),
+            "siteKey": self._siteKey,
+            "siteId": None,
+            "circuits": []
+        }
+
+        try:
+            with _TRACER.span("get site"):
+                site = await self._getSite()
+        except Exception as ex:
+            status = self._setError(snapshot, ex)
+            _LOGGER.error("Site %s failed: %s", self._siteKey, snapshot["error"])
+        else:
+            if (None == site):
+                status = SysExitStatus.FAILED
+                snapshot["error"] = "No site with key %s found." % self._siteKey
+            else:
+                snapshot["siteId"] = site.id
+                snapshot["siteName"] = site.get("name")
+                snapshot["circuits"] = await asyncio.gather(*[self._readCircuit(site, circuit) for circuit in site.get_circuits()])
+
+        # The status is the one of the first failure.
+        for circuit in snapshot["circuits"]:
+            for record in [circuit] + circuit["chargers"]:
+                if ((SysExitStatus.SUCCESS == status) and (record.get("status", SysExitStatus.SUCCESS.name) != SysExitStatus.SUCCESS.name)):
+                    status = SysExitStatus[record["status"]]
+
+        snapshot["status"] = status.name
+
+        return status, snapshot
+
+    async def run(self):
+        """Read the snapshot within the deadline. A request, which doesn't
+        fit into it, fails with a timeout and only its circuit or charger
+        is missing in the snapshot.
+
+        Returns:
+            SysExitStatus, dict: Status and snapshot
+        """
+        self._easee = EaseeClient(self._username, self._password, self._tokenStore, self._baseUri, self._retryPolicy, self._circuitBreaker)
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        token = setDeadline(Deadline(self._timeout))
+
+        with _TRACER.span("snapshot", "command") as span:
+            try:
+                status, snapshot = await self._read()
+            finally:
+                resetDeadline(token)
+                await self._easee.close()
+                self._easee = None
+
+            span.setArg("status", status.name)
+
+        return status, snapshot
+
+################################################################################
+# Functions
+################################################################################
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,243 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+from collections import deque
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+################################################################################
+# Classes
+################################################################################
+
+class EmaFilter():
+    """Exponential moving average filter.
+    """
+
+    def __init__(self, alpha=0.2):
+        """Creates the filter.
+
+        Args:
+            alpha (float, optional): Weight of a new sample, between 0 and 1. Defaults to 0.2.
+        """
+        self._alpha = alpha
+        self._value = None
+
+    def update(self, sample):
+        """Add a sample.
+
+        Args:
+            sample (float): Sample
+
+        Returns:
+            float: Filtered value
+        """
+        if (None == self._value):
+            self._value = sample
+        else:
+            self._value += self._alpha * (sample - self._value)
+
+        return self._value
+
+class MovingAverageFilter():
+    """Moving average over a window of the last samples.
+    """
+
+    def __init__(self, windowSize=10):
+        """Creates the filter.
+
+        Args:
+            windowSize (int, optional): Number of samples in the window. Defaults to 10.
+        """
+        self._window    = deque(maxlen=windowSize)
+        self._sum       = 0
+
+    def update(self, sample):
+        """Add a sample.
+
+        Args:
+            sample (float): Sample
+
+        Returns:
+            float: Filtered value
+        """
+        if (len(self._window) == self._window.maxlen):
+            self._sum -= self._window[0]
+
+        self._window.append(sample)
+        self._sum += sample
+
+        return self._sum / len(self._window)
+
+class PhaseSelector():
+    """Decides between 1 and 3 phase charging. The phases are only switched,
+    if the power exceeds the max. single phase power by the hysteresis and
+    the current phases were used for the min. dwell time.
+    """
+
+    def __init__(self, phasePowerMax, hysteresis=230, minDwellTime=300):
+        """Creates the phase selector.
+
+        Args:
+            phasePowerMax (float): Max. power of a single phase in W
+            hysteresis (float, optional): Hysteresis around the max. single phase power in W. Defaults to 230.
+            minDwellTime (float, optional): Min. time between two phase switches in s. Defaults to 300.
+        """
+        self._phasePowerMax = phasePowerMax
+        self._hysteresis    = hysteresis
+        self._minDwellTime  = minDwellTime
+        self._phases        = None
+        self._switchTime    = None
+        self._switchCount   = 0
+
+    def select(self, power, timestamp):
+        """Select the phases for the given power.
+
+        Args:
+            power (float): Power in W
+            timestamp (float): Time in s
+
+        Returns:
+            int: 1 or 3 phases
+        """
+        if (None == self._phases):
+            self._phases = 1 if (power <= self._phasePowerMax) else 3
+            self._switchTime = timestamp
+        elif (self._minDwellTime <= (timestamp - self._switchTime)):
+            phases = self._phases
+
+            if ((1 == self._phases) and ((self._phasePowerMax + self._hysteresis) < power)):
+                phases = 3
+            elif ((3 == self._phases) and (power < (self._phasePowerMax - self._hysteresis))):
+                phases = 1
+
+            if (phases != self._phases):
+                _LOGGER.info("Switch from %d to %d phase charging.", self._phases, phases)
+                self._phases = phases
+                self._switchTime = timestamp
+                self._switchCount += 1
+
+        return self._phases
+
+    def getSwitchCount(self):
+        """Get the number of phase switches.
+
+        Returns:
+            int: Number of phase switches
+        """
+        return self._switchCount
+
+class SurplusController():
+    """Derives the circuit power limit and phases from surplus power samples.
+    The samples are smoothed and a new setpoint is only emitted, if the
+    phases change or the power limit moved by the min. change.
+    """
+
+    def __init__(self, filter, phaseSelector, minChange=230):
+        """Creates the surplus controller.
+
+        Args:
+            filter (EmaFilter|MovingAverageFilter): Smoothing filter
+            phaseSelector (PhaseSelector): Phase selector
+            minChange (float, optional): Min. change of the power limit in W, which is emitted. Defaults to 230.
+        """
+        self._filter            = filter
+        self._phaseSelector     = phaseSelector
+        self._minChange         = minChange
+        self._powerLimit        = None
+        self._phases            = None
+        self._power             = None
+
+    def update(self, surplusPower, timestamp):
+        """Add a surplus power sample.
+
+        Args:
+            surplusPower (float): Surplus power in W
+            timestamp (float): Time in s
+
+        Returns:
+            int, int: New power limit in W and phases or None, None if the setpoint shall not change.
+        """
+        powerLimit = None
+        phases = None
+        power = self._filter.update(max(0, surplusPower))
+        self._power = power
+        selectedPhases = self._phaseSelector.select(power, timestamp)
+        filteredPowerLimit = int(round(power))
+
+        if ((None == self._powerLimit) or
+            (selectedPhases != self._phases) or
+            (self._minChange <= abs(filteredPowerLimit - self._powerLimit))):
+
+            self._powerLimit = filteredPowerLimit
+            self._phases = selectedPhases
+            powerLimit = filteredPowerLimit
+            phases = selectedPhases
+
+        return powerLimit, phases
+
+    def getFilteredPower(self):
+        """Get the smoothed surplus power of the latest sample.
+
+        Returns:
+            float: Filtered surplus power in W or None, if there was no sample yet.
+        """
+        return self._power
+
+################################################################################
+# Functions
+################################################################################
+
+def createSurplusController(phasePowerMax, filterName="ema", alpha=0.2, windowSize=10, hysteresis=230, minDwellTime=300, minChange=230):
+    """Create a surplus controller with its filter and phase selector.
+
+    Args:
+        phasePowerMax (float): Max. power of a single phase in W
+        filterName (str, optional): Smoothing filter "ema" or "window". Defaults to "ema".
+        alpha (float, optional): Weight of a new sample in the exponential moving average. Defaults to 0.2.
+        windowSize (int, optional): Number of samples in the moving window. Defaults to 10.
+        hysteresis (float, optional): Hysteresis around the max. single phase power in W. Defaults to 230.
+        minDwellTime (float, optional): Min. time between two phase switches in s. Defaults to 300.
+        minChange (float, optional): Min. change of the power limit in W, which is emitted. Defaults to 230.
+
+    Returns:
+        SurplusController: Surplus controller
+    """
+    if ("window" == filterName):
+        filter = MovingAverageFilter(windowSize)
+    else:
+        filter = EmaFilter(alpha)
+
+    phaseSelector = PhaseSelector(phasePowerMax, hysteresis, minDwellTime)
+
+    return SurplusController(filter, phaseSelector, minChange)
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,233 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import asyncio
+import os
+import stat
+import sys
+import time
+from .daemon import Daemon
+from .metrics import getMetrics
+from .sysExitStatus import SysExitStatus
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+_METRICS = getMetrics()
+
+################################################################################
+# Classes
+################################################################################
+
+class SurplusStream(Daemon):
+    """Keeps one authenticated Easee cloud session alive and drives the
+    circuit power limit by surplus power samples in W, which are read line
+    by line from stdin, a FIFO or a Unix socket. The samples are smoothed by
+    the surplus controller, which emits only relevant setpoints.
+
+    With a adaptive interval, the setpoints are submitted in control cycles
+    instead, which read the power limit back too. A step of the surplus
+    power, a new setpoint or a move of the filtered surplus power starts a
+    cycle after the min. interval.
+    """
+
+    def __init__(self, evecc, surplusController, inputPath="-", outputStream=sys.stdout, rateLimiter=None, metricsPort=None, telemetry=None, adaptiveInterval=None):
+        """Creates the surplus stream.
+
+        Args:
+            evecc (EVECC): Electric vehicle easee charge controller
+            surplusController (SurplusController): Surplus controller
+            inputPath (str, optional): FIFO or Unix socket path, "-" for stdin. Defaults to "-".
+            outputStream (file, optional): Result output stream. Defaults to sys.stdout.
+            rateLimiter (RateLimiter, optional): Rate limiter. Defaults to None, which means 20 requests per minute.
+            metricsPort (int, optional): Serve the metrics on this local TCP port. Defaults to None.
+            telemetry (Telemetry, optional): Subscribe to the charger observations and keep them in this snapshot. Defaults to None.
+            adaptiveInterval (AdaptiveInterval, optional): Interval of the control cycles. Defaults to None, which means every sample is controlled.
+        """
+        super().__init__(evecc, sys.stdin, outputStream, rateLimiter, metricsPort, telemetry)
+
+        self._surplusController = surplusController
+        self._inputPath         = inputPath
+        self._reader            = None
+        self._writer            = None
+        self._adaptiveInterval  = adaptiveInterval
+        self._setpoint          = None
+        self._controlTask       = None
+        self._stepEvent         = asyncio.Event()
+
+    async def _open(self):
+        """Open the input.
+        """
+        if ("-" != self._inputPath):
+            if (True == stat.S_ISSOCK(os.stat(self._inputPath).st_mode)):
+                self._reader, self._writer = await asyncio.open_unix_connection(self._inputPath)
+            else:
+                # Opening a FIFO blocks until the writer opened it too.
+                loop = asyncio.get_running_loop()
+                self._inputStream = await loop.run_in_executor(None, open, self._inputPath, "r")
+
+    def _close(self):
+        """Close the input.
+        """
+        if (None != self._writer):
+            self._writer.close()
+            self._reader = None
+            self._writer = None
+        elif (sys.stdin != self._inputStream):
+            self._inputStream.close()
+            self._inputStream = sys.stdin
+
+    async def _readLine(self):
+        """Read the next line from the input, without blocking the event loop.
+
+        Returns:
+            str: Line or empty string at the end of input.
+        """
+        line = ""
+
+        if (None != self._reader):
+            line = (await self._reader.readline()).decode("utf-8")
+        else:
+            line = await super()._readLine()
+
+        # The last setpoint is sent at the end of input, like without cycles.
+        if ((0 == len(line)) and (None != self._controlTask)):
+            self._controlTask.cancel()
+            self._controlTask = None
+            self._submitSetpoint()
+
+        return line
+
+    def _submitSetpoint(self):
+        if (None != self._setpoint):
+            self._scheduler.submit(*self._setpoint)
+            self._setpoint = None
+
+    async def _control(self):
+        """Submit the latest setpoint and read the power limit back in
+        cycles, whose interval adapts to the variance of both.
+        """
+        loop = asyncio.get_running_loop()
+        sent = 0
+
+        while True:
+            cycleTime = loop.time()
+
+            self._submitSetpoint()
+
+            try:
+                status, powerLimit = await self._evecc.getCircuitPowerLimit()
+            except Exception as ex:
+                _LOGGER.warning("Read back failed: %s", ex)
+                status = SysExitStatus.FAILED
+
+            # The setpoint is written concurrently, maybe after the read back.
+            isWritten = sent != self._scheduler.getStatistics()["sent"]
+            sent = self._scheduler.getStatistics()["sent"]
+            interval, reason = self._adaptiveInterval.update(powerLimit if (SysExitStatus.SUCCESS == status) else None, isWritten)
+
+            _LOGGER.debug("Next cycle in %.1f s: %s", interval, reason)
+            _METRICS.setGauge("evecc_control_interval_seconds", "Interval of the control cycles.", interval)
+            _METRICS.incCounter("evecc_control_interval_decisions_total", "Number of control interval decisions by reason.", { "reason": reason })
+
+            # A wake up only shortens the interval down to the min. one.
+            try:
+                await asyncio.wait_for(self._stepEvent.wait(), max(0, cycleTime + interval - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+
+            await asyncio.sleep(max(0, cycleTime + self._adaptiveInterval.getMinInterval() - loop.time()))
+            self._stepEvent.clear()
+
+    async def _processCommand(self, line):
+        """Process a single surplus power sample.
+
+        Args:
+            line (str): Surplus power in W
+
+        Returns:
+            bool: Always True, because only the end of input stops it.
+        """
+        if (0 < len(line.strip())):
+            try:
+                surplusPower = float(line)
+            except ValueError:
+                _LOGGER.warning("Invalid surplus power sample: %s", line.strip())
+            else:
+                powerLimit, phases = self._surplusController.update(surplusPower, time.monotonic())
+
+                if (None == self._adaptiveInterval):
+                    if (None != powerLimit):
+                        self._scheduler.submit(powerLimit, phases)
+                else:
+                    if (None != powerLimit):
+                        self._setpoint = (powerLimit, phases)
+                        self._adaptiveInterval.addSetpoint()
+
+                    if (True == self._adaptiveInterval.addSample(surplusPower, self._surplusController.getFilteredPower())):
+                        self._stepEvent.set()
+
+                    if (None == self._controlTask):
+                        self._controlTask = asyncio.create_task(self._control())
+
+        return True
+
+    async def run(self):
+        """Login, resolve site and circuit once and drive the circuit power
+        limit until the input ends.
+
+        Returns:
+            SysExitStatus: Status
+        """
+        await self._open()
+
+        try:
+            status = await super().run()
+        finally:
+            if (None != self._controlTask):
+                self._controlTask.cancel()
+                self._controlTask = None
+
+            self._close()
+
+        if (None != self._scheduler):
+            _LOGGER.info("Statistics: %s", self._scheduler.getStatistics())
+
+        if (None != self._adaptiveInterval):
+            _LOGGER.info("Control interval: %.1f s (%s)", self._adaptiveInterval.getInterval(), self._adaptiveInterval.getReason())
+
+        return status
+
+################################################################################
+# Functions
+################################################################################
+
+################################################################################
+# Main
+################################################################################
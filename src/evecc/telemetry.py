@@ -0,0 +1,218 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import time
+from .metrics import getMetrics
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+_METRICS = getMetrics()
+
+# Charger observation ids, see ChargerStreamData in pyeasee.const.
+_OBSERVATION_CHARGER_OP_MODE           = 109
+_OBSERVATION_DYNAMIC_CIRCUIT_CURRENT_P1 = 111
+_OBSERVATION_DYNAMIC_CIRCUIT_CURRENT_P2 = 112
+_OBSERVATION_DYNAMIC_CIRCUIT_CURRENT_P3 = 113
+_OBSERVATION_TOTAL_POWER                = 120
+
+_OBSERVATION_NAMES = {
+    _OBSERVATION_CHARGER_OP_MODE:               "chargerOpMode",
+    _OBSERVATION_DYNAMIC_CIRCUIT_CURRENT_P1:    "dynamicCircuitCurrentP1",
+    _OBSERVATION_DYNAMIC_CIRCUIT_CURRENT_P2:    "dynamicCircuitCurrentP2",
+    _OBSERVATION_DYNAMIC_CIRCUIT_CURRENT_P3:    "dynamicCircuitCurrentP3",
+    _OBSERVATION_TOTAL_POWER:                   "totalPower"
+}
+
+################################################################################
+# Classes
+################################################################################
+
+class Telemetry():
+    """In memory snapshot of the charger observations, which the Easee cloud
+    pushes via its SignalR stream. It holds the dynamic circuit currents,
+    which every charger of a circuit reports, and the actual power and
+    operation mode of each charger. Reading it costs no request.
+
+    Every observation is stored with the time it was received. Circuit
+    currents, which were received before the last local write or are older
+    than the max. age, are stale and not provided.
+    """
+
+    def __init__(self, clock=time.time, maxAge=300):
+        """Creates a empty snapshot.
+
+        Args:
+            clock (function, optional): Time source in s. Defaults to time.time.
+            maxAge (float, optional): Max. age of the circuit currents in s. Defaults to 300.
+        """
+        self._clock         = clock
+        self._maxAge        = maxAge
+        self._chargers      = {}
+        self._eventCount    = 0
+        self._writeTime     = None
+
+    def update(self, chargerId, observationId, value):
+        """Take over a single observation. Observations, which are not part
+        of the snapshot, are ignored.
+
+        Args:
+            chargerId (str): Charger id
+            observationId (int): Observation id
+            value (float): Observation value
+        """
+        if (observationId in _OBSERVATION_NAMES):
+            # A invalid value shall not leave a charger without observations.
+            value = float(value)
+            charger = self._chargers.setdefault(chargerId, {})
+            charger[_OBSERVATION_NAMES[observationId]] = (value, self._clock())
+            self._eventCount += 1
+
+            _METRICS.incCounter("evecc_telemetry_events_total", "Number of charger observations, received via the stream.")
+
+    async def onObservation(self, chargerId, dataType, observationId, value):
+        """Stream callback, see Easee.sr_subscribe().
+
+        Args:
+            chargerId (str): Charger id
+            dataType (int): Data type of the value
+            observationId (int): Observation id
+            value (any): Observation value, already converted to its data type.
+        """
+        _LOGGER.debug("Observation %s of %s: %s", observationId, chargerId, value)
+
+        try:
+            self.update(chargerId, observationId, value)
+        except (TypeError, ValueError):
+            _LOGGER.warning("Invalid observation %s of %s: %s", observationId, chargerId, value)
+
+    def invalidateCircuitCurrents(self):
+        """Mark the circuit currents as stale, because they were written
+        locally. Only currents, which are received afterwards, are provided.
+        """
+        self._writeTime = self._clock()
+
+    def getCircuitCurrents(self):
+        """Get the latest dynamic circuit currents, which any charger of the
+        circuit reported.
+
+        Returns:
+            list: Phase 1, 2 and 3 current in A or None, if not all are known yet or they are stale.
+        """
+        currents = None
+        latestTimestamp = None
+
+        for charger in self._chargers.values():
+            observations = [
+                charger.get(_OBSERVATION_NAMES[_OBSERVATION_DYNAMIC_CIRCUIT_CURRENT_P1]),
+                charger.get(_OBSERVATION_NAMES[_OBSERVATION_DYNAMIC_CIRCUIT_CURRENT_P2]),
+                charger.get(_OBSERVATION_NAMES[_OBSERVATION_DYNAMIC_CIRCUIT_CURRENT_P3])
+            ]
+
+            if (None in observations):
+                continue
+
+            timestamp = max(observation[1] for observation in observations)
+
+            if ((None == latestTimestamp) or (latestTimestamp < timestamp)):
+                latestTimestamp = timestamp
+                currents = [observation[0] for observation in observations]
+
+        if ((None != currents) and
+            (((None != self._writeTime) and (latestTimestamp < self._writeTime)) or
+             (self._maxAge < (self._clock() - latestTimestamp)))):
+
+            _METRICS.incCounter("evecc_telemetry_stale_total", "Number of circuit currents in the stream snapshot, which were too old to be read.")
+            currents = None
+
+        return currents
+
+    def getChargerPower(self, chargerId):
+        """Get the actual power of a charger.
+
+        Args:
+            chargerId (str): Charger id
+
+        Returns:
+            float: Power in W or None, if unknown.
+        """
+        power = None
+        observation = self._chargers.get(chargerId, {}).get(_OBSERVATION_NAMES[_OBSERVATION_TOTAL_POWER])
+
+        if (None != observation):
+            # The charger reports kW.
+            power = observation[0] * 1000
+
+        return power
+
+    def getChargerOpMode(self, chargerId):
+        """Get the operation mode of a charger.
+
+        Args:
+            chargerId (str): Charger id
+
+        Returns:
+            int: Operation mode, see STATUS in pyeasee.charger, or None if unknown.
+        """
+        opMode = None
+        observation = self._chargers.get(chargerId, {}).get(_OBSERVATION_NAMES[_OBSERVATION_CHARGER_OP_MODE])
+
+        if (None != observation):
+            opMode = int(observation[0])
+
+        return opMode
+
+    def getSnapshot(self):
+        """Get the snapshot, e.g. to print it as JSON.
+
+        Returns:
+            dict: Circuit currents in A, the power in W of each charger and the age of its observations in s.
+        """
+        now = self._clock()
+        chargers = {}
+
+        for chargerId, charger in self._chargers.items():
+            chargers[chargerId] = {
+                "power": self.getChargerPower(chargerId),
+                "age": round(now - max(observation[1] for observation in charger.values()), 3)
+            }
+
+        return {
+            "circuitCurrents": self.getCircuitCurrents(),
+            "chargers": chargers,
+            "events": self._eventCount
+        }
+
+################################################################################
+# Functions
+################################################################################
+
+################################################################################
+# Main
+################################################################################
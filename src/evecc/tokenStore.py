@@ -0,0 +1,92 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import json
+from datetime import datetime
+from .jsonStore import saveJsonFile
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+################################################################################
+# Classes
+################################################################################
+
+class TokenStore():
+    """Stores the access and refresh token in a file, which is only accessible
+    by the owner. It is reused by the next program run to avoid a login.
+    """
+
+    def __init__(self, fileName):
+        """Creates the token store.
+
+        Args:
+            fileName (str): Token file name
+        """
+        self._fileName = fileName
+
+    def load(self):
+        """Load the token from the file.
+
+        Returns:
+            dict: Token or empty dict, if no valid token is stored.
+        """
+        token = {}
+
+        try:
+            with open(self._fileName, "r", encoding="utf-8") as fd:
+                token = json.load(fd)
+
+            token["expires"] = datetime.fromisoformat(token["expires"])
+        except FileNotFoundError:
+            token = {}
+        except (OSError, ValueError, KeyError, TypeError) as ex:
+            _LOGGER.warning("Token file %s ignored: %s", self._fileName, ex)
+            token = {}
+
+        return token
+
+    def save(self, token):
+        """Store the token in the file.
+
+        Args:
+            token (dict): Token
+        """
+        data = dict(token)
+        data["expires"] = token["expires"].isoformat()
+
+        saveJsonFile(self._fileName, data, dirMode=0o700)
+
+################################################################################
+# Functions
+################################################################################
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,262 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import logging
+import json
+import os
+import sys
+import time
+import weakref
+
+################################################################################
+# Variables
+################################################################################
+
+_LOGGER = logging.getLogger(__file__)
+
+_tracer = None
+
+################################################################################
+# Classes
+################################################################################
+
+class Span():
+    """A traced stage or request, from entering until leaving the with
+    statement.
+    """
+
+    def __init__(self, tracer, name, category, args):
+        """Creates the span.
+
+        Args:
+            tracer (Tracer): Tracer, which records the span.
+            name (str): Name, e.g. "GET /api/sites"
+            category (str): Category, e.g. "http"
+            args (dict): Arguments, which are shown by the viewer.
+        """
+        self._tracer    = tracer
+        self._name      = name
+        self._category  = category
+        self._args      = args
+        self._start     = None
+        self._trackId   = None
+
+    def setArg(self, name, value):
+        """Add a argument, e.g. a result which is known at the end.
+
+        Args:
+            name (str): Argument name
+            value (any): Argument value, which is serializable to JSON.
+        """
+        self._args[name] = value
+
+    def __enter__(self):
+        self._trackId = self._tracer._getTrackId()
+        self._start = self._tracer._now()
+
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if (None != excType):
+            self._args["error"] = "%s: %s" % (excType.__name__, excValue)
+
+        self._tracer._addSpan(self._name, self._category, self._start, self._tracer._now() - self._start, self._trackId, self._args)
+
+        return False
+
+class _NullSpan():
+    """Span of a disabled tracer, which records nothing.
+    """
+
+    def setArg(self, name, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class Tracer():
+    """Records spans of the command stages and the cloud requests and writes
+    them in the Chrome trace event format, which chrome://tracing and
+    Perfetto (https://ui.perfetto.dev) show. Every asyncio task gets its own
+    track, so concurrent requests are shown side by side.
+
+    A disabled tracer records nothing, which keeps the spans cheap.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        """Creates a disabled tracer.
+
+        Args:
+            clock (function, optional): Clock, which returns the time in s. Defaults to time.perf_counter.
+        """
+        self._clock         = clock
+        self._isEnabled     = False
+        self._origin        = clock()
+        self._events        = []
+        self._trackIds      = weakref.WeakKeyDictionary()
+        self._trackCount    = 0
+
+    def enable(self):
+        """Start recording.
+        """
+        self._isEnabled = True
+
+    def isEnabled(self):
+        """Is the tracer recording?
+
+        Returns:
+            bool: If enabled, it will return True otherwise False.
+        """
+        return self._isEnabled
+
+    def _now(self):
+        # Microseconds since the tracer was created.
+        return (self._clock() - self._origin) * 1000000
+
+    def _getTrackId(self):
+        """Get the track of the current asyncio task. Outside of a task, the
+        main track 0 is used.
+
+        Returns:
+            int: Track id
+        """
+        trackId = 0
+        asyncio = sys.modules.get("asyncio")
+        task = None
+
+        # asyncio is only loaded by the commands, which use the cloud.
+        if (None != asyncio):
+            try:
+                task = asyncio.current_task()
+            except RuntimeError:
+                pass
+
+        if (None != task):
+            if (task not in self._trackIds):
+                self._trackCount += 1
+                self._trackIds[task] = self._trackCount
+                self._events.append({
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": self._trackIds[task],
+                    "args": { "name": task.get_name() }
+                })
+
+            trackId = self._trackIds[task]
+
+        return trackId
+
+    def _addSpan(self, name, category, start, duration, trackId, args):
+        self._events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round(start, 1),
+            "dur": round(duration, 1),
+            "pid": os.getpid(),
+            "tid": trackId,
+            "args": args
+        })
+
+    def span(self, name, category="stage", args=None):
+        """Create a span, which is recorded by a with statement.
+
+        Args:
+            name (str): Name, e.g. "GET /api/sites"
+            category (str, optional): Category, e.g. "http". Defaults to "stage".
+            args (dict, optional): Arguments, which are shown by the viewer. Defaults to None.
+
+        Returns:
+            Span: Span
+        """
+        span = _NULL_SPAN
+
+        if (True == self._isEnabled):
+            span = Span(self, name, category, dict(args) if None != args else {})
+
+        return span
+
+    def getEvents(self):
+        """Get the recorded trace events.
+
+        Returns:
+            list: Trace events
+        """
+        return list(self._events)
+
+    def writeFile(self, fileName):
+        """Write the trace events in JSON.
+
+        Args:
+            fileName (str): File name, should end with .json
+
+        Raises:
+            OSError: File not written
+        """
+        events = [{
+            "name": "process_name",
+            "ph": "M",
+            "pid": os.getpid(),
+            "tid": 0,
+            "args": { "name": "evecc" }
+        }, {
+            "name": "thread_name",
+            "ph": "M",
+            "pid": os.getpid(),
+            "tid": 0,
+            "args": { "name": "main" }
+        }]
+
+        with open(fileName, "w", encoding="utf-8") as fd:
+            json.dump({ "traceEvents": events + self._events, "displayTimeUnit": "ms" }, fd)
+
+        _LOGGER.info("%d trace events written to %s.", len(self._events), fileName)
+
+################################################################################
+# Functions
+################################################################################
+
+def getTracer():
+    """Get the tracer of this process.
+
+    Returns:
+        Tracer: Tracer
+    """
+    global _tracer
+
+    if (None == _tracer):
+        _tracer = Tracer()
+
+    return _tracer
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,147 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+from evecc.adaptiveInterval import AdaptiveInterval, getStandardDeviation
+from evecc.adaptiveInterval import REASON_START, REASON_STEP, REASON_SETPOINT, REASON_SURPLUS_MOVES
+from evecc.adaptiveInterval import REASON_SURPLUS_VARIES, REASON_SETTINGS_VARY, REASON_STABLE, REASON_BUDGET
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+################################################################################
+# Functions
+################################################################################
+
+def _createAdaptiveInterval():
+    # The budget allows a cycle every 6 s, which is below the min. interval.
+    return AdaptiveInterval(10, 300, 230, requestsPerCycle=2, requestsPerPeriod=20)
+
+def test_startsWithMinInterval():
+    adaptiveInterval = _createAdaptiveInterval()
+
+    assert 10 == adaptiveInterval.getInterval()
+    assert REASON_START == adaptiveInterval.getReason()
+
+def test_stableGrowsToMax():
+    adaptiveInterval = _createAdaptiveInterval()
+
+    assert (15, REASON_STABLE) == adaptiveInterval.update(11040)
+    assert (22.5, REASON_STABLE) == adaptiveInterval.update(11040)
+
+    for _ in range(20):
+        adaptiveInterval.update(11040)
+
+    assert 300 == adaptiveInterval.getInterval()
+
+def test_budgetRaisesMinInterval():
+    adaptiveInterval = AdaptiveInterval(1, 300, requestsPerCycle=2, requestsPerPeriod=20)
+
+    assert 6 == adaptiveInterval.getMinInterval()
+
+    # Surplus varies, but the interval can't be halved below the budget.
+    for surplusPower in [0, 600, 0, 600]:
+        adaptiveInterval.addSample(surplusPower)
+
+    assert (6, REASON_BUDGET) == adaptiveInterval.update()
+
+def test_stepReturnsToMinInterval():
+    adaptiveInterval = _createAdaptiveInterval()
+
+    for _ in range(5):
+        adaptiveInterval.update()
+
+    assert False == adaptiveInterval.addSample(1000)
+    assert True == adaptiveInterval.addSample(5000)
+    assert (10, REASON_STEP) == adaptiveInterval.update()
+    assert (10, REASON_SURPLUS_VARIES) == adaptiveInterval.update()
+
+def test_setpointReturnsToMinInterval():
+    adaptiveInterval = _createAdaptiveInterval()
+
+    for _ in range(5):
+        adaptiveInterval.update()
+
+    adaptiveInterval.addSetpoint()
+
+    assert True == adaptiveInterval.addSample(1000)
+    assert (10, REASON_SETPOINT) == adaptiveInterval.update()
+
+def test_filteredMoveReturnsToMinInterval():
+    adaptiveInterval = AdaptiveInterval(10, 300, 230, hysteresis=200)
+
+    adaptiveInterval.addSample(1000, 1000)
+
+    for _ in range(5):
+        adaptiveInterval.update()
+
+    # A slow ramp is no step, but the filtered surplus moves.
+    assert False == adaptiveInterval.addSample(1100, 1150)
+    assert True == adaptiveInterval.addSample(1200, 1250)
+    assert (10, REASON_SURPLUS_MOVES) == adaptiveInterval.update()
+
+    # The move is measured from the last cycle.
+    assert False == adaptiveInterval.addSample(1300, 1400)
+
+def test_surplusVariesHalves():
+    adaptiveInterval = _createAdaptiveInterval()
+
+    adaptiveInterval.update()
+    adaptiveInterval.update()
+
+    for surplusPower in [0, 600, 0, 600]:
+        assert False == adaptiveInterval.addSample(surplusPower)
+
+    assert (11.25, REASON_SURPLUS_VARIES) == adaptiveInterval.update()
+
+def test_settingsVaryHalves():
+    adaptiveInterval = _createAdaptiveInterval()
+
+    adaptiveInterval.update()
+    adaptiveInterval.update()
+
+    assert (33.75, REASON_STABLE) == adaptiveInterval.update(0)
+    assert (16.875, REASON_SETTINGS_VARY) == adaptiveInterval.update(1000)
+
+def test_ownWriteIsNoVariation():
+    adaptiveInterval = _createAdaptiveInterval()
+
+    adaptiveInterval.update(0)
+    adaptiveInterval.update(1000, True)
+
+    assert (33.75, REASON_STABLE) == adaptiveInterval.update(1000)
+
+def test_standardDeviation():
+    assert 0 == getStandardDeviation([])
+    assert 0 == getStandardDeviation([5])
+    assert 1 == getStandardDeviation([1, 3, 1, 3])
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,99 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import json
+import os
+import pytest
+from evecc.batch import loadBatchFile
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+################################################################################
+# Functions
+################################################################################
+
+def _writeBatchFile(tmp_path, data):
+    fileName = os.path.join(tmp_path, "batch.json")
+
+    with open(fileName, "w", encoding="utf-8") as fd:
+        fd.write(data if isinstance(data, str) else json.dumps(data))
+
+    return fileName
+
+def test_validBatchFile(tmp_path):
+    circuits = [
+        { "siteKey": "SITE-0", "circuitPanelId": 1 },
+        { "siteKey": "SITE-0", "circuitPanelId": 2, "powerLimit": 7000 },
+        { "siteKey": "SITE-1", "circuitPanelId": 1, "powerLimit": 3680.5 },
+        { "siteKey": "SITE-1", "circuitPanelId": 2, "powerLimit": 0 }
+    ]
+
+    assert circuits == loadBatchFile(_writeBatchFile(tmp_path, { "circuits": circuits }))
+
+def test_validTomlBatchFile(tmp_path):
+    pytest.importorskip("tomllib")
+    fileName = os.path.join(tmp_path, "batch.toml")
+
+    with open(fileName, "w", encoding="utf-8") as fd:
+        fd.write("[[circuits]]\nsiteKey = \"SITE-0\"\ncircuitPanelId = 1\npowerLimit = 7000\n")
+
+    assert [{ "siteKey": "SITE-0", "circuitPanelId": 1, "powerLimit": 7000 }] == loadBatchFile(fileName)
+
+@pytest.mark.parametrize("data", [
+    [],
+    { "circuits": {} },
+    { "circuits": [ "SITE-0/1" ] },
+    { "circuits": [ { "siteKey": "SITE-0" } ] },
+    { "circuits": [ { "siteKey": 1, "circuitPanelId": 1 } ] },
+    { "circuits": [ { "siteKey": "SITE-0", "circuitPanelId": "1" } ] },
+    { "circuits": [ { "siteKey": "SITE-0", "circuitPanelId": 1.5 } ] },
+    { "circuits": [ { "siteKey": "SITE-0", "circuitPanelId": True } ] },
+    { "circuits": [ { "siteKey": "SITE-0", "circuitPanelId": 1, "powerLimit": "7000" } ] },
+    { "circuits": [ { "siteKey": "SITE-0", "circuitPanelId": 1, "powerLimit": -1 } ] },
+    { "circuits": [ { "siteKey": "SITE-0", "circuitPanelId": 1, "powerLimit": False } ] }
+])
+def test_invalidBatchFile(tmp_path, data):
+    with pytest.raises(ValueError):
+        loadBatchFile(_writeBatchFile(tmp_path, data))
+
+def test_notFinitePowerLimit(tmp_path):
+    fileName = _writeBatchFile(tmp_path, "{ \"circuits\": [ { \"siteKey\": \"SITE-0\", \"circuitPanelId\": 1, \"powerLimit\": NaN } ] }")
+
+    with pytest.raises(ValueError, match="Circuit 1: powerLimit nan"):
+        loadBatchFile(fileName)
+
+def test_invalidJson(tmp_path):
+    with pytest.raises(ValueError):
+        loadBatchFile(_writeBatchFile(tmp_path, "{ \"circuits\": ["))
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,85 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+from evecc.chargeLogic import ChargeLogic
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+################################################################################
+# Functions
+################################################################################
+
+def test_singlePhase():
+    assert [16, 0, 0] == ChargeLogic().calcPhaseCurrentLimits(3680)
+    assert [10, 0, 0] == ChargeLogic().calcPhaseCurrentLimits(2300)
+
+def test_triplePhase():
+    assert [10, 10, 10] == ChargeLogic().calcPhaseCurrentLimits(6900)
+    assert [6, 6, 6] == ChargeLogic().calcPhaseCurrentLimits(4140, 3)
+
+def test_forcedSinglePhaseIsLimited():
+    assert [16, 0, 0] == ChargeLogic().calcPhaseCurrentLimits(6900, 1)
+
+def test_circuitPowerLimit():
+    assert 11040 == ChargeLogic().calcCircuitPowerLimit([16, 16, 16])
+    assert 3680 == ChargeLogic().calcCircuitPowerLimit([16, 0, 0])
+
+def test_unknownCurrentsAreWritten():
+    currents, isWrite, isPhaseSwitch = ChargeLogic(1).decide(6900, None, None)
+
+    assert [10, 10, 10] == currents
+    assert True == isWrite
+    assert False == isPhaseSwitch
+
+def test_unchangedCurrentsAreSkipped():
+    _, isWrite, _ = ChargeLogic().decide(6900, None, [10, 10, 10])
+
+    assert False == isWrite
+
+def test_changeWithinDeadbandIsSkipped():
+    chargeLogic = ChargeLogic(1)
+
+    # 10.5 A per phase
+    assert False == chargeLogic.decide(7245, None, [10, 10, 10])[1]
+
+    # 11.5 A per phase
+    assert True == chargeLogic.decide(7935, None, [10, 10, 10])[1]
+
+def test_phaseSwitch():
+    chargeLogic = ChargeLogic()
+
+    assert (True, True) == chargeLogic.decide(3680, None, [10, 10, 10])[1:]
+    assert (True, True) == chargeLogic.decide(6900, None, [16, 0, 0])[1:]
+    assert (True, False) == chargeLogic.decide(2300, None, [16, 0, 0])[1:]
+
+################################################################################
+# Main
+################################################################################
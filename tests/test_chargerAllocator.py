@@ -0,0 +1,116 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+from evecc.chargerAllocator import ChargerAllocator
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+################################################################################
+# Functions
+################################################################################
+
+def _createCharger(chargerId, phases=3, maxCurrent=16):
+    return {
+        "id": chargerId,
+        "maxCurrent": maxCurrent,
+        "phases": phases
+    }
+
+def test_fairShare():
+    chargerAllocator = ChargerAllocator()
+    chargers = [_createCharger("a"), _createCharger("b")]
+
+    assert { "a": 8, "b": 8 } == chargerAllocator.allocate(11040, chargers)
+
+def test_roundedDown():
+    chargerAllocator = ChargerAllocator()
+    chargers = [_createCharger("a"), _createCharger("b")]
+
+    # 7.2 A per charger, a further step of 690 W each doesn't fit.
+    assert { "a": 7, "b": 7 } == chargerAllocator.allocate(10000, chargers)
+
+def test_remainderHandedOut():
+    chargerAllocator = ChargerAllocator()
+    chargers = [_createCharger("a", 1), _createCharger("b", 1), _createCharger("c", 1)]
+
+    # 7.4 A per charger and 270 W remain, which is one step.
+    currents = chargerAllocator.allocate(5100, chargers)
+
+    assert { "a": 8, "b": 7, "c": 7 } == currents
+
+def test_remainderByLargestFraction():
+    chargerAllocator = ChargerAllocator()
+    chargers = [_createCharger("a", 1, 7), _createCharger("b", 1), _createCharger("c", 1)]
+
+    # a is limited to 7 A, b and c get 7.8 A and one of them the remaining step.
+    currents = chargerAllocator.allocate(5198, chargers)
+
+    assert { "a": 7, "b": 8, "c": 7 } == currents
+    assert 5198 >= sum(currents.values()) * 230
+
+def test_maxCurrentLimits():
+    chargerAllocator = ChargerAllocator()
+    chargers = [_createCharger("a", 1, 10), _createCharger("b", 1)]
+
+    assert { "a": 10, "b": 13 } == chargerAllocator.allocate(5405, chargers)
+    assert { "a": 10, "b": 16 } == chargerAllocator.allocate(20000, chargers)
+
+def test_mixedPhases():
+    chargerAllocator = ChargerAllocator()
+    chargers = [_createCharger("a", 1), _createCharger("b", 3)]
+
+    # b is at its min. current, the rest goes to a.
+    assert { "a": 8, "b": 6 } == chargerAllocator.allocate(6000, chargers)
+
+def test_pausedByPriority():
+    chargerAllocator = ChargerAllocator()
+
+    assert { "a": 0, "b": 0 } == chargerAllocator.allocate(2000, [_createCharger("a"), _createCharger("b")])
+    assert { "a": 16, "b": 0 } == chargerAllocator.allocate(5000, [_createCharger("a", 1), _createCharger("b")])
+
+def test_laterChargerAdmitted():
+    chargerAllocator = ChargerAllocator()
+    chargers = [_createCharger("a"), _createCharger("b"), _createCharger("c", 1)]
+
+    # b doesn't fit anymore, but the single phase charger c does.
+    currents = chargerAllocator.allocate(5600, chargers)
+
+    assert 0 == currents["b"]
+    assert 6 <= currents["a"]
+    assert 6 <= currents["c"]
+    assert 5600 >= (currents["a"] * 3 + currents["c"]) * 230
+
+def test_noChargers():
+    assert {} == ChargerAllocator().allocate(11040, [])
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,146 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import json
+import os
+import stat
+import pytest
+import evecc.circuitState
+from evecc.circuitState import CircuitState
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+class _Time():
+    """Replaces the time module, whose time is only advanced manually.
+    """
+    def __init__(self, timestamp=1000.0):
+        self.timestamp = timestamp
+
+    def time(self):
+        return self.timestamp
+
+################################################################################
+# Functions
+################################################################################
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Time()
+    monkeypatch.setattr(evecc.circuitState, "time", clock)
+
+    return clock
+
+def test_unknownCircuit(clock):
+    assert None == CircuitState().getCurrents("SITE-0", 1)
+
+def test_currentsPerCircuit(clock):
+    circuitState = CircuitState()
+    circuitState.setCurrents("SITE-0", 1, [16, 0, 0])
+    circuitState.setCurrents("SITE-0", 2, [10, 10, 10])
+
+    assert [16, 0, 0] == circuitState.getCurrents("SITE-0", 1)
+    assert [10, 10, 10] == circuitState.getCurrents("SITE-0", 2)
+    assert None == circuitState.getCurrents("SITE-1", 1)
+
+def test_currentsExpire(clock):
+    circuitState = CircuitState(maxAge=600)
+    circuitState.setCurrents("SITE-0", 1, [16, 0, 0])
+
+    clock.timestamp += 599
+    assert [16, 0, 0] == circuitState.getCurrents("SITE-0", 1)
+
+    # Someone else may have changed them meanwhile.
+    clock.timestamp += 1
+    assert None == circuitState.getCurrents("SITE-0", 1)
+
+def test_invalidate(clock):
+    circuitState = CircuitState()
+    circuitState.setCurrents("SITE-0", 1, [16, 0, 0])
+    circuitState.invalidate("SITE-0", 1)
+    circuitState.invalidate("SITE-0", 2)
+
+    assert None == circuitState.getCurrents("SITE-0", 1)
+
+def test_storedForNextRun(tmp_path, clock):
+    fileName = os.path.join(tmp_path, "state", "state.json")
+    circuitState = CircuitState(fileName)
+    circuitState.setCurrents("SITE-0", 1, [16, 0, 0])
+    circuitState.save()
+
+    assert [16, 0, 0] == CircuitState(fileName).getCurrents("SITE-0", 1)
+
+    # No temporary file is left and others can't read it.
+    assert ["state.json"] == os.listdir(os.path.join(tmp_path, "state"))
+
+    if ("nt" != os.name):
+        assert 0 == (stat.S_IMODE(os.stat(fileName).st_mode) & 0o077)
+
+def test_storedCurrentsExpire(tmp_path, clock):
+    fileName = os.path.join(tmp_path, "state.json")
+    circuitState = CircuitState(fileName, 600)
+    circuitState.setCurrents("SITE-0", 1, [16, 0, 0])
+    circuitState.save()
+
+    clock.timestamp += 600
+    assert None == CircuitState(fileName, 600).getCurrents("SITE-0", 1)
+
+@pytest.mark.parametrize("text", ["{ \"SITE-0/1\": ", "[ 1, 2 ]"])
+def test_invalidFileIgnored(tmp_path, clock, text):
+    fileName = os.path.join(tmp_path, "state.json")
+
+    with open(fileName, "w", encoding="utf-8") as fd:
+        fd.write(text)
+
+    circuitState = CircuitState(fileName)
+
+    assert None == circuitState.getCurrents("SITE-0", 1)
+
+    # The invalid file is replaced.
+    circuitState.setCurrents("SITE-0", 1, [16, 0, 0])
+    circuitState.save()
+
+    with open(fileName, "r", encoding="utf-8") as fd:
+        assert [16, 0, 0] == json.load(fd)["SITE-0/1"]["currents"]
+
+def test_saveFailureOnlyLogged(tmp_path, clock):
+    with open(os.path.join(tmp_path, "file"), "w", encoding="utf-8") as fd:
+        fd.write("No directory")
+
+    circuitState = CircuitState(os.path.join(tmp_path, "file", "state.json"))
+    circuitState.setCurrents("SITE-0", 1, [16, 0, 0])
+    circuitState.save()
+
+    # The state is kept in memory.
+    assert [16, 0, 0] == circuitState.getCurrents("SITE-0", 1)
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,218 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import asyncio
+import os
+import stat
+import aiohttp
+import pytest
+from aiohttp import web
+from mockCloud import MockCloud
+from evecc.controlServer import ControlServer, isLoopbackAddress
+from evecc.evecc import EVECC
+from evecc.rateLimiter import RateLimiter
+from evecc.retryPolicy import RetryPolicy
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+################################################################################
+# Functions
+################################################################################
+
+def _run(tmp_path, command):
+    """Run the control server on a Unix socket, connected to the mock cloud,
+    and a command of a client.
+
+    Args:
+        tmp_path (str): Directory of the socket
+        command (function): Command, which gets a client session and returns a coroutine.
+
+    Returns:
+        SysExitStatus, any: Status of the server and command result
+    """
+    mockCloud = MockCloud()
+    socketPath = os.path.join(tmp_path, "evecc.sock")
+
+    async def run():
+        await mockCloud.start()
+
+        try:
+            evecc = EVECC(
+                "user",
+                "password",
+                "SITE-0",
+                1,
+                isQuiet=True,
+                baseUri=mockCloud.getBaseUri(),
+                timeout=10,
+                retryPolicy=RetryPolicy(0)
+            )
+            controlServer = ControlServer(evecc, socketPath=socketPath, rateLimiter=RateLimiter(1200))
+            serverTask = asyncio.create_task(controlServer.run())
+
+            try:
+                async with aiohttp.ClientSession(connector=aiohttp.UnixConnector(path=socketPath)) as session:
+                    # Wait until the session to the cloud is established.
+                    for _ in range(500):
+                        if (True == os.path.exists(socketPath)):
+                            async with session.get("http://localhost/api/stats") as response:
+                                if (200 == response.status):
+                                    break
+
+                        await asyncio.sleep(0.01)
+
+                    result = await command(session)
+            finally:
+                controlServer.stop()
+                status = await serverTask
+        finally:
+            await mockCloud.stop()
+
+        return status, result
+
+    return asyncio.run(run())
+
+async def _waitForSent(session, count):
+    for _ in range(500):
+        async with session.get("http://localhost/api/stats") as response:
+            if (count <= (await response.json())["sent"]):
+                break
+
+        await asyncio.sleep(0.01)
+
+def test_getPowerLimit(tmp_path):
+    async def command(session):
+        async with session.get("http://localhost/api/powerLimit") as response:
+            return response.status, await response.json()
+
+    _, (httpStatus, data) = _run(tmp_path, command)
+
+    assert 200 == httpStatus
+    assert { "powerLimit": 16 * 3 * 230 } == data
+
+def test_setPowerLimit(tmp_path):
+    async def command(session):
+        async with session.put("http://localhost/api/powerLimit", json={ "powerLimit": 3680, "phases": 1 }) as response:
+            httpStatus = response.status
+
+        await _waitForSent(session, 1)
+
+        async with session.get("http://localhost/api/powerLimit") as response:
+            return httpStatus, await response.json()
+
+    _, (httpStatus, data) = _run(tmp_path, command)
+
+    assert 202 == httpStatus
+    assert { "powerLimit": 16 * 230 } == data
+
+@pytest.mark.parametrize("data", [
+    { "phases": 1 },
+    { "powerLimit": "much" },
+    { "powerLimit": -1 },
+    { "powerLimit": 3680, "phases": 2 },
+    [ 3680 ]
+])
+def test_setInvalidPowerLimit(tmp_path, data):
+    async def command(session):
+        async with session.put("http://localhost/api/powerLimit", json=data) as response:
+            return response.status
+
+    _, httpStatus = _run(tmp_path, command)
+
+    assert 400 == httpStatus
+
+def test_stats(tmp_path):
+    async def command(session):
+        async with session.put("http://localhost/api/powerLimit", json={ "powerLimit": 6900 }) as response:
+            pass
+
+        await _waitForSent(session, 1)
+
+        async with session.get("http://localhost/api/stats") as response:
+            return await response.json()
+
+    _, statistics = _run(tmp_path, command)
+
+    assert 1 == statistics["submitted"]
+    assert 1 == statistics["sent"]
+    assert 0 == statistics["queueDepth"]
+
+def test_metrics(tmp_path):
+    async def command(session):
+        async with session.get("http://localhost/metrics") as response:
+            return response.status, await response.text()
+
+    _, (httpStatus, text) = _run(tmp_path, command)
+
+    assert 200 == httpStatus
+    assert "evecc_cloud_requests_total" in text
+
+def test_socketRemoved(tmp_path):
+    async def command(session):
+        return None
+
+    _run(tmp_path, command)
+
+    assert False == os.path.exists(os.path.join(tmp_path, "evecc.sock"))
+
+@pytest.mark.skipif("nt" == os.name, reason="No Unix socket permissions")
+def test_socketOnlyAccessibleByOwner(tmp_path, monkeypatch):
+    modes = []
+    start = web.UnixSite.start
+
+    # The socket shall be protected, as soon as it accepts connections.
+    async def startAndStat(site):
+        await start(site)
+        modes.append(stat.S_IMODE(os.stat(os.path.join(tmp_path, "evecc.sock")).st_mode))
+
+    monkeypatch.setattr(web.UnixSite, "start", startAndStat)
+
+    async def command(session):
+        return None
+
+    _run(tmp_path, command)
+
+    assert 1 == len(modes)
+    assert 0 == (modes[0] & 0o077)
+
+def test_loopbackOnly():
+    assert True == isLoopbackAddress("127.0.0.1")
+    assert True == isLoopbackAddress("::1")
+    assert True == isLoopbackAddress("localhost")
+    assert False == isLoopbackAddress("0.0.0.0")
+    assert False == isLoopbackAddress("192.168.1.2")
+
+    with pytest.raises(ValueError):
+        ControlServer(None, address="0.0.0.0")
+
+################################################################################
+# Main
+################################################################################
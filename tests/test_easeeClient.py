@@ -0,0 +1,54 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+from evecc.easeeClient import getEndpoint
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+################################################################################
+# Functions
+################################################################################
+
+def test_endpointWithIds():
+    assert "POST /api/sites/{id}/circuits/{id}/settings" == getEndpoint("POST", "/api/sites/123/circuits/456/settings")
+    assert "GET /api/chargers/{id}/state" == getEndpoint("GET", "/api/chargers/EH123456/state")
+    assert "GET /api/sites/{id}" == getEndpoint("GET", "/api/sites/123")
+
+def test_endpointWithoutIds():
+    assert "GET /api/sites" == getEndpoint("GET", "/api/sites")
+    assert "POST /api/accounts/token" == getEndpoint("POST", "/api/accounts/token")
+
+def test_endpointWithQuery():
+    assert "GET /api/chargers/{id}/config" == getEndpoint("GET", "/api/chargers/EH123456/config?detailed=true")
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,180 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import asyncio
+from mockCloud import MockCloud
+from evecc.evecc import EVECC
+from evecc.retryPolicy import RetryPolicy, CircuitBreaker
+from evecc.sysExitStatus import SysExitStatus
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+################################################################################
+# Functions
+################################################################################
+
+def _run(command, mockCloud=None, circuitBreaker=None, retryPolicy=None):
+    """Run a command of a controller against the mock cloud.
+
+    Args:
+        command (function): Command, which gets the controller and the mock cloud and returns a coroutine.
+        mockCloud (MockCloud, optional): Mock cloud. Defaults to None, which means a error free one.
+        circuitBreaker (CircuitBreaker, optional): Circuit breaker. Defaults to None, which means a new one.
+        retryPolicy (RetryPolicy, optional): Retry policy. Defaults to None, which means 3 fast retries.
+
+    Returns:
+        any: Command result
+    """
+    if (None == mockCloud):
+        mockCloud = MockCloud()
+
+    if (None == circuitBreaker):
+        circuitBreaker = CircuitBreaker()
+
+    if (None == retryPolicy):
+        retryPolicy = RetryPolicy(3, baseDelay=0.01, maxDelay=0.05)
+
+    async def run():
+        await mockCloud.start()
+
+        try:
+            evecc = EVECC(
+                "user",
+                "password",
+                "SITE-0",
+                1,
+                isQuiet=True,
+                baseUri=mockCloud.getBaseUri(),
+                timeout=10,
+                retryPolicy=retryPolicy,
+                circuitBreaker=circuitBreaker
+            )
+            result = await command(evecc, mockCloud)
+        finally:
+            await mockCloud.stop()
+
+        return result
+
+    return asyncio.run(run())
+
+def test_getCircuitPowerLimit():
+    status, powerLimit = _run(lambda evecc, mockCloud: evecc.getCircuitPowerLimit())
+
+    assert SysExitStatus.SUCCESS == status
+    assert 16 * 3 * 230 == powerLimit
+
+def test_setCircuitPowerLimit():
+    async def command(evecc, mockCloud):
+        status = await evecc.setCircuitPowerLimit(6900)
+        getStatus, powerLimit = await evecc.getCircuitPowerLimit()
+
+        return status, getStatus, powerLimit, mockCloud.getRequestCounts()
+
+    status, getStatus, powerLimit, requestCounts = _run(command)
+
+    assert SysExitStatus.SUCCESS == status
+    assert SysExitStatus.SUCCESS == getStatus
+    assert 10 * 3 * 230 == powerLimit
+    assert 1 == requestCounts["POST /api/sites/{siteId}/circuits/{circuitId}/settings"]
+
+def test_unchangedNotWritten():
+    async def command(evecc, mockCloud):
+        await evecc.setCircuitPowerLimit(6900)
+        status = await evecc.setCircuitPowerLimit(6900)
+
+        return status, mockCloud.getRequestCounts()
+
+    status, requestCounts = _run(command)
+
+    assert SysExitStatus.SUCCESS == status
+    assert 1 == requestCounts["POST /api/sites/{siteId}/circuits/{circuitId}/settings"]
+
+def test_retryThenSuccess():
+    async def command(evecc, mockCloud):
+        mockCloud.failRequests(2)
+        result = await evecc.getCircuitPowerLimit()
+
+        return result, mockCloud.getRequestCounts()
+
+    (status, powerLimit), requestCounts = _run(command)
+
+    assert SysExitStatus.SUCCESS == status
+    assert 16 * 3 * 230 == powerLimit
+    assert 3 == requestCounts["POST /api/accounts/token"]
+
+def test_retriesExhausted():
+    async def command(evecc, mockCloud):
+        mockCloud.failRequests(10)
+
+        return await evecc.getCircuitPowerLimit()
+
+    status, powerLimit = _run(command)
+
+    assert SysExitStatus.FAILED == status
+    assert 0 == powerLimit
+
+def test_breakerOpen():
+    # A request counts as failed, after its retries are exhausted.
+    circuitBreaker = CircuitBreaker(1, 60)
+
+    async def command(evecc, mockCloud):
+        firstStatus, _ = await evecc.getCircuitPowerLimit()
+        requestCount = mockCloud.getRequestCount()
+        secondStatus, _ = await evecc.getCircuitPowerLimit()
+
+        return firstStatus, secondStatus, requestCount, mockCloud.getRequestCount()
+
+    firstStatus, secondStatus, requestCount, laterRequestCount = _run(command, MockCloud(errorRate=1), circuitBreaker)
+
+    assert SysExitStatus.FAILED == firstStatus
+    assert CircuitBreaker.OPEN == circuitBreaker.getState()
+
+    # The open breaker fails fast, without a request.
+    assert SysExitStatus.UNAVAILABLE == secondStatus
+    assert requestCount == laterRequestCount
+
+def test_rateLimited():
+    async def command(evecc, mockCloud):
+        firstStatus = await evecc.setCircuitPowerLimit(9000)
+        secondStatus = await evecc.setCircuitPowerLimit(6900)
+
+        return firstStatus, secondStatus
+
+    firstStatus, secondStatus = _run(command, MockCloud(rateLimit=1), retryPolicy=RetryPolicy(0))
+
+    assert SysExitStatus.SUCCESS == firstStatus
+
+    # The exceeded rate limit is no failure, which would drop the setpoint.
+    assert SysExitStatus.RATE_LIMITED == secondStatus
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,152 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import asyncio
+import io
+import json
+import time
+from mockCloud import MockCloud
+from evecc.fleet import Fleet, getShard
+from evecc.metrics import Metrics
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+class _Process():
+    """Worker process, which crashed.
+    """
+    exitcode = 1
+
+    def is_alive(self):
+        return False
+
+################################################################################
+# Functions
+################################################################################
+
+def _createConfig(baseUri=None):
+    return {
+        "username": "user",
+        "password": "password",
+        "baseUri": baseUri,
+        "deadband": 0,
+        "timeout": 10,
+        "retries": 0,
+        "rateLimit": 20,
+        "reportInterval": 1,
+        "loglevel": "WARNING"
+    }
+
+def _createEntries(siteCount, circuitCount):
+    return [{ "siteKey": "SITE-%d" % siteIndex, "circuitPanelId": circuitIndex + 1 } for siteIndex in range(siteCount) for circuitIndex in range(circuitCount)]
+
+def _crash(fleet, workerId):
+    """Let the worker crash and return its restart delay.
+    """
+    fleet._workers[workerId]["process"] = _Process()
+    fleet._superviseWorkers()
+
+    return round(fleet._workers[workerId]["restartAt"] - time.monotonic())
+
+def test_shardIsStable():
+    assert getShard("SITE-0", 4) == getShard("SITE-0", 4)
+    assert 0 == getShard("SITE-0", 1)
+    assert all([0 <= getShard("SITE-%d" % index, 3) < 3 for index in range(100)])
+
+def test_siteIsOwnedByOneWorker():
+    fleet = Fleet(_createEntries(8, 3), _createConfig(), 4, io.StringIO(), io.StringIO())
+
+    assert 24 == sum([len(shard) for shard in fleet._shards])
+
+    for workerId, shard in enumerate(fleet._shards):
+        for entry in shard:
+            assert workerId == getShard(entry["siteKey"], 4)
+
+def test_notMoreWorkersThanCircuits():
+    fleet = Fleet(_createEntries(1, 2), _createConfig(), 8, io.StringIO(), io.StringIO())
+
+    assert 2 == len(fleet.getHealth())
+
+def test_restartDelayGrows():
+    fleet = Fleet(_createEntries(1, 1), _createConfig(), 1, io.StringIO(), io.StringIO())
+
+    assert [1, 2, 4, 8, 16, 32, 60, 60] == [_crash(fleet, 0) for _ in range(8)]
+    assert 8 == fleet.getHealth()[0]["restarts"]
+
+def test_restartDelayKeptAfterShortRun():
+    fleet = Fleet(_createEntries(1, 1), _createConfig(), 1, io.StringIO(), io.StringIO())
+    worker = fleet._workers[0]
+
+    _crash(fleet, 0)
+    _crash(fleet, 0)
+
+    # The worker reports once after its restart and crashes again.
+    worker["startedAt"] = time.monotonic()
+    fleet._handleMessage(0, { "type": "report", "health": { "connected": 1, "loopLag": 0 }, "metrics": Metrics().export() })
+
+    assert 4 == _crash(fleet, 0)
+
+def test_restartDelayResetAfterHealthyPeriod():
+    fleet = Fleet(_createEntries(1, 1), _createConfig(), 1, io.StringIO(), io.StringIO())
+    worker = fleet._workers[0]
+
+    _crash(fleet, 0)
+    _crash(fleet, 0)
+
+    worker["startedAt"] = time.monotonic() - fleet._HEALTHY_PERIOD
+    fleet._handleMessage(0, { "type": "report", "health": { "connected": 1, "loopLag": 0 }, "metrics": Metrics().export() })
+
+    assert 1 == _crash(fleet, 0)
+
+def test_commandsOfAllShards():
+    mockCloud = MockCloud(siteCount=3, circuitCount=2)
+    lines = ["SITE-%d %d set 6900\n" % (siteIndex, circuitIndex + 1) for siteIndex in range(3) for circuitIndex in range(2)]
+    lines += ["SITE-%d 2 get\n" % siteIndex for siteIndex in range(3)]
+    outputStream = io.StringIO()
+
+    async def run():
+        await mockCloud.start()
+
+        try:
+            fleet = Fleet(_createEntries(3, 2), _createConfig(mockCloud.getBaseUri()), 2, io.StringIO("".join(lines)), outputStream)
+
+            return await fleet.run()
+        finally:
+            await mockCloud.stop()
+
+    asyncio.run(run())
+    results = [json.loads(line) for line in outputStream.getvalue().splitlines()]
+
+    assert ["SITE-0", "SITE-1", "SITE-2"] == sorted([result["siteKey"] for result in results])
+    assert all([("SUCCESS" == result["status"]) and (6900 == result["powerLimit"]) for result in results])
+
+################################################################################
+# Main
+################################################################################
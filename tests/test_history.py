@@ -0,0 +1,126 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import os
+import pytest
+from evecc.history import History, HISTORY_SETPOINT, HISTORY_READING
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+class _Clock():
+    """Clock, which advances by one second per call.
+    """
+    def __init__(self, timestamp=1000.0):
+        self._timestamp = timestamp
+
+    def __call__(self):
+        self._timestamp += 1
+        return self._timestamp
+
+################################################################################
+# Functions
+################################################################################
+
+def _createHistory(tmp_path, count):
+    history = History(os.path.join(tmp_path, "history.bin"), _Clock())
+
+    for index in range(count):
+        history.append(HISTORY_SETPOINT, 1, 10 + (index % 2), [index, 0, 0], 1000 + index)
+
+    return history
+
+def test_emptyHistory(tmp_path):
+    history = History(os.path.join(tmp_path, "history.bin"))
+
+    assert 0 == history.getRecordCount()
+    assert [] == list(history.query())
+
+def test_appendAndQuery(tmp_path):
+    history = _createHistory(tmp_path, 10)
+    records = list(history.query())
+
+    assert 10 == history.getRecordCount()
+    assert [1000 + index for index in range(10)] == [record["powerLimit"] for record in records]
+    assert "setpoint" == records[0]["kind"]
+    assert [3.0, 0.0, 0.0] == records[3]["currents"]
+
+def test_queryRange(tmp_path):
+    history = _createHistory(tmp_path, 10)
+
+    # Timestamps are 1001 .. 1010, the end is not included.
+    records = list(history.query(1003, 1006))
+    assert [1003, 1004, 1005] == [record["timestamp"] for record in records]
+
+    records = list(history.query(1003, 1006, 11))
+    assert [1004] == [record["timestamp"] for record in records]
+
+    assert [] == list(history.query(2000))
+
+def test_aggregate(tmp_path):
+    history = _createHistory(tmp_path, 10)
+    aggregates = history.aggregate(5, circuitId=11)
+
+    assert [1000, 1005, 1010] == [aggregate["start"] for aggregate in aggregates]
+    assert [2, 2, 1] == [aggregate["count"] for aggregate in aggregates]
+    assert [1002, 1006, 1009] == [aggregate["powerLimitMean"] for aggregate in aggregates]
+
+@pytest.mark.parametrize("interval", [0, -5, float("nan")])
+def test_aggregateInvalidInterval(tmp_path, interval):
+    history = _createHistory(tmp_path, 3)
+
+    with pytest.raises(ValueError):
+        history.aggregate(interval)
+
+def test_tornTail(tmp_path):
+    history = _createHistory(tmp_path, 3)
+
+    # Simulate a write, which was interrupted in the middle of a record.
+    with open(os.path.join(tmp_path, "history.bin"), "ab") as fd:
+        fd.write(b"\xff" * 11)
+
+    assert 3 == history.getRecordCount()
+
+    history.append(HISTORY_READING, 2, 20, [16, 16, 16], 11040)
+    history.append(HISTORY_SETPOINT, 2, 20, [8, 8, 8], 5520)
+    records = list(history.query())
+
+    assert 5 == history.getRecordCount()
+    assert [1000, 1001, 1002, 11040, 5520] == [record["powerLimit"] for record in records]
+    assert [20, 20] == [record["circuitId"] for record in records[3:]]
+    assert "reading" == records[3]["kind"]
+    assert [record["timestamp"] for record in records] == sorted(record["timestamp"] for record in records)
+
+    # The binary search must still find the records after the torn tail.
+    assert [11040] == [record["powerLimit"] for record in history.query(1004, 1005)]
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,123 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import os
+import sys
+import pytest
+import evecc.__main__
+from evecc.__main__ import main
+from evecc.tracer import Tracer
+from evecc.sysExitStatus import SysExitStatus
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+################################################################################
+# Functions
+################################################################################
+
+def _main(monkeypatch, *args):
+    tracer = Tracer()
+
+    # A enabled trace shall not leak into the other tests.
+    monkeypatch.setattr(evecc.__main__, "getTracer", lambda: tracer)
+    monkeypatch.setattr(sys, "argv", ["evecc"] + list(args))
+
+    return main()
+
+def _getUnwritableFileName(tmp_path, fileName):
+    """Get a file name in a directory, which can't be created, because it is
+    a file.
+    """
+    with open(os.path.join(tmp_path, "file"), "w", encoding="utf-8") as fd:
+        fd.write("No directory")
+
+    return os.path.join(tmp_path, "file", fileName)
+
+def test_metricsFileNotWritten(tmp_path, monkeypatch, capsys):
+    status = _main(monkeypatch, "-hf", os.path.join(tmp_path, "history.bin"), "-mf", _getUnwritableFileName(tmp_path, "evecc.prom"), "history")
+
+    assert SysExitStatus.FAILED.value == status
+    assert "Metrics not written:" in capsys.readouterr().out
+
+def test_traceFileNotWritten(tmp_path, monkeypatch, capsys):
+    status = _main(monkeypatch, "-hf", os.path.join(tmp_path, "history.bin"), "-tr", _getUnwritableFileName(tmp_path, "trace.json"), "history")
+
+    assert SysExitStatus.FAILED.value == status
+    assert "Trace not written:" in capsys.readouterr().out
+
+def test_traceFileWritten(tmp_path, monkeypatch):
+    fileName = os.path.join(tmp_path, "trace.json")
+    status = _main(monkeypatch, "-hf", os.path.join(tmp_path, "history.bin"), "-tr", fileName, "history")
+
+    assert SysExitStatus.SUCCESS.value == status
+    assert True == os.path.isfile(fileName)
+
+def test_profileFileNotWritten(tmp_path, monkeypatch, capsys):
+    status = _main(monkeypatch, "-hf", os.path.join(tmp_path, "history.bin"), "-pr", _getUnwritableFileName(tmp_path, "evecc.prof"), "history")
+
+    assert SysExitStatus.FAILED.value == status
+    assert "Profile not written:" in capsys.readouterr().out
+
+@pytest.mark.parametrize("interval", ["0", "-60", "nan"])
+def test_historyIntervalInvalid(tmp_path, monkeypatch, capsys, interval):
+    with pytest.raises(SystemExit) as excInfo:
+        _main(monkeypatch, "-hf", os.path.join(tmp_path, "history.bin"), "history", "--interval", interval)
+
+    assert 2 == excInfo.value.code
+    assert "-i/--interval: must be greater than 0" in capsys.readouterr().err
+
+def test_scheduleNotWritten(tmp_path, monkeypatch, capsys):
+    pytest.importorskip("numpy")
+    fileName = os.path.join(tmp_path, "forecast.csv")
+
+    with open(fileName, "w", encoding="utf-8") as fd:
+        fd.write("timestamp,SITE-0/1\n0,2300\n900,6900\n")
+
+    status = _main(monkeypatch, "plan", fileName, "-o", _getUnwritableFileName(tmp_path, "schedule.csv"))
+
+    assert SysExitStatus.FAILED.value == status
+    assert "Schedule not written:" in capsys.readouterr().out
+
+def test_plan(tmp_path, monkeypatch, capsys):
+    pytest.importorskip("numpy")
+    fileName = os.path.join(tmp_path, "forecast.csv")
+
+    with open(fileName, "w", encoding="utf-8") as fd:
+        fd.write("timestamp,SITE-0/1\n0,2300\n900,6900\n")
+
+    status = _main(monkeypatch, "plan", fileName, "-o", os.path.join(tmp_path, "schedule.csv"))
+
+    assert SysExitStatus.SUCCESS.value == status
+    assert "{\"siteKey\": \"SITE-0\", \"circuitPanelId\": 1, \"energy\": 2300.0}" == capsys.readouterr().out.strip()
+
+################################################################################
+# Main
+################################################################################
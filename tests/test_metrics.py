@@ -0,0 +1,92 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import os
+import stat
+import pytest
+from evecc.metrics import Metrics
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+################################################################################
+# Functions
+################################################################################
+
+def _createMetrics():
+    metrics = Metrics()
+    metrics.incCounter("evecc_test_total", "Test counter.", { "endpoint": "GET /api/sites" })
+    metrics.setGauge("evecc_test_gauge", "Test gauge.", 3)
+
+    return metrics
+
+def test_render():
+    text = _createMetrics().render()
+
+    assert "# TYPE evecc_test_total counter" in text
+    assert "evecc_test_total{endpoint=\"GET /api/sites\"} 1" in text
+    assert "evecc_test_gauge 3" in text
+
+def test_merge():
+    metrics = Metrics()
+    metrics.merge(_createMetrics().export(), { "worker": 1 })
+
+    assert "evecc_test_gauge{worker=\"1\"} 3" in metrics.render()
+
+def test_writeTextfile(tmp_path):
+    fileName = os.path.join(tmp_path, "evecc.prom")
+    metrics = _createMetrics()
+
+    metrics.writeTextfile(fileName)
+    metrics.incCounter("evecc_test_total", "Test counter.", { "endpoint": "GET /api/sites" })
+    metrics.writeTextfile(fileName)
+
+    with open(fileName, "r", encoding="utf-8") as fd:
+        assert metrics.render() == fd.read()
+
+    # No temporary file is left.
+    assert ["evecc.prom"] == os.listdir(tmp_path)
+
+    # The collector may run as another user.
+    if ("nt" != os.name):
+        assert 0o644 == stat.S_IMODE(os.stat(fileName).st_mode)
+
+def test_writeTextfileFails(tmp_path):
+    fileName = os.path.join(tmp_path, "file", "evecc.prom")
+
+    with open(os.path.join(tmp_path, "file"), "w", encoding="utf-8") as fd:
+        fd.write("No directory")
+
+    with pytest.raises(OSError):
+        _createMetrics().writeTextfile(fileName)
+
+################################################################################
+# Main
+################################################################################
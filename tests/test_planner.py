@@ -0,0 +1,134 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import os
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+from evecc.planner import Planner, loadForecast, writeSchedule
+from evecc.schedule import loadSchedule
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+################################################################################
+# Functions
+################################################################################
+
+def _writeForecast(tmp_path, text):
+    fileName = os.path.join(tmp_path, "forecast.csv")
+
+    with open(fileName, "w", encoding="utf-8") as fd:
+        fd.write(text)
+
+    return fileName
+
+def test_phaseCurrents():
+    currents, phases = Planner().calcPhaseCurrentLimits(numpy.array([-100, 0, 2300, 3680, 3681, 6900, 20000]))
+
+    # Up to the max. single phase power one phase, above three phases.
+    assert [0, 0, 10, 16, 5, 10, 16] == currents.tolist()
+    assert [1, 1, 1, 1, 3, 3, 3] == phases.tolist()
+
+def test_currentStep():
+    power = numpy.array([2500, 7000])
+
+    assert [10, 10] == Planner(currentStep=1).calcPhaseCurrentLimits(power)[0].tolist()
+    assert [10, 10] == Planner(currentStep=2).calcPhaseCurrentLimits(power)[0].tolist()
+    assert pytest.approx([10.87, 10.14], abs=0.01) == Planner(currentStep=0).calcPhaseCurrentLimits(power)[0].tolist()
+
+def test_baseLoad():
+    plan = Planner(baseLoad=1000).plan(numpy.array([0, 900]), numpy.array([[3300], [500]]))
+
+    assert [[2300], [0]] == plan["powerLimits"].tolist()
+
+def test_planEnergyAndChanges():
+    timestamps = numpy.array([0, 900, 1800, 2700])
+    power = numpy.array([[2300, 0], [2300, 0], [6900, 0], [2300, 0]])
+    plan = Planner().plan(timestamps, power)
+
+    assert [[2300, 0], [2300, 0], [6900, 0], [2300, 0]] == plan["powerLimits"].tolist()
+    assert [[1, 1], [1, 1], [3, 1], [1, 1]] == plan["phases"].tolist()
+
+    # 15 min slots, the last one lasts as long as the one before.
+    assert [575, 575, 1725, 575] == plan["energy"][:, 0].tolist()
+    assert [[True, True], [False, False], [True, False], [True, False]] == plan["changes"].tolist()
+
+@pytest.mark.parametrize("timestamps", [[0], [0, 0], [900, 0]])
+def test_planInvalidTimestamps(timestamps):
+    with pytest.raises(ValueError):
+        Planner().plan(numpy.array(timestamps), numpy.zeros((len(timestamps), 1)))
+
+def test_loadForecast(tmp_path):
+    fileName = _writeForecast(tmp_path, "timestamp,SITE-0/1,SITE-0/2\n0,2300,0\n900,6900,1000\n")
+    timestamps, circuits, power = loadForecast(fileName)
+
+    assert [0, 900] == timestamps.tolist()
+    assert [("SITE-0", 1), ("SITE-0", 2)] == circuits
+    assert [[2300, 0], [6900, 1000]] == power.tolist()
+
+def test_loadForecastIsoTimestamps(tmp_path):
+    fileName = _writeForecast(tmp_path, "timestamp,SITE-0/1\n2021-06-01T12:00:00,2300\n2021-06-01T12:15:00,6900\n")
+    timestamps, _, _ = loadForecast(fileName)
+
+    assert [1622548800, 1622549700] == timestamps.tolist()
+
+@pytest.mark.parametrize("text", [
+    "timestamp\n0\n900\n",
+    "timestamp,SITE-0\n0,2300\n900,6900\n",
+    "timestamp,SITE-0/1\n0,2300\n900,much\n"
+])
+def test_loadInvalidForecast(tmp_path, text):
+    with pytest.raises(ValueError):
+        loadForecast(_writeForecast(tmp_path, text))
+
+def test_scheduleHasChangesOnly(tmp_path):
+    fileName = os.path.join(tmp_path, "schedule.csv")
+    timestamps = numpy.array([0, 900, 1800, 2700])
+    circuits = [("SITE-0", 1), ("SITE-0", 2)]
+    plan = Planner().plan(timestamps, numpy.array([[2300, 0], [2300, 0], [6900, 0], [2300, 0]]))
+
+    assert 4 == writeSchedule(fileName, timestamps, circuits, plan)
+
+    # An entry lasts until the next one of its circuit.
+    assert [(0, 2300, 1), (1800, 6900, 3), (2700, 2300, 1)] == loadSchedule(fileName, "SITE-0", 1)
+    assert [(0, 0, 1)] == loadSchedule(fileName, "SITE-0", 2)
+
+    with open(fileName, "r", encoding="utf-8") as fd:
+        lines = fd.read().splitlines()
+
+    assert "timestamp,siteKey,circuitPanelId,phases,currentP1,currentP2,currentP3,powerLimit,energy" == lines[0]
+    assert "0,SITE-0,1,1,10.0,0.0,0.0,2300.0,1150.0" == lines[1]
+    assert "1800,SITE-0,1,3,10.0,10.0,10.0,6900.0,1725.0" == lines[3]
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,117 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import asyncio
+import time
+from evecc.rateLimiter import TokenBucket, RateLimiter
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+class _Clock():
+    """Clock, which is only advanced manually.
+    """
+    def __init__(self, timestamp=0.0):
+        self.timestamp = timestamp
+
+    def __call__(self):
+        return self.timestamp
+
+################################################################################
+# Functions
+################################################################################
+
+def test_bucketStartsFull():
+    bucket = TokenBucket(2, 60, _Clock())
+
+    assert 2 == bucket.getTokens()
+    assert 0 == bucket.getWaitTime()
+
+def test_bucketIsEmptied():
+    clock = _Clock()
+    bucket = TokenBucket(2, 60, clock)
+
+    assert True == bucket.tryAcquire()
+    assert True == bucket.tryAcquire()
+    assert False == bucket.tryAcquire()
+    assert 30 == bucket.getWaitTime()
+
+def test_bucketIsRefilled():
+    clock = _Clock()
+    bucket = TokenBucket(2, 60, clock)
+
+    bucket.tryAcquire()
+    bucket.tryAcquire()
+    clock.timestamp = 30
+
+    assert True == bucket.tryAcquire()
+    assert False == bucket.tryAcquire()
+
+    # Never more than the capacity.
+    clock.timestamp = 1000
+    assert 2 == bucket.getTokens()
+
+def test_bucketIsDrained():
+    clock = _Clock()
+    bucket = TokenBucket(20, 60, clock)
+
+    bucket.drain()
+
+    assert 0 == bucket.getTokens()
+    assert False == bucket.tryAcquire()
+    assert 3 == bucket.getWaitTime()
+
+def test_acquireWaitsForToken():
+    bucket = TokenBucket(1, 0.1)
+
+    async def acquireTwice():
+        await bucket.acquire()
+        await bucket.acquire()
+
+    timestamp = time.monotonic()
+    asyncio.run(acquireTwice())
+
+    assert 0.09 <= (time.monotonic() - timestamp)
+
+def test_bucketPerEndpoint():
+    clock = _Clock()
+    rateLimiter = RateLimiter(1, 60, clock)
+    bucket = rateLimiter.getBucket("POST /api/sites/{id}/circuits/{id}/settings")
+
+    assert bucket == rateLimiter.getBucket("POST /api/sites/{id}/circuits/{id}/settings")
+    assert bucket != rateLimiter.getBucket("GET /api/sites/{id}/circuits/{id}/settings")
+
+    assert True == bucket.tryAcquire()
+    assert False == bucket.tryAcquire()
+    assert True == rateLimiter.getBucket("GET /api/sites/{id}/circuits/{id}/settings").tryAcquire()
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,157 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from evecc.retryPolicy import RetryPolicy, CircuitBreaker, Deadline, parseRetryAfter
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+class _Clock():
+    """Clock, which is only advanced manually.
+    """
+    def __init__(self, timestamp=1000.0):
+        self.timestamp = timestamp
+
+    def __call__(self):
+        return self.timestamp
+
+################################################################################
+# Functions
+################################################################################
+
+def test_delayGrowsExponentially():
+    retryPolicy = RetryPolicy(3, baseDelay=0.5, maxDelay=8, rand=lambda: 1.0)
+
+    assert [0.5, 1, 2, 4, 8, 8] == [retryPolicy.getDelay(retry) for retry in range(6)]
+
+def test_delayIsJittered():
+    retryPolicy = RetryPolicy(3, baseDelay=0.5, maxDelay=8, rand=lambda: 0.25)
+
+    assert 0.5 == retryPolicy.getDelay(2)
+    assert 0 == RetryPolicy(rand=lambda: 0).getDelay(5)
+
+def test_delayHonoursRetryAfter():
+    retryPolicy = RetryPolicy(3, baseDelay=0.5, maxDelay=8, rand=lambda: 1.0)
+
+    assert 3.5 == retryPolicy.getDelay(0, 3)
+    assert 30.5 == retryPolicy.getDelay(5, 30)
+
+def test_parseRetryAfterSeconds():
+    assert 5 == parseRetryAfter("5")
+    assert 1.5 == parseRetryAfter("1.5")
+    assert 0 == parseRetryAfter("-3")
+
+def test_parseRetryAfterDate():
+    future = datetime.now(timezone.utc) + timedelta(seconds=60)
+    past = datetime.now(timezone.utc) - timedelta(seconds=60)
+
+    assert 55 < parseRetryAfter(format_datetime(future, usegmt=True)) <= 60
+    assert 0 == parseRetryAfter(format_datetime(past, usegmt=True))
+
+def test_parseRetryAfterInvalid():
+    assert None == parseRetryAfter(None)
+    assert None == parseRetryAfter("soon")
+
+def test_deadline():
+    clock = _Clock()
+    deadline = Deadline(10, clock)
+
+    assert 10 == deadline.getRemaining()
+    assert False == deadline.isExpired()
+
+    clock.timestamp += 11
+    assert 0 == deadline.getRemaining()
+    assert True == deadline.isExpired()
+
+    assert math.inf == Deadline(clock=clock).getRemaining()
+
+def test_breakerOpensAfterFailures():
+    clock = _Clock()
+    circuitBreaker = CircuitBreaker(3, 60, clock=clock)
+
+    circuitBreaker.onFailure()
+    circuitBreaker.onFailure()
+    assert CircuitBreaker.CLOSED == circuitBreaker.getState()
+    assert True == circuitBreaker.isAllowed()
+
+    circuitBreaker.onFailure()
+    assert CircuitBreaker.OPEN == circuitBreaker.getState()
+    assert False == circuitBreaker.isAllowed()
+    assert 60 == circuitBreaker.getRetryIn()
+
+def test_breakerSuccessResetsFailures():
+    circuitBreaker = CircuitBreaker(3, 60, clock=_Clock())
+
+    circuitBreaker.onFailure()
+    circuitBreaker.onFailure()
+    circuitBreaker.onSuccess()
+    circuitBreaker.onFailure()
+    circuitBreaker.onFailure()
+
+    assert CircuitBreaker.CLOSED == circuitBreaker.getState()
+
+def test_breakerHalfOpen():
+    clock = _Clock()
+    circuitBreaker = CircuitBreaker(2, 60, clock=clock)
+
+    circuitBreaker.onFailure()
+    circuitBreaker.onFailure()
+    clock.timestamp += 61
+    assert CircuitBreaker.HALF_OPEN == circuitBreaker.getState()
+    assert True == circuitBreaker.isAllowed()
+    assert 0 == circuitBreaker.getRetryIn()
+
+    # The first failure opens it again.
+    circuitBreaker.onFailure()
+    assert CircuitBreaker.OPEN == circuitBreaker.getState()
+
+    # The first success closes it.
+    clock.timestamp += 61
+    circuitBreaker.onSuccess()
+    assert CircuitBreaker.CLOSED == circuitBreaker.getState()
+
+def test_breakerStateIsShared(tmp_path):
+    clock = _Clock()
+    fileName = os.path.join(tmp_path, "breaker.json")
+    circuitBreaker = CircuitBreaker(1, 60, fileName, clock)
+
+    circuitBreaker.onFailure()
+    assert CircuitBreaker.OPEN == CircuitBreaker(1, 60, fileName, clock).getState()
+
+    circuitBreaker.onSuccess()
+    assert CircuitBreaker.CLOSED == CircuitBreaker(1, 60, fileName, clock).getState()
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,181 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import asyncio
+from mockCloud import MockCloud
+from evecc.evecc import EVECC
+from evecc.rateLimiter import RateLimiter
+from evecc.retryPolicy import RetryPolicy
+from evecc.setpointScheduler import SetpointScheduler
+
+################################################################################
+# Variables
+################################################################################
+
+_SETTINGS_ENDPOINT = "POST /api/sites/{siteId}/circuits/{circuitId}/settings"
+
+################################################################################
+# Classes
+################################################################################
+
+################################################################################
+# Functions
+################################################################################
+
+def _run(command, mockCloud=None, rateLimiter=None):
+    """Run a command of a setpoint scheduler, whose controller is connected
+    to the mock cloud.
+
+    Args:
+        command (function): Command, which gets the controller, the scheduler and the mock cloud and returns a coroutine.
+        mockCloud (MockCloud, optional): Mock cloud. Defaults to None, which means a unlimited one.
+        rateLimiter (RateLimiter, optional): Rate limiter of the scheduler. Defaults to None, which means 20 requests per minute.
+
+    Returns:
+        any: Command result
+    """
+    if (None == mockCloud):
+        mockCloud = MockCloud()
+
+    if (None == rateLimiter):
+        rateLimiter = RateLimiter()
+
+    async def run():
+        await mockCloud.start()
+
+        evecc = EVECC(
+            "user",
+            "password",
+            "SITE-0",
+            1,
+            isQuiet=True,
+            baseUri=mockCloud.getBaseUri(),
+            timeout=10,
+            retryPolicy=RetryPolicy(0)
+        )
+        schedulerTask = None
+
+        try:
+            await evecc.connect()
+            scheduler = SetpointScheduler(evecc, rateLimiter)
+            schedulerTask = asyncio.create_task(scheduler.run())
+            result = await command(evecc, scheduler, mockCloud)
+        finally:
+            if (None != schedulerTask):
+                schedulerTask.cancel()
+
+            await evecc.disconnect()
+            await mockCloud.stop()
+
+        return result
+
+    return asyncio.run(run())
+
+async def _waitFor(condition, timeout=5):
+    """Wait until the condition is met.
+
+    Args:
+        condition (function): Condition, which returns True if met.
+        timeout (float, optional): Max. duration in s. Defaults to 5.
+
+    Returns:
+        bool: If the condition is met, it will return True otherwise False.
+    """
+    loop = asyncio.get_running_loop()
+    end = loop.time() + timeout
+
+    while ((False == condition()) and (loop.time() < end)):
+        await asyncio.sleep(0.01)
+
+    return condition()
+
+def test_latestWins():
+    async def command(evecc, scheduler, mockCloud):
+        # The scheduler task didn't run yet, so all are pending at once.
+        scheduler.submit(9000)
+        scheduler.submit(7000)
+        scheduler.submit(6900)
+        await scheduler.flush()
+
+        return scheduler.getStatistics(), mockCloud.getRequestCounts()
+
+    statistics, requestCounts = _run(command)
+
+    assert 3 == statistics["submitted"]
+    assert 2 == statistics["coalesced"]
+    assert 1 == statistics["sent"]
+    assert 0 == statistics["queueDepth"]
+    assert 1 == requestCounts[_SETTINGS_ENDPOINT]
+
+def test_latestIsWritten():
+    async def command(evecc, scheduler, mockCloud):
+        scheduler.submit(9000)
+        scheduler.submit(3680)
+        await scheduler.flush()
+
+        return await evecc.getCircuitPowerLimit()
+
+    _, powerLimit = _run(command)
+
+    # 3680 W is charged with a single phase of 16 A.
+    assert 16 * 230 == powerLimit
+
+def test_unchangedIsSkipped():
+    async def command(evecc, scheduler, mockCloud):
+        scheduler.submit(6900)
+        await scheduler.flush()
+        scheduler.submit(6900)
+        await scheduler.flush()
+
+        return scheduler.getStatistics(), mockCloud.getRequestCounts()
+
+    statistics, requestCounts = _run(command)
+
+    assert 1 == statistics["sent"]
+    assert 1 == statistics["skipped"]
+    assert 1 == requestCounts[_SETTINGS_ENDPOINT]
+
+def test_rateLimitedIsRepeated():
+    async def command(evecc, scheduler, mockCloud):
+        scheduler.submit(9000)
+        await scheduler.flush()
+
+        # The mock cloud allows only one write per minute, but the own budget is larger.
+        scheduler.submit(6900)
+        isRepeated = await _waitFor(lambda: 2 <= scheduler.getStatistics()["rateLimited"])
+
+        return isRepeated, scheduler.getStatistics(), mockCloud.getRequestCounts()
+
+    isRepeated, statistics, requestCounts = _run(command, MockCloud(rateLimit=1), RateLimiter(1200))
+
+    assert True == isRepeated
+    assert 1 == statistics["sent"]
+    assert 0 == statistics["dropped"]
+    assert 1 == statistics["queueDepth"]
+    assert 3 <= requestCounts[_SETTINGS_ENDPOINT]
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,78 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import os
+import pytest
+from evecc.simulator import loadTrace
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+################################################################################
+# Functions
+################################################################################
+
+def _writeTrace(tmp_path, text):
+    fileName = os.path.join(tmp_path, "trace.csv")
+
+    with open(fileName, "w", encoding="utf-8", newline="") as fd:
+        fd.write(text)
+
+    return fileName
+
+def test_loadTrace(tmp_path):
+    fileName = _writeTrace(tmp_path, "timestamp,pv,consumption\n1010,2000,500\n1000,1500.5,400\n\n")
+
+    assert [(1000, 1500.5, 400), (1010, 2000, 500)] == loadTrace(fileName)
+
+def test_loadTraceWithoutConsumption(tmp_path):
+    fileName = _writeTrace(tmp_path, "pv, timestamp\n1500,1000\n")
+
+    assert [(1000, 1500, 0)] == loadTrace(fileName)
+
+def test_loadTraceWithoutPv(tmp_path):
+    with pytest.raises(ValueError, match="no timestamp and pv column"):
+        loadTrace(_writeTrace(tmp_path, "timestamp,consumption\n1000,400\n"))
+
+def test_loadTraceTruncatedRow(tmp_path):
+    fileName = _writeTrace(tmp_path, "timestamp,pv,consumption\n1000,1500,400\n1010,2000\n")
+
+    with pytest.raises(ValueError, match="line 3 has 2 columns, but 3 are expected"):
+        loadTrace(fileName)
+
+def test_loadTraceInvalidNumber(tmp_path):
+    fileName = _writeTrace(tmp_path, "timestamp,pv\n1000,1500\n1010,2k\n")
+
+    with pytest.raises(ValueError, match="line 3:"):
+        loadTrace(fileName)
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,117 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import os
+import pytest
+import evecc.siteCache
+from evecc.siteCache import SiteCache
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+class _Time():
+    """Replaces the time module, whose time is only advanced manually.
+    """
+    def __init__(self, timestamp=1000.0):
+        self.timestamp = timestamp
+
+    def time(self):
+        return self.timestamp
+
+################################################################################
+# Functions
+################################################################################
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Time()
+    monkeypatch.setattr(evecc.siteCache, "time", clock)
+
+    return clock
+
+def test_notCached(clock):
+    siteCache = SiteCache()
+
+    assert (None, None) == siteCache.get("SITE-0", 1)
+    assert None == siteCache.getSiteId("SITE-0")
+
+def test_cached(clock):
+    siteCache = SiteCache()
+    siteCache.set("SITE-0", 1, 1000, 100000)
+    siteCache.set("SITE-0", 2, 1000, 100001)
+
+    assert (1000, 100000) == siteCache.get("SITE-0", 1)
+    assert (1000, 100001) == siteCache.get("SITE-0", 2)
+    assert 1000 == siteCache.getSiteId("SITE-0")
+    assert None == siteCache.getSiteId("SITE-1")
+
+def test_entriesExpire(clock):
+    siteCache = SiteCache(ttl=3600)
+    siteCache.set("SITE-0", 1, 1000, 100000)
+
+    clock.timestamp += 3599
+    assert (1000, 100000) == siteCache.get("SITE-0", 1)
+
+    clock.timestamp += 1
+    assert (None, None) == siteCache.get("SITE-0", 1)
+    assert None == siteCache.getSiteId("SITE-0")
+
+def test_invalidate(clock):
+    siteCache = SiteCache()
+    siteCache.set("SITE-0", 1, 1000, 100000)
+    siteCache.set("SITE-0", 2, 1000, 100001)
+    siteCache.set("SITE-10", 1, 1010, 101000)
+
+    siteCache.invalidate("SITE-0", 1)
+    assert (None, None) == siteCache.get("SITE-0", 1)
+    assert (1000, 100001) == siteCache.get("SITE-0", 2)
+
+    # The site key is no prefix match.
+    siteCache.invalidateSite("SITE-0")
+    assert (None, None) == siteCache.get("SITE-0", 2)
+    assert (1010, 101000) == siteCache.get("SITE-10", 1)
+
+    siteCache.clear()
+    assert (None, None) == siteCache.get("SITE-10", 1)
+
+def test_storedForNextRun(tmp_path, clock):
+    fileName = os.path.join(tmp_path, "cache.json")
+    siteCache = SiteCache(fileName, 3600)
+    siteCache.set("SITE-0", 1, 1000, 100000)
+    siteCache.save()
+
+    assert (1000, 100000) == SiteCache(fileName, 3600).get("SITE-0", 1)
+
+    clock.timestamp += 3600
+    assert (None, None) == SiteCache(fileName, 3600).get("SITE-0", 1)
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,122 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import asyncio
+from mockCloud import MockCloud
+from evecc.retryPolicy import RetryPolicy, CircuitBreaker
+from evecc.siteCache import SiteCache
+from evecc.siteSnapshot import SiteSnapshot
+from evecc.sysExitStatus import SysExitStatus
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+################################################################################
+# Functions
+################################################################################
+
+def _run(mockCloud, siteKey="SITE-0", snapshotCount=1, **kwargs):
+    """Read snapshots of a site from the mock cloud.
+
+    Args:
+        mockCloud (MockCloud): Mock cloud
+        siteKey (str, optional): Site key. Defaults to "SITE-0".
+        snapshotCount (int, optional): Number of snapshots, which share the site cache. Defaults to 1.
+
+    Returns:
+        list: Status and snapshot of every run and the requests per endpoint.
+    """
+    siteCache = SiteCache()
+
+    async def run():
+        results = []
+        await mockCloud.start()
+
+        try:
+            for _ in range(snapshotCount):
+                siteSnapshot = SiteSnapshot("user", "password", siteKey, siteCache, baseUri=mockCloud.getBaseUri(), timeout=10, retryPolicy=RetryPolicy(0), **kwargs)
+                results.append(await siteSnapshot.run())
+        finally:
+            await mockCloud.stop()
+
+        return results, mockCloud.getRequestCounts()
+
+    return asyncio.run(run())
+
+def test_allCircuits():
+    [(status, snapshot)], requestCounts = _run(MockCloud(circuitCount=3))
+
+    assert SysExitStatus.SUCCESS == status
+    assert "SUCCESS" == snapshot["status"]
+    assert 1000 == snapshot["siteId"]
+    assert [1, 2, 3] == [circuit["circuitPanelId"] for circuit in snapshot["circuits"]]
+    assert all([(11040 == circuit["powerLimit"]) and ([16, 16, 16] == circuit["currents"]) for circuit in snapshot["circuits"]])
+    assert 3 == requestCounts["GET /api/sites/{siteId}/circuits/{circuitId}/settings"]
+
+    # Without their state, the chargers are only listed.
+    assert [[{ "id": "EH10000000", "name": "Charger 1 of circuit 100000" }]] == [circuit["chargers"] for circuit in snapshot["circuits"][:1]]
+    assert "GET /api/chargers/{chargerId}/state" not in requestCounts
+
+def test_chargerState():
+    [(status, snapshot)], requestCounts = _run(MockCloud(circuitCount=2, chargerCount=2), isChargerState=True, concurrency=1)
+
+    assert SysExitStatus.SUCCESS == status
+    assert [2, 2] == [len(circuit["chargers"]) for circuit in snapshot["circuits"]]
+    assert all([3 == charger["state"]["chargerOpMode"] for circuit in snapshot["circuits"] for charger in circuit["chargers"]])
+    assert 4 == requestCounts["GET /api/chargers/{chargerId}/state"]
+
+def test_cachedSiteId():
+    results, requestCounts = _run(MockCloud(circuitCount=2), snapshotCount=2)
+
+    # The second snapshot gets the site by its cached id, without discovery.
+    assert [SysExitStatus.SUCCESS, SysExitStatus.SUCCESS] == [status for status, _ in results]
+    assert 1 == requestCounts["GET /api/sites"]
+    assert 2 == requestCounts["GET /api/sites/{siteId}"]
+
+def test_unknownSite():
+    [(status, snapshot)], _ = _run(MockCloud(), "SITE-9")
+
+    assert SysExitStatus.FAILED == status
+    assert "No site with key SITE-9 found." == snapshot["error"]
+    assert [] == snapshot["circuits"]
+
+def test_breakerOpen():
+    circuitBreaker = CircuitBreaker(1, 60)
+    circuitBreaker.onFailure()
+
+    [(status, snapshot)], requestCounts = _run(MockCloud(), circuitBreaker=circuitBreaker)
+
+    assert SysExitStatus.UNAVAILABLE == status
+    assert "UNAVAILABLE" == snapshot["status"]
+    assert {} == requestCounts
+
+################################################################################
+# Main
+################################################################################
@@ -0,0 +1,125 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import pytest
+from evecc.surplusControl import EmaFilter, MovingAverageFilter, PhaseSelector, SurplusController, createSurplusController
+
+################################################################################
+# Variables
+################################################################################
+
+################################################################################
+# Classes
+################################################################################
+
+################################################################################
+# Functions
+################################################################################
+
+def test_emaFilter():
+    emaFilter = EmaFilter(0.5)
+
+    assert 1000 == emaFilter.update(1000)
+    assert 1500 == emaFilter.update(2000)
+    assert 1750 == emaFilter.update(2000)
+
+def test_movingAverageFilter():
+    movingAverageFilter = MovingAverageFilter(2)
+
+    assert 1000 == movingAverageFilter.update(1000)
+    assert 1500 == movingAverageFilter.update(2000)
+    assert 3000 == movingAverageFilter.update(4000)
+
+def test_initialPhases():
+    assert 1 == PhaseSelector(3680).select(3680, 0)
+    assert 3 == PhaseSelector(3680).select(3681, 0)
+
+def test_phaseHysteresis():
+    phaseSelector = PhaseSelector(3680, 230, 0)
+    phaseSelector.select(3000, 0)
+
+    # Within the hysteresis, the phases are kept.
+    assert 1 == phaseSelector.select(3910, 1)
+    assert 3 == phaseSelector.select(3911, 2)
+    assert 3 == phaseSelector.select(3450, 3)
+    assert 1 == phaseSelector.select(3449, 4)
+    assert 2 == phaseSelector.getSwitchCount()
+
+def test_phaseDwellTime():
+    phaseSelector = PhaseSelector(3680, 230, 300)
+    phaseSelector.select(3000, 0)
+
+    # A switch requires the min. dwell time since the start or the last switch.
+    assert 1 == phaseSelector.select(6000, 299)
+    assert 3 == phaseSelector.select(6000, 300)
+    assert 3 == phaseSelector.select(1000, 599)
+    assert 1 == phaseSelector.select(1000, 600)
+    assert 2 == phaseSelector.getSwitchCount()
+
+def test_firstSampleIsEmitted():
+    surplusController = createSurplusController(3680)
+
+    assert (2000, 1) == surplusController.update(2000, 0)
+    assert 2000 == surplusController.getFilteredPower()
+
+def test_smallChangeIsNotEmitted():
+    surplusController = SurplusController(EmaFilter(1), PhaseSelector(3680), 230)
+    surplusController.update(2000, 0)
+
+    assert (None, None) == surplusController.update(2229, 1)
+    assert (2230, 1) == surplusController.update(2230, 2)
+
+    # The change is measured from the last emitted power limit.
+    assert (None, None) == surplusController.update(2100, 3)
+
+def test_phaseSwitchIsEmitted():
+    surplusController = SurplusController(EmaFilter(1), PhaseSelector(3680, 230, 0), 1000)
+    surplusController.update(3500, 0)
+
+    # Less than the min. change, but the phases switch.
+    assert (3950, 3) == surplusController.update(3950, 1)
+
+def test_negativeSurplusIsZero():
+    surplusController = createSurplusController(3680)
+
+    assert (0, 1) == surplusController.update(-500, 0)
+
+def test_smoothedSpike():
+    surplusController = createSurplusController(3680, "ema", 0.2)
+    surplusController.update(2000, 0)
+
+    # A single spike moves the filtered power only by a fifth.
+    assert (2600, 1) == surplusController.update(5000, 1)
+    assert pytest.approx(2600) == surplusController.getFilteredPower()
+
+def test_windowFilterSelected():
+    surplusController = createSurplusController(3680, "window", windowSize=2, minChange=0)
+    surplusController.update(1000, 0)
+
+    assert (2000, 1) == surplusController.update(3000, 1)
+
+################################################################################
+# Main
+################################################################################
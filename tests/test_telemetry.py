@@ -0,0 +1,224 @@
+# MIT License
+#
+# Copyright (c) 2021 Andreas Merkle (web@blue-andi.de)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+################################################################################
+# Imports
+################################################################################
+import asyncio
+import pytest
+from mockCloud import MockCloud
+from evecc.easeeClient import EaseeClient
+from evecc.evecc import EVECC
+from evecc.retryPolicy import RetryPolicy
+from evecc.sysExitStatus import SysExitStatus
+from evecc.telemetry import Telemetry
+
+################################################################################
+# Variables
+################################################################################
+
+_CHARGER_ID = "EH10000000"
+
+_GET_SETTINGS_ENDPOINT = "GET /api/sites/{siteId}/circuits/{circuitId}/settings"
+
+################################################################################
+# Classes
+################################################################################
+
+class _Clock():
+    """Clock, which is only advanced manually.
+    """
+    def __init__(self, timestamp=1000.0):
+        self.timestamp = timestamp
+
+    def __call__(self):
+        return self.timestamp
+
+################################################################################
+# Functions
+################################################################################
+
+def _updateCurrents(telemetry, currents, chargerId=_CHARGER_ID):
+    for observationId, current in zip((111, 112, 113), currents):
+        telemetry.update(chargerId, observationId, current)
+
+def test_emptySnapshot():
+    telemetry = Telemetry(_Clock())
+
+    assert None == telemetry.getCircuitCurrents()
+    assert None == telemetry.getChargerPower(_CHARGER_ID)
+    assert None == telemetry.getChargerOpMode(_CHARGER_ID)
+
+def test_circuitCurrents():
+    clock = _Clock()
+    telemetry = Telemetry(clock)
+    telemetry.update(_CHARGER_ID, 111, 16)
+    telemetry.update(_CHARGER_ID, 112, 0)
+
+    # Not all phases are known yet.
+    assert None == telemetry.getCircuitCurrents()
+
+    telemetry.update(_CHARGER_ID, 113, 0)
+    assert [16, 0, 0] == telemetry.getCircuitCurrents()
+
+def test_latestChargerWins():
+    clock = _Clock()
+    telemetry = Telemetry(clock)
+    _updateCurrents(telemetry, [16, 16, 16], "EH1")
+    clock.timestamp += 1
+    _updateCurrents(telemetry, [10, 10, 10], "EH2")
+
+    assert [10, 10, 10] == telemetry.getCircuitCurrents()
+
+def test_chargerObservations():
+    telemetry = Telemetry(_Clock())
+    telemetry.update(_CHARGER_ID, 109, 3)
+    telemetry.update(_CHARGER_ID, 120, 3.68)
+
+    # Other observations are ignored.
+    telemetry.update(_CHARGER_ID, 1, 42)
+
+    assert 3 == telemetry.getChargerOpMode(_CHARGER_ID)
+    assert pytest.approx(3680) == telemetry.getChargerPower(_CHARGER_ID)
+    assert 2 == telemetry.getSnapshot()["events"]
+
+def test_invalidObservationIgnored():
+    telemetry = Telemetry(_Clock())
+
+    asyncio.run(telemetry.onObservation(_CHARGER_ID, 2, 111, "much"))
+
+    assert 0 == telemetry.getSnapshot()["events"]
+
+def test_tooOldCurrentsAreStale():
+    clock = _Clock()
+    telemetry = Telemetry(clock, 300)
+    _updateCurrents(telemetry, [16, 16, 16])
+
+    clock.timestamp += 300
+    assert [16, 16, 16] == telemetry.getCircuitCurrents()
+
+    clock.timestamp += 1
+    assert None == telemetry.getCircuitCurrents()
+
+def test_currentsBeforeWriteAreStale():
+    clock = _Clock()
+    telemetry = Telemetry(clock)
+    _updateCurrents(telemetry, [16, 16, 16])
+
+    clock.timestamp += 1
+    telemetry.invalidateCircuitCurrents()
+    assert None == telemetry.getCircuitCurrents()
+
+    # The charger reports the written currents.
+    clock.timestamp += 1
+    _updateCurrents(telemetry, [10, 10, 10])
+    assert [10, 10, 10] == telemetry.getCircuitCurrents()
+
+def _run(command, monkeypatch):
+    """Run a command of a controller, which is subscribed to the stream,
+    against the mock cloud. The stream itself is not connected, its
+    observations are given by the command.
+
+    Args:
+        command (function): Command, which gets the controller, the snapshot, its clock and the mock cloud and returns a coroutine.
+        monkeypatch (MonkeyPatch): Monkeypatch fixture
+
+    Returns:
+        any: Command result
+    """
+    async def subscribe(self, charger, callback):
+        pass
+
+    monkeypatch.setattr(EaseeClient, "sr_subscribe", subscribe)
+    monkeypatch.setattr(EaseeClient, "sr_is_connected", lambda self: True)
+
+    mockCloud = MockCloud()
+    clock = _Clock()
+    telemetry = Telemetry(clock, 300)
+
+    async def run():
+        await mockCloud.start()
+
+        try:
+            evecc = EVECC("user", "password", "SITE-0", 1, isQuiet=True, baseUri=mockCloud.getBaseUri(), timeout=10, retryPolicy=RetryPolicy(0))
+
+            try:
+                assert SysExitStatus.SUCCESS == await evecc.connect()
+                assert SysExitStatus.SUCCESS == await evecc.subscribe(telemetry)
+                mockCloud.resetRequestCounts()
+
+                result = await command(evecc, telemetry, clock, mockCloud)
+            finally:
+                await evecc.disconnect()
+        finally:
+            await mockCloud.stop()
+
+        return result
+
+    return asyncio.run(run())
+
+def test_readFromSnapshot(monkeypatch):
+    async def command(evecc, telemetry, clock, mockCloud):
+        _updateCurrents(telemetry, [10, 10, 10])
+        result = await evecc.getCircuitPowerLimit()
+
+        return result, mockCloud.getRequestCounts()
+
+    (status, powerLimit), requestCounts = _run(command, monkeypatch)
+
+    assert SysExitStatus.SUCCESS == status
+    assert 10 * 3 * 230 == powerLimit
+    assert _GET_SETTINGS_ENDPOINT not in requestCounts
+
+def test_staleSnapshotFallsBackToCloud(monkeypatch):
+    async def command(evecc, telemetry, clock, mockCloud):
+        _updateCurrents(telemetry, [10, 10, 10])
+        clock.timestamp += 301
+        result = await evecc.getCircuitPowerLimit()
+
+        return result, mockCloud.getRequestCounts()
+
+    (status, powerLimit), requestCounts = _run(command, monkeypatch)
+
+    assert SysExitStatus.SUCCESS == status
+    assert 16 * 3 * 230 == powerLimit
+    assert 1 == requestCounts[_GET_SETTINGS_ENDPOINT]
+
+def test_writeFallsBackToCloud(monkeypatch):
+    async def command(evecc, telemetry, clock, mockCloud):
+        _updateCurrents(telemetry, [16, 16, 16])
+        clock.timestamp += 1
+        await evecc.setCircuitPowerLimit(6900)
+        result = await evecc.getCircuitPowerLimit()
+
+        return result, mockCloud.getRequestCounts()
+
+    (status, powerLimit), requestCounts = _run(command, monkeypatch)
+
+    # The snapshot still has the currents before the write.
+    assert SysExitStatus.SUCCESS == status
+    assert 10 * 3 * 230 == powerLimit
+    assert 1 == requestCounts[_GET_SETTINGS_ENDPOINT]
+
+################################################################################
+# Main
+################################################################################